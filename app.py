@@ -1,24 +1,198 @@
-from flask import Flask, request, jsonify
-from datetime import datetime
+from flask import Flask, request, jsonify, g, Response
+from datetime import datetime, timezone
+import functools
+import json
+import queue
+import time
 import uuid
+import zlib
 from utils.storage import (
-    ler_json, escrever_json, adicionar_a_fila, 
-    adicionar_lance, atualizar_leilao
+    adicionar_a_fila, estatisticas_cache, contadores,
+    listar_pagina, pagina_lances_do_leilao,
+    buscar_usuario, buscar_leilao, inserir_usuario, inserir_leilao, versao
 )
-from utils.validadores import (
-    validar_usuario_existe, validar_leilao_existe,
-    validar_leilao_ativo
+from utils import fila, metricas, notificacao, reservas
+from utils.arquivamento import (
+    buscar_leilao_arquivado, pagina_lances_arquivados, versao_arquivada
 )
+from utils.validadores import pre_validar_lance
 
 app = Flask(__name__)
 
+# Tamanho de página padrão e máximo das listagens
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+REQUISICOES = metricas.contador(
+    "leilao_http_requisicoes_total", "Requisições por rota, método e status")
+DURACAO_REQUISICAO = metricas.histograma(
+    "leilao_http_duracao_segundos", "Tempo de resposta por rota e método")
+LANCES_RECUSADOS = metricas.contador(
+    "leilao_api_lances_recusados_total", "Lances recusados pela API antes da fila, por motivo")
+
+# Status HTTP de cada motivo de recusa da pré-validação
+STATUS_RECUSA = {"usuario": 404, "leilao": 404}
+# Idade mínima (segundos) da versão para usar Last-Modified/If-Modified-Since
+IDADE_MINIMA_LAST_MODIFIED = 1
+# Tamanho máximo do header Idempotency-Key
+TAMANHO_MAXIMO_CHAVE = 255
+
+# Eventos de preço publicados pelas lambdas, repartidos por leilão: uma
+# única assinatura por processo atende todos os streams abertos
+PRECOS = notificacao.Difusor("precos", "leilao_id")
+# Intervalo do heartbeat do stream (segundos); também confere se o
+# leilão mudou sem que o evento tenha chegado
+INTERVALO_STREAM = 15
+
+# ==================== MÉTRICAS ====================
+
+@app.before_request
+def iniciar_cronometro():
+    g.inicio = time.perf_counter()
+
+@app.after_request
+def registrar_requisicao(resposta):
+    """Conta a requisição e sua duração, pela regra da rota (não pela URL)"""
+    rota = request.url_rule.rule if request.url_rule else "desconhecida"
+    if 'inicio' in g:
+        DURACAO_REQUISICAO.observar(time.perf_counter() - g.inicio,
+                                    rota=rota, metodo=request.method)
+    REQUISICOES.inc(rota=rota, metodo=request.method, status=resposta.status_code)
+    return resposta
+
+@app.route('/metrics', methods=['GET'])
+def exportar_metricas():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(metricas.exportar_texto(), content_type=metricas.TIPO_CONTEUDO)
+
+# ==================== CACHE HTTP ====================
+
+def condicional(obter_versao):
+    """
+    Decorador de rotas GET: marca a resposta com ETag e Last-Modified da
+    versão dos dados no storage e responde 304, sem executar a rota,
+    quando o cliente já tem essa versão (If-None-Match ou, na falta
+    dele, If-Modified-Since). obter_versao recebe os argumentos da rota.
+
+    Last-Modified tem resolução de 1 s: só é enviado (e If-Modified-Since
+    só é aceito) quando a versão tem mais de IDADE_MINIMA_LAST_MODIFIED
+    segundos, senão duas escritas no mesmo segundo teriam a mesma data e
+    a segunda responderia 304 com o corpo da primeira.
+    """
+    def decorar(rota):
+        @functools.wraps(rota)
+        def envolver(**argumentos):
+            # Versão lida antes do corpo: se os dados mudarem no meio, o
+            # ETag fica mais antigo que o corpo e o próximo GET recebe 200
+            token, modificado = obter_versao(**argumentos)
+            # A mesma versão gera corpos diferentes conforme a query
+            etag = f"{token}-{zlib.crc32(request.query_string):x}"
+            ultima_modificacao = None
+            if modificado and time.time() - modificado > IDADE_MINIMA_LAST_MODIFIED:
+                ultima_modificacao = datetime.fromtimestamp(int(modificado), timezone.utc)
+            
+            if request.if_none_match:
+                atual = request.if_none_match.contains_weak(etag)
+            else:
+                atual = (ultima_modificacao is not None
+                         and request.if_modified_since is not None
+                         and ultima_modificacao <= request.if_modified_since)
+            
+            if atual:
+                resposta = Response(status=304)
+            else:
+                resposta = app.make_response(rota(**argumentos))
+                if resposta.status_code != 200:
+                    return resposta
+            
+            resposta.set_etag(etag)
+            if ultima_modificacao is not None:
+                resposta.last_modified = ultima_modificacao
+            # Clientes e proxies podem guardar, mas sempre revalidam
+            resposta.cache_control.no_cache = True
+            return resposta
+        return envolver
+    return decorar
+
+def versao_com_arquivo(arquivo, leilao_id):
+    """Versão do leilão (ou dos seus lances) no storage ou, se já arquivado, do segmento"""
+    atual = versao(arquivo, leilao_id)
+    return atual if atual[0] != "0" else versao_arquivada(leilao_id)
+
+# ==================== PAGINAÇÃO ====================
+
+def obter_paginacao():
+    """
+    Lê os parâmetros limit, cursor e fields da query string.
+    Retorna (limite, cursor, campos, erro).
+    """
+    try:
+        limite = int(request.args.get('limit', LIMITE_PADRAO))
+    except ValueError:
+        return None, None, None, "Parâmetro 'limit' deve ser um inteiro"
+    
+    if limite < 1:
+        return None, None, None, "Parâmetro 'limit' deve ser maior que zero"
+    limite = min(limite, LIMITE_MAXIMO)
+    
+    cursor = request.args.get('cursor') or None
+    
+    fields = request.args.get('fields')
+    campos = [c.strip() for c in fields.split(',') if c.strip()] if fields else None
+    
+    return limite, cursor, campos, None
+
+def paginado():
+    """Se o cliente pediu paginação (limit ou cursor na query string)"""
+    return 'limit' in request.args or 'cursor' in request.args
+
+def coletar_paginas(obter_pagina, itens):
+    """
+    Junta em `itens` (dict ou lista) todas as páginas de obter_pagina(cursor),
+    para as listagens sem limit/cursor, que mantêm o formato original
+    (a coleção inteira, sem envelope).
+    """
+    cursor = None
+    while True:
+        pagina, cursor = obter_pagina(cursor)
+        if isinstance(itens, dict):
+            itens.update(pagina)
+        else:
+            itens.extend(pagina)
+        if cursor is None:
+            return itens
+
+def projetar(registro, campos):
+    """Mantém apenas os campos pedidos em fields= (ou todos, se None)"""
+    if campos is None:
+        return registro
+    return {campo: registro[campo] for campo in campos if campo in registro}
+
 # ==================== ROTAS DE USUÁRIOS ====================
 
 @app.route('/usuarios', methods=['GET'])
+@condicional(lambda: versao("usuarios.json"))
 def listar_usuarios():
-    """Lista todos os usuários"""
-    usuarios = ler_json("usuarios.json")
-    return jsonify(usuarios), 200
+    """
+    Lista usuários. Sem limit/cursor, responde todos no formato original
+    ({usuario_id: usuario}); com eles, uma página e o proximo_cursor.
+    Query: limit, cursor, fields (ex.: fields=nome,saldo)
+    """
+    limite, cursor, campos, erro = obter_paginacao()
+    if erro:
+        return jsonify({"erro": erro}), 400
+    
+    if not paginado():
+        usuarios = coletar_paginas(
+            lambda c: listar_pagina("usuarios.json", LIMITE_MAXIMO, c), {})
+        return jsonify({uid: projetar(u, campos) for uid, u in usuarios.items()}), 200
+    
+    usuarios, proximo_cursor = listar_pagina("usuarios.json", limite, cursor)
+    
+    return jsonify({
+        "usuarios": {uid: projetar(u, campos) for uid, u in usuarios.items()},
+        "proximo_cursor": proximo_cursor
+    }), 200
 
 @app.route('/usuarios', methods=['POST'])
 def criar_usuario():
@@ -28,50 +202,138 @@ def criar_usuario():
     if not dados or 'nome' not in dados or 'email' not in dados:
         return jsonify({"erro": "Nome e email são obrigatórios"}), 400
     
-    usuarios = ler_json("usuarios.json")
     usuario_id = f"user_{uuid.uuid4().hex[:8]}"
     
-    usuarios[usuario_id] = {
+    usuario = {
         "nome": dados['nome'],
         "email": dados['email'],
         "saldo": dados.get('saldo', 1000.0)  # Saldo inicial padrão
     }
     
-    escrever_json("usuarios.json", usuarios)
+    inserir_usuario(usuario_id, usuario)
     
     return jsonify({
         "mensagem": "Usuário criado com sucesso",
         "usuario_id": usuario_id,
-        "usuario": usuarios[usuario_id]
+        "usuario": usuario
     }), 201
 
 @app.route('/usuarios/<usuario_id>', methods=['GET'])
+@condicional(lambda usuario_id: versao("usuarios.json", usuario_id))
 def obter_usuario(usuario_id):
-    """Obtém detalhes de um usuário específico"""
-    usuarios = ler_json("usuarios.json")
+    """Obtém detalhes de um usuário específico (com o saldo disponível para lances)"""
+    usuario = buscar_usuario(usuario_id)
     
-    if usuario_id not in usuarios:
+    if usuario is None:
         return jsonify({"erro": "Usuário não encontrado"}), 404
     
-    return jsonify(usuarios[usuario_id]), 200
+    return jsonify(dict(usuario, disponivel=reservas.disponivel(usuario))), 200
 
 # ==================== ROTAS DE LEILÕES ====================
 
 @app.route('/leiloes', methods=['GET'])
+@condicional(lambda: versao("leiloes.json"))
 def listar_leiloes():
-    """Lista todos os leilões"""
-    leiloes = ler_json("leiloes.json")
-    return jsonify(leiloes), 200
+    """
+    Lista leilões. Sem limit/cursor, responde todos no formato original
+    ({leilao_id: leilao}); com eles, uma página e o proximo_cursor.
+    Query: limit, cursor, status (ex.: status=ativo), fields (ex.: fields=preco_atual)
+    """
+    limite, cursor, campos, erro = obter_paginacao()
+    if erro:
+        return jsonify({"erro": erro}), 400
+    
+    status = request.args.get('status')
+    filtro = (lambda leilao: leilao.get('status') == status) if status else None
+    
+    if not paginado():
+        leiloes = coletar_paginas(
+            lambda c: listar_pagina("leiloes.json", LIMITE_MAXIMO, c, filtro), {})
+        return jsonify({lid: projetar(l, campos) for lid, l in leiloes.items()}), 200
+    
+    leiloes, proximo_cursor = listar_pagina("leiloes.json", limite, cursor, filtro)
+    
+    return jsonify({
+        "leiloes": {lid: projetar(l, campos) for lid, l in leiloes.items()},
+        "proximo_cursor": proximo_cursor
+    }), 200
 
 @app.route('/leiloes/<leilao_id>', methods=['GET'])
+@condicional(lambda leilao_id: versao_com_arquivo("leiloes.json", leilao_id))
 def obter_leilao(leilao_id):
-    """Obtém detalhes de um leilão específico"""
-    leiloes = ler_json("leiloes.json")
+    """Obtém detalhes de um leilão específico (também se já arquivado)"""
+    leilao = buscar_leilao(leilao_id) or buscar_leilao_arquivado(leilao_id)
     
-    if leilao_id not in leiloes:
+    if leilao is None:
         return jsonify({"erro": "Leilão não encontrado"}), 404
     
-    return jsonify(leiloes[leilao_id]), 200
+    return jsonify(leilao), 200
+
+def evento_sse(tipo, dados):
+    """Formata um evento Server-Sent Events"""
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+@app.route('/leiloes/<leilao_id>/stream', methods=['GET'])
+def stream_leilao(leilao_id):
+    """
+    Stream (Server-Sent Events) de um leilão: envia o estado atual e
+    depois cada lance aceito (preco_atual e o lance) e o vencedor na
+    finalização, quando o stream termina.
+    """
+    # Inscreve antes de ler o estado para não perder eventos no intervalo
+    eventos = PRECOS.inscrever(leilao_id)
+    leilao = buscar_leilao(leilao_id) or buscar_leilao_arquivado(leilao_id)
+    
+    if leilao is None:
+        PRECOS.cancelar(leilao_id, eventos)
+        return jsonify({"erro": "Leilão não encontrado"}), 404
+    
+    def gerar(leilao):
+        try:
+            yield evento_sse("estado", dict(leilao, leilao_id=leilao_id))
+            preco_atual = leilao['preco_atual']
+            
+            while leilao['status'] == 'ativo':
+                try:
+                    evento = eventos.get(timeout=INTERVALO_STREAM)
+                except queue.Empty:
+                    # Sem eventos: confere o registro (leitura pontual do
+                    # cache) caso algum evento tenha se perdido
+                    leilao = buscar_leilao(leilao_id) or leilao
+                    if leilao['status'] != 'ativo':
+                        evento = {"tipo": "finalizado", "leilao_id": leilao_id,
+                                  "vencedor_id": leilao.get('vencedor_id'),
+                                  "preco_atual": leilao['preco_atual']}
+                    elif leilao['preco_atual'] != preco_atual:
+                        evento = {"tipo": "estado", **leilao, "leilao_id": leilao_id}
+                    else:
+                        yield ": heartbeat\n\n"
+                        continue
+                
+                if evento is None:
+                    # Servidor encerrando (PRECOS.encerrar): o cliente reconecta
+                    return
+                
+                # O mesmo evento é entregue a todos os streams: não alterar
+                tipo = evento.get('tipo', 'lance')
+                preco_atual = evento.get('preco_atual', preco_atual)
+                yield evento_sse(tipo, {k: v for k, v in evento.items() if k != 'tipo'})
+                if tipo == 'finalizado':
+                    return
+            
+            # Leilão já estava finalizado ao conectar
+            yield evento_sse("finalizado", {
+                "leilao_id": leilao_id,
+                "vencedor_id": leilao.get('vencedor_id'),
+                "preco_atual": leilao['preco_atual']
+            })
+        finally:
+            PRECOS.cancelar(leilao_id, eventos)
+    
+    return Response(gerar(leilao), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
 @app.route('/leiloes', methods=['POST'])
 def criar_leilao():
@@ -89,10 +351,9 @@ def criar_leilao():
     except ValueError:
         return jsonify({"erro": "Formato de data inválido. Use: YYYY-MM-DDTHH:MM:SS"}), 400
     
-    leiloes = ler_json("leiloes.json")
     leilao_id = f"leilao_{uuid.uuid4().hex[:8]}"
     
-    leiloes[leilao_id] = {
+    leilao = {
         "titulo": dados['titulo'],
         "descricao": dados['descricao'],
         "preco_inicial": float(dados['preco_inicial']),
@@ -102,12 +363,19 @@ def criar_leilao():
         "vencedor_id": None
     }
     
-    escrever_json("leiloes.json", leiloes)
+    inserir_leilao(leilao_id, leilao)
+    
+    # Acorda o finalizador caso este leilão termine antes dos já agendados
+    notificacao.publicar("leiloes", {
+        "tipo": "leilao_criado",
+        "leilao_id": leilao_id,
+        "data_fim": leilao['data_fim']
+    })
     
     return jsonify({
         "mensagem": "Leilão criado com sucesso",
         "leilao_id": leilao_id,
-        "leilao": leiloes[leilao_id]
+        "leilao": leilao
     }), 201
 
 # ==================== ROTAS DE LANCES ====================
@@ -116,7 +384,12 @@ def criar_leilao():
 def criar_lance():
     """
     Cria um novo lance e adiciona à fila SQS para processamento.
-    Validações básicas são feitas aqui, processamento completo na Lambda.
+    A API recusa de imediato lances que certamente seriam rejeitados;
+    a validação definitiva continua na Lambda.
+
+    Com o header Idempotency-Key, repetições do mesmo lance (mesma chave
+    e mesmo usuário) devolvem o mensagem_id original sem enfileirar de
+    novo; a chave reutilizada com outro lance responde 422.
     """
     dados = request.get_json()
     
@@ -129,18 +402,28 @@ def criar_lance():
     usuario_id = dados['usuario_id']
     valor = float(dados['valor'])
     
-    # Validações básicas
-    valido, msg = validar_usuario_existe(usuario_id)
-    if not valido:
-        return jsonify({"erro": msg}), 404
-    
-    valido, msg = validar_leilao_existe(leilao_id)
-    if not valido:
-        return jsonify({"erro": msg}), 404
+    chave = request.headers.get('Idempotency-Key')
+    if chave is not None:
+        if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+            return jsonify({
+                "erro": f"Idempotency-Key deve ter de 1 a {TAMANHO_MAXIMO_CHAVE} caracteres"
+            }), 400
+        chave = f"{usuario_id}:{chave}"
+        impressao = f"{zlib.crc32(json.dumps([leilao_id, valor]).encode('utf-8')):x}"
+        # Repetição de um lance já aceito: responde antes da pré-validação,
+        # que o recusaria se o próprio lance já elevou o preço
+        try:
+            mensagem_id = fila.mensagem_deduplicada(chave, impressao)
+        except fila.ChaveReutilizadaError:
+            return jsonify({"erro": "Idempotency-Key já usada para outro lance"}), 422
+        if mensagem_id is not None:
+            return resposta_lance_enfileirado(mensagem_id, repetido=True)
     
-    valido, msg = validar_leilao_ativo(leilao_id)
+    # Pré-validação: não enfileira lances que o processador rejeitaria
+    valido, msg, motivo = pre_validar_lance(leilao_id, usuario_id, valor)
     if not valido:
-        return jsonify({"erro": msg}), 400
+        LANCES_RECUSADOS.inc(motivo=motivo)
+        return jsonify({"erro": msg}), STATUS_RECUSA.get(motivo, 400)
     
     # Adiciona à fila SQS para processamento assíncrono
     mensagem_id = f"msg_{uuid.uuid4().hex[:8]}"
@@ -155,58 +438,95 @@ def criar_lance():
         }
     }
     
-    adicionar_a_fila(mensagem)
+    if chave is None:
+        adicionar_a_fila(mensagem)
+        return resposta_lance_enfileirado(mensagem_id)
     
-    return jsonify({
+    # Chave e mensagem na mesma transação: requisições simultâneas com a
+    # mesma chave enfileiram uma única vez
+    try:
+        mensagem_id, enviada = fila.enviar_deduplicado(mensagem, chave, impressao)
+    except fila.ChaveReutilizadaError:
+        return jsonify({"erro": "Idempotency-Key já usada para outro lance"}), 422
+    return resposta_lance_enfileirado(mensagem_id, repetido=not enviada)
+
+def resposta_lance_enfileirado(mensagem_id, repetido=False):
+    """Resposta 202 do POST /lances (Idempotent-Replayed nas repetições)"""
+    resposta = app.make_response((jsonify({
         "mensagem": "Lance enviado para processamento",
         "mensagem_id": mensagem_id,
         "status": "pendente"
-    }), 202
+    }), 202))
+    if repetido:
+        resposta.headers["Idempotent-Replayed"] = "true"
+    return resposta
+
+def pagina_de_lances(leilao_id, limite, cursor):
+    """Página de lances do storage ou, se o leilão já foi arquivado, da camada fria"""
+    lances_leilao, proximo_cursor = pagina_lances_do_leilao(leilao_id, limite, cursor)
+    if not lances_leilao:
+        arquivados = pagina_lances_arquivados(leilao_id, limite, cursor)
+        if arquivados is not None:
+            lances_leilao, proximo_cursor = arquivados
+    return lances_leilao, proximo_cursor
 
 @app.route('/lances/<leilao_id>', methods=['GET'])
+@condicional(lambda leilao_id: versao_com_arquivo("lances.json", leilao_id))
 def listar_lances_leilao(leilao_id):
-    """Lista todos os lances de um leilão específico"""
-    lances = ler_json("lances.json")
+    """
+    Lista os lances de um leilão, do mais recente para o mais antigo.
+    Sem limit/cursor, responde a lista inteira (formato original); com
+    eles, uma página e o proximo_cursor.
+    Query: limit, cursor, fields
+    """
+    limite, cursor, campos, erro = obter_paginacao()
+    if erro:
+        return jsonify({"erro": erro}), 400
     
-    lances_leilao = [
-        lance for lance in lances 
-        if lance.get('leilao_id') == leilao_id
-    ]
+    if not paginado():
+        lances_leilao = coletar_paginas(
+            lambda c: pagina_de_lances(leilao_id, LIMITE_MAXIMO, c), [])
+        return jsonify([projetar(lance, campos) for lance in lances_leilao]), 200
     
-    # Ordena por data (mais recente primeiro)
-    lances_leilao.sort(key=lambda x: x.get('data_hora', ''), reverse=True)
+    lances_leilao, proximo_cursor = pagina_de_lances(leilao_id, limite, cursor)
     
-    return jsonify(lances_leilao), 200
+    return jsonify({
+        "lances": [projetar(lance, campos) for lance in lances_leilao],
+        "proximo_cursor": proximo_cursor
+    }), 200
 
 # ==================== ROTAS DE DEBUG ====================
 
 @app.route('/fila', methods=['GET'])
 def visualizar_fila():
     """Visualiza mensagens na fila SQS (para debug)"""
-    fila = ler_json("fila_sqs.json")
+    limite, _, _, erro = obter_paginacao()
+    if erro:
+        return jsonify({"erro": erro}), 400
+    
     return jsonify({
-        "total_mensagens": len(fila),
-        "mensagens": fila
+        "total_mensagens": fila.contar(),
+        "mensagens": fila.listar(limite=limite),
+        "mensagens_dlq": fila.contar(fila.FILA_DLQ)
     }), 200
 
 @app.route('/status', methods=['GET'])
 def status_sistema():
-    """Retorna status geral do sistema"""
-    usuarios = ler_json("usuarios.json")
-    leiloes = ler_json("leiloes.json")
-    lances = ler_json("lances.json")
-    fila = ler_json("fila_sqs.json")
-    
-    leiloes_ativos = sum(1 for l in leiloes.values() if l['status'] == 'ativo')
-    leiloes_finalizados = sum(1 for l in leiloes.values() if l['status'] == 'finalizado')
+    """
+    Retorna status geral do sistema.
+    Usa os contadores mantidos pelo storage, sem ler os arquivos de dados.
+    """
+    totais = contadores()
+    por_status = totais["leiloes_por_status"]
     
     return jsonify({
-        "usuarios": len(usuarios),
-        "leiloes_total": len(leiloes),
-        "leiloes_ativos": leiloes_ativos,
-        "leiloes_finalizados": leiloes_finalizados,
-        "lances_total": len(lances),
-        "mensagens_na_fila": len(fila)
+        "usuarios": totais["usuarios"],
+        "leiloes_total": totais["leiloes"],
+        "leiloes_ativos": por_status.get('ativo', 0),
+        "leiloes_finalizados": por_status.get('finalizado', 0),
+        "lances_total": totais["lances"],
+        "mensagens_na_fila": fila.contar(),
+        "cache": estatisticas_cache()
     }), 200
 
 # ==================== EXECUÇÃO ====================
@@ -216,14 +536,17 @@ if __name__ == '__main__':
     print("🚀 Sistema de Leilão Online")
     print("=" * 50)
     print("API Flask iniciada em http://localhost:5000")
+    print("(servidor de desenvolvimento; produção: python servidor.py)")
     print("\nEndpoints disponíveis:")
     print("  GET  /usuarios")
     print("  POST /usuarios")
     print("  GET  /leiloes")
     print("  POST /leiloes")
+    print("  GET  /leiloes/<leilao_id>/stream (SSE)")
     print("  POST /lances")
     print("  GET  /lances/<leilao_id>")
     print("  GET  /fila (debug)")
     print("  GET  /status")
+    print("  GET  /metrics")
     print("=" * 50)
     app.run(debug=True, port=5000)
\ No newline at end of file
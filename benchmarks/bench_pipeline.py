@@ -0,0 +1,369 @@
+"""
+Benchmark de carga do pipeline de lances (API -> fila -> processador -> finalizador).
+
+Para cada combinação de backend e modo do processador:
+1. cria um diretório de dados temporário com N usuários e M leilões;
+2. inicia lambda_processador como subprocesso (no modo escolhido);
+3. dispara POST /lances concorrentes pelo test client do Flask;
+4. acompanha o histórico de lances até todas as mensagens aceitas
+   aparecerem (ou esgotar o tempo), medindo a latência ponta a ponta
+   (resposta 202 do POST -> lance gravado com status final);
+5. faz todos os leilões expirarem, inicia lambda_finalizador e mede
+   quanto tempo leva para finalizar todos.
+
+Reporta vazão, p50/p95/p99, mensagens perdidas/duplicadas e volume de
+I/O em arquivos (métricas de storage de cada processo e, no Linux,
+/proc/<pid>/io). Cada combinação roda num subprocesso, já que o backend
+é escolhido pela variável LEILAO_STORAGE na importação.
+
+Uso:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --lances 5000 --clientes 16 \\
+        --backends json,sqlite,shards --modos lote,unitario,paralelo
+
+O resultado é impresso em JSON.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PROCESSADOR = os.path.join(RAIZ, "lambdas", "lambda_processador.py")
+FINALIZADOR = os.path.join(RAIZ, "lambdas", "lambda_finalizador.py")
+
+# Argumentos de linha de comando do processador para cada modo
+ARGUMENTOS_MODO = {
+    "lote": [],
+    "unitario": ["--unitario"],
+    "paralelo": ["--workers", "4"],
+}
+
+# Intervalo de consulta ao histórico de lances (segundos)
+INTERVALO_OBSERVACAO = 0.001
+# Lances de um leilão sobem 6% a cada lance (incremento mínimo é 5%)
+FATOR_LANCE = 1.06
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolação linear; None sem valores"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    base = int(posicao)
+    proximo = min(base + 1, len(ordenados) - 1)
+    return ordenados[base] + (ordenados[proximo] - ordenados[base]) * (posicao - base)
+
+def resumo_latencias(latencias):
+    """p50/p95/p99/máximo em milissegundos"""
+    return {
+        nome: None if valor is None else round(valor * 1000, 3)
+        for nome, valor in (
+            ("p50_ms", percentil(latencias, 50)),
+            ("p95_ms", percentil(latencias, 95)),
+            ("p99_ms", percentil(latencias, 99)),
+            ("max_ms", max(latencias) if latencias else None),
+        )
+    }
+
+def io_do_processo(pid):
+    """Bytes lidos/escritos pelo processo (Linux); None em outros sistemas"""
+    try:
+        with open(f"/proc/{pid}/io", 'r') as f:
+            campos = dict(linha.split(": ") for linha in f.read().splitlines())
+    except (OSError, ValueError):
+        return None
+    return {"lidos_bytes": int(campos["rchar"]), "escritos_bytes": int(campos["wchar"])}
+
+def io_das_metricas(texto):
+    """Soma os bytes de storage lidos/escritos a partir do texto /metrics"""
+    totais = {"lidos_bytes": 0, "escritos_bytes": 0}
+    for linha in texto.splitlines():
+        if linha.startswith("leilao_storage_lidos_bytes_total"):
+            totais["lidos_bytes"] += int(float(linha.rsplit(" ", 1)[1]))
+        elif linha.startswith("leilao_storage_escritos_bytes_total"):
+            totais["escritos_bytes"] += int(float(linha.rsplit(" ", 1)[1]))
+    return totais
+
+def ler_arquivos_de_metricas(diretorio, prefixo):
+    """Soma o I/O de storage de todos os arquivos <prefixo>*.prom"""
+    totais = {"lidos_bytes": 0, "escritos_bytes": 0}
+    for nome in os.listdir(diretorio):
+        if nome.startswith(prefixo) and nome.endswith(".prom"):
+            with open(os.path.join(diretorio, nome), 'r', encoding='utf-8') as f:
+                parcial = io_das_metricas(f.read())
+            for chave in totais:
+                totais[chave] += parcial[chave]
+    return totais
+
+# ==================== OBSERVAÇÃO DO HISTÓRICO ====================
+
+def novos_lances(storage, posicao):
+    """
+    Lances gravados desde `posicao`, sem reler o histórico inteiro.
+    Retorna ([(id, status)], nova_posicao).
+    """
+    if storage.BACKEND == "sqlite":
+        from utils import storage_sqlite
+        linhas = storage_sqlite._conexao().execute(
+            "SELECT seq, id, status FROM lances WHERE seq > ? ORDER BY seq", (posicao,)
+        ).fetchall()
+        if linhas:
+            posicao = linhas[-1][0]
+        return [(lance_id, status) for _, lance_id, status in linhas], posicao
+
+    if storage.BACKEND == "shards":
+        # Uma posição por log de leilão
+        from utils import storage_shards
+        posicao = dict(posicao or {})
+        lances = []
+        for leilao_id in storage_shards.ler_json("leiloes.json"):
+            caminho = storage_shards.caminho_dos_lances(leilao_id)
+            for offset, registro in storage._iterar_jsonl(caminho, posicao.get(leilao_id, 0)):
+                lances.append((registro["id"], registro["status"]))
+                posicao[leilao_id] = offset
+        return lances, posicao
+
+    lances = []
+    for posicao, registro in storage.iterar_log("lances.json", posicao):
+        lances.append((registro["id"], registro["status"]))
+    return lances, posicao
+
+def observar_lances(storage, vistos, parar):
+    """Thread que anota o instante em que cada lance aparece no histórico"""
+    posicao = 0
+    while not parar.is_set():
+        lances, posicao = novos_lances(storage, posicao)
+        agora = time.perf_counter()
+        for lance_id, status in lances:
+            vistos.setdefault(lance_id, []).append((agora, status))
+        if not lances:
+            time.sleep(INTERVALO_OBSERVACAO)
+
+# ==================== CENÁRIO ====================
+
+def semear(storage, usuarios, leiloes):
+    storage.escrever_json("usuarios.json", {
+        f"user_{i}": {"nome": f"Usuário {i}", "email": f"u{i}@email.com", "saldo": 1e15}
+        for i in range(usuarios)
+    })
+    storage.escrever_json("leiloes.json", {
+        f"leilao_{i}": {
+            "titulo": f"Leilão {i}", "descricao": "x" * 100,
+            "preco_inicial": 100.0, "preco_atual": 100.0,
+            "data_fim": "2030-01-01T00:00:00", "status": "ativo", "vencedor_id": None
+        }
+        for i in range(leiloes)
+    })
+
+def disparar_lances(app, total, clientes, usuarios, leiloes):
+    """
+    Envia `total` POST /lances a partir de `clientes` threads.
+    Retorna ({mensagem_id: instante_do_202}, recusados_pela_api, duracao).
+    """
+    enviados = {}
+    recusados = [0]
+    trava = threading.Lock()
+    proximo = iter(range(total))
+
+    def cliente():
+        client = app.test_client()
+        while True:
+            with trava:
+                i = next(proximo, None)
+            if i is None:
+                return
+            # Cada leilão recebe lances crescentes (respeitando o incremento mínimo)
+            rodada = i // leiloes
+            resposta = client.post('/lances', json={
+                "leilao_id": f"leilao_{i % leiloes}",
+                "usuario_id": f"user_{i % usuarios}",
+                "valor": round(100.0 * FATOR_LANCE ** (rodada + 1), 2)
+            })
+            instante = time.perf_counter()
+            with trava:
+                if resposta.status_code == 202:
+                    enviados[resposta.get_json()["mensagem_id"]] = instante
+                else:
+                    recusados[0] += 1
+
+    threads = [threading.Thread(target=cliente) for _ in range(clientes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return enviados, recusados[0], time.perf_counter() - inicio
+
+def iniciar_lambda(script, argumentos, diretorio, prefixo_metricas):
+    """Inicia uma lambda com o diretório temporário como data/"""
+    ambiente = dict(
+        os.environ,
+        LEILAO_METRICAS_ARQUIVO=os.path.join(diretorio, prefixo_metricas + "-{pid}.prom")
+    )
+    return subprocess.Popen(
+        [sys.executable, script] + argumentos,
+        cwd=os.path.dirname(diretorio), env=ambiente,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def encerrar_lambda(processo):
+    """Ctrl+C na lambda (as métricas são gravadas na saída) e coleta o I/O"""
+    io = io_do_processo(processo.pid)
+    processo.send_signal(signal.SIGINT)
+    try:
+        processo.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        processo.kill()
+        processo.wait()
+    return io
+
+def executar_cenario(parametros):
+    """Roda no subprocesso, com DATA_DIR e LEILAO_STORAGE já definidos"""
+    from utils import storage, metricas
+    import app as api
+
+    diretorio = storage.DATA_DIR
+    semear(storage, parametros["usuarios"], parametros["leiloes"])
+
+    resultado = {"modo": parametros["modo"], **{
+        chave: parametros[chave] for chave in ("usuarios", "leiloes", "lances", "clientes")
+    }}
+
+    # Processador em execução antes da carga, como em produção
+    processador = iniciar_lambda(PROCESSADOR, ARGUMENTOS_MODO[parametros["modo"]],
+                                 diretorio, "processador")
+    vistos = {}
+    parar = threading.Event()
+    observador = threading.Thread(target=observar_lances, args=(storage, vistos, parar))
+    observador.start()
+
+    try:
+        enviados, recusados, duracao_api = disparar_lances(
+            api.app, parametros["lances"], parametros["clientes"],
+            parametros["usuarios"], parametros["leiloes"]
+        )
+        resultado["api"] = {
+            "aceitos": len(enviados),
+            "recusados": recusados,
+            "requisicoes_por_s": round(parametros["lances"] / duracao_api, 1),
+        }
+
+        # Espera o processador esvaziar a fila
+        esperados = {f"lance_{mensagem_id}": instante for mensagem_id, instante in enviados.items()}
+        limite = time.perf_counter() + parametros["tempo_limite"]
+        while time.perf_counter() < limite and not all(l in vistos for l in esperados):
+            time.sleep(0.01)
+    finally:
+        parar.set()
+        observador.join()
+        io_processador = encerrar_lambda(processador)
+
+    latencias = [
+        vistos[lance_id][0][0] - instante
+        for lance_id, instante in esperados.items() if lance_id in vistos
+    ]
+    status = [ocorrencias[0][1] for lance_id, ocorrencias in vistos.items() if lance_id in esperados]
+    if latencias:
+        primeiro = min(esperados.values())
+        ultimo = max(vistos[l][0][0] for l in esperados if l in vistos)
+        vazao = len(latencias) / (ultimo - primeiro) if ultimo > primeiro else None
+    else:
+        vazao = None
+
+    resultado["processador"] = {
+        "processados": status.count("processado"),
+        "rejeitados": status.count("rejeitado"),
+        "perdidos": sum(1 for l in esperados if l not in vistos),
+        "duplicados": sum(len(o) - 1 for o in vistos.values() if len(o) > 1),
+        "desconhecidos": sum(1 for l in vistos if l not in esperados),
+        "lances_por_s": None if vazao is None else round(vazao, 1),
+        "latencia_ponta_a_ponta": resumo_latencias(latencias),
+    }
+
+    # Finalizador: todos os leilões expiram em 1 s e a lambda é iniciada
+    data_fim = datetime.now() + timedelta(seconds=1)
+    storage.atualizar_leiloes({
+        f"leilao_{i}": {"data_fim": data_fim.isoformat()}
+        for i in range(parametros["leiloes"])
+    })
+    finalizador = iniciar_lambda(FINALIZADOR, [], diretorio, "finalizador")
+    limite = time.time() + parametros["tempo_limite"]
+    finalizados = 0
+    try:
+        while time.time() < limite:
+            finalizados = storage.contadores()["leiloes_por_status"].get("finalizado", 0)
+            if finalizados >= parametros["leiloes"]:
+                break
+            time.sleep(INTERVALO_OBSERVACAO)
+        fim = time.time()
+    finally:
+        io_finalizador = encerrar_lambda(finalizador)
+
+    resultado["finalizador"] = {
+        "finalizados": finalizados,
+        "atraso_ate_o_ultimo_ms": round((fim - data_fim.timestamp()) * 1000, 1),
+    }
+
+    resultado["io"] = {
+        "api": io_das_metricas(metricas.exportar_texto()),
+        "processador": ler_arquivos_de_metricas(diretorio, "processador"),
+        "finalizador": ler_arquivos_de_metricas(diretorio, "finalizador"),
+        "processos": {
+            "processador": io_processador,
+            "finalizador": io_finalizador,
+        },
+    }
+    return resultado
+
+def executar_configuracao(backend, parametros):
+    """Executa o cenário num subprocesso isolado e devolve o resultado"""
+    with tempfile.TemporaryDirectory() as raiz:
+        diretorio = os.path.join(raiz, "data")
+        os.makedirs(diretorio)
+        ambiente = dict(os.environ, LEILAO_STORAGE=backend, BENCH_DATA_DIR=diretorio)
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cenario", json.dumps(parametros)],
+            env=ambiente, capture_output=True, text=True, check=True
+        )
+    return dict(json.loads(saida.stdout.strip().splitlines()[-1]), backend=backend)
+
+def argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark de carga do pipeline de lances")
+    parser.add_argument("--usuarios", type=int, default=100)
+    parser.add_argument("--leiloes", type=int, default=50)
+    parser.add_argument("--lances", type=int, default=2000)
+    parser.add_argument("--clientes", type=int, default=8, help="threads enviando POST /lances")
+    parser.add_argument("--backends", default="json,sqlite,shards")
+    parser.add_argument("--modos", default="lote,unitario,paralelo")
+    parser.add_argument("--tempo-limite", type=float, default=120,
+                        help="espera máxima (s) pelo processamento e pela finalização")
+    parser.add_argument("--cenario", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = argumentos()
+    if args.cenario:
+        from utils import storage
+        storage.DATA_DIR = os.environ["BENCH_DATA_DIR"]
+        print(json.dumps(executar_cenario(json.loads(args.cenario))))
+    else:
+        resultados = [
+            executar_configuracao(backend, {
+                "modo": modo, "usuarios": args.usuarios, "leiloes": args.leiloes,
+                "lances": args.lances, "clientes": args.clientes,
+                "tempo_limite": args.tempo_limite,
+            })
+            for backend in args.backends.split(",")
+            for modo in args.modos.split(",")
+        ]
+        print(json.dumps(resultados, indent=2))
@@ -0,0 +1,116 @@
+"""
+Benchmark dos backends de storage (JSON x SQLite).
+
+Para cada backend e tamanho de histórico, cria um diretório de dados
+temporário, carrega N lances e mede as operações usadas pela API e
+pelas lambdas. Cada backend roda num subprocesso, já que o backend é
+escolhido pela variável LEILAO_STORAGE na importação.
+
+Uso:
+    python benchmarks/bench_storage.py                  (10k, 100k e 1M lances)
+    python benchmarks/bench_storage.py 10000 100000     (tamanhos escolhidos)
+
+O resultado é impresso em JSON.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+BACKENDS = ["json", "sqlite"]
+LEILOES = 1000
+USUARIOS = 1000
+LOTE_CARGA = 5000
+REPETICOES = 200
+
+def medir(funcao, repeticoes=1):
+    """Tempo médio por chamada, em milissegundos"""
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        funcao(i)
+    return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+def executar_cenario(total_lances):
+    """Roda no subprocesso, com DATA_DIR e LEILAO_STORAGE já definidos"""
+    from utils import storage
+
+    storage.escrever_json("usuarios.json", {
+        f"user_{i}": {"nome": f"Usuário {i}", "email": f"u{i}@email.com", "saldo": 1e9}
+        for i in range(USUARIOS)
+    })
+    storage.escrever_json("leiloes.json", {
+        f"leilao_{i}": {
+            "titulo": f"Leilão {i}", "descricao": "x" * 100,
+            "preco_inicial": 100.0, "preco_atual": 100.0,
+            "data_fim": "2030-01-01T00:00:00", "status": "ativo", "vencedor_id": None
+        }
+        for i in range(LEILOES)
+    })
+
+    def lance(i):
+        return {
+            "id": f"lance_{i}", "leilao_id": f"leilao_{i % LEILOES}",
+            "usuario_id": f"user_{i % USUARIOS}", "valor": 100.0 + i,
+            "data_hora": f"2026-01-01T00:00:00.{i:07d}", "status": "processado"
+        }
+
+    resultado = {"lances": total_lances}
+
+    inicio = time.perf_counter()
+    for base in range(0, total_lances, LOTE_CARGA):
+        storage.adicionar_lances([lance(i) for i in range(base, min(base + LOTE_CARGA, total_lances))])
+    resultado["carga_lances_por_s"] = round(total_lances / (time.perf_counter() - inicio))
+
+    # Primeira consulta num processo "frio": no JSON inclui reconstruir o índice
+    storage.limpar_cache()
+    inicio = time.perf_counter()
+    storage.ultimo_lance_processado("leilao_0")
+    resultado["primeira_consulta_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+
+    proximo = total_lances
+    def adicionar(i):
+        storage.adicionar_lance(lance(proximo + i))
+
+    medidas = {
+        "adicionar_lance_ms": adicionar,
+        "atualizar_leilao_ms": lambda i: storage.atualizar_leilao(f"leilao_{i % LEILOES}", {"preco_atual": 200.0 + i}),
+        "buscar_leilao_ms": lambda i: storage.buscar_leilao(f"leilao_{i % LEILOES}"),
+        "lances_do_leilao_ms": lambda i: storage.lances_do_leilao(f"leilao_{i % LEILOES}"),
+        "pagina_lances_ms": lambda i: storage.pagina_lances_do_leilao(f"leilao_{i % LEILOES}", 50),
+        "ultimo_lance_processado_ms": lambda i: storage.ultimo_lance_processado(f"leilao_{i % LEILOES}"),
+    }
+    for nome, funcao in medidas.items():
+        resultado[nome] = round(medir(funcao, REPETICOES), 4)
+
+    return resultado
+
+def executar_backend(backend, total_lances):
+    """Executa o cenário num subprocesso isolado e devolve o resultado"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        ambiente = dict(os.environ, LEILAO_STORAGE=backend, BENCH_DATA_DIR=diretorio)
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cenario", str(total_lances)],
+            env=ambiente, capture_output=True, text=True, check=True
+        )
+    return dict(json.loads(saida.stdout), backend=backend)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--cenario":
+        from utils import storage
+        storage.DATA_DIR = os.environ["BENCH_DATA_DIR"]
+        print(json.dumps(executar_cenario(int(sys.argv[2]))))
+    else:
+        tamanhos = [int(t) for t in sys.argv[1:]] or TAMANHOS_PADRAO
+        resultados = [
+            executar_backend(backend, tamanho)
+            for tamanho in tamanhos
+            for backend in BACKENDS
+        ]
+        print(json.dumps(resultados, indent=2))
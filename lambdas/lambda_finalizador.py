@@ -6,136 +6,380 @@ Verifica leilões expirados e define vencedores
 import sys
 import os
 import time
+import heapq
 from datetime import datetime
 
 # Adiciona o diretório raiz ao path para importar utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.storage import ler_json, atualizar_leilao
+from utils.storage import (
+    leiloes_ativos, atualizar_se_versao, ultimo_lance_processado,
+    ultimos_lances_processados, buscar_leilao, versao_do_registro, compactar_log,
+    TENTATIVAS_CAS
+)
+from utils import arquivamento, logs, metricas, notificacao, reservas
+
+# Canal em que a API publica os leilões criados (acorda o agendador)
+CANAL_LEILOES = "leiloes"
+# Canal dos eventos de preço (stream SSE da API)
+CANAL_PRECOS = "precos"
+# Reconstrói a agenda a partir do arquivo a cada N segundos, cobrindo
+# notificações perdidas (a entrega é best-effort)
+RESSINCRONIZAR_SEGUNDOS = 300
+# Move leilões finalizados fora da retenção para a camada fria (e
+# reconcilia as reservas de saldo e compacta o histórico) a cada N segundos
+INTERVALO_ARQUIVAMENTO = 3600
+# Leilões ainda em conflito depois de TENTATIVAS_CAS voltam à agenda
+# para uma nova tentativa daqui a N segundos
+REAGENDAR_CONFLITO_SEGUNDOS = 1.0
+
+log = logs.obter("finalizador")
+
+ATRASO_FINALIZACAO = metricas.histograma(
+    "leilao_finalizador_atraso_segundos", "Atraso entre o data_fim e a finalização",
+    metricas.LIMITES_LATENCIA + (30, 60, 300))
+LEILOES_FINALIZADOS = metricas.contador(
+    "leilao_finalizador_leiloes_total", "Leilões finalizados")
 
 def obter_ultimo_lance_vencedor(leilao_id):
     """
     Retorna o último lance processado do leilão
     (que representa o maior lance vencedor)
     """
-    lances = ler_json("lances.json")
-    
-    # Filtra lances processados do leilão
-    lances_validos = [
-        lance for lance in lances
-        if lance.get('leilao_id') == leilao_id 
-        and lance.get('status') == 'processado'
-    ]
-    
-    if not lances_validos:
-        return None
-    
-    # Ordena por data e retorna o mais recente
-    lances_validos.sort(key=lambda x: x.get('data_hora', ''))
-    return lances_validos[-1]
+    # Consulta O(1) no índice mantido pelo storage
+    return ultimo_lance_processado(leilao_id)
 
-def finalizar_leilao(leilao_id, leilao):
+def registrar_resultado(leilao_id, leilao, lance_vencedor):
+    """Registra no log o resultado da finalização de um leilão"""
+    campos = {"leilao_id": leilao_id, "data_fim": leilao['data_fim']}
+    if lance_vencedor:
+        campos["vencedor_id"] = lance_vencedor['usuario_id']
+        campos["valor_final"] = lance_vencedor['valor']
+        log.info("leilão finalizado", extra=campos)
+    else:
+        log.info("leilão finalizado sem lances", extra=campos)
+
+def resolver_vencedores(leiloes):
     """
-    Finaliza um leilão específico, definindo o vencedor
+    Lance vencedor de cada leilão ({leilao_id: leilao}) como
+    {leilao_id: {"usuario_id", "valor", ...}}. O líder é gravado pelo
+    processador junto com o preco_atual (lider_id); leilões sem esse
+    campo (gravados antes dele) usam uma única consulta ao índice de lances.
+    """
+    sem_lider = [leilao_id for leilao_id, leilao in leiloes.items() if 'lider_id' not in leilao]
+    vencedores = ultimos_lances_processados(sem_lider) if sem_lider else {}
+    for leilao_id, leilao in leiloes.items():
+        if leilao.get('lider_id') is not None:
+            vencedores[leilao_id] = {"usuario_id": leilao['lider_id'], "valor": leilao['preco_atual']}
+    return vencedores
+
+def finalizar_leiloes(leiloes):
+    """
+    Finaliza vários leilões ({leilao_id: leilao}) de uma vez: resolve os
+    vencedores, grava todos os status/vencedores com uma única escrita
+    de leiloes.json e liquida a reserva de saldo de cada vencedor.
+
+    A escrita é um compare-and-set contra a versão lida: um leilão que
+    recebeu lance no meio tempo é relido e decidido de novo, sem
+    atrasar os demais. Retorna quantos leilões foram finalizados.
+    """
+    return _finalizar_leiloes(leiloes)[0]
+
+def _finalizar_leiloes(leiloes):
+    """
+    finalizar_leiloes que também retorna os ids ainda ativos e em
+    conflito depois de TENTATIVAS_CAS: (finalizados, pendentes).
     """
-    print(f"\n🔨 Finalizando leilão: {leilao['titulo']}")
-    print(f"   ID: {leilao_id}")
-    print(f"   Data fim: {leilao['data_fim']}")
+    if not leiloes:
+        return 0, []
     
-    # Busca o último lance (vencedor)
-    lance_vencedor = obter_ultimo_lance_vencedor(leilao_id)
+    inicio = time.perf_counter()
+    pendentes = dict(leiloes)
+    # leilao_id -> (leilao lido, lance vencedor, campos gravados)
+    finalizados = {}
     
-    if lance_vencedor:
-        usuario_id = lance_vencedor['usuario_id']
-        valor_final = lance_vencedor['valor']
-        
-        # Atualiza leilão com vencedor
-        atualizar_leilao(leilao_id, {
-            "status": "finalizado",
-            "vencedor_id": usuario_id,
-            "preco_atual": valor_final
-        })
+    for _ in range(TENTATIVAS_CAS):
+        vencedores = resolver_vencedores(pendentes)
         
-        # Busca informações do vencedor
-        usuarios = ler_json("usuarios.json")
-        vencedor = usuarios.get(usuario_id, {})
+        atualizacoes = {}
+        for leilao_id, leilao in pendentes.items():
+            lance_vencedor = vencedores.get(leilao_id)
+            if lance_vencedor:
+                dados = {
+                    "status": "finalizado",
+                    "vencedor_id": lance_vencedor['usuario_id'],
+                    "preco_atual": lance_vencedor['valor']
+                }
+            else:
+                # Nenhum lance foi feito
+                dados = {"status": "finalizado", "vencedor_id": None}
+            atualizacoes[leilao_id] = (versao_do_registro(leilao), dados)
         
-        print(f"🏆 VENCEDOR: {vencedor.get('nome', usuario_id)}")
-        print(f"   Valor final: R$ {valor_final:.2f}")
+        conflitos = set(atualizar_se_versao("leiloes.json", atualizacoes))
+        for leilao_id, (_, dados) in atualizacoes.items():
+            if leilao_id not in conflitos:
+                finalizados[leilao_id] = (pendentes[leilao_id], vencedores.get(leilao_id), dados)
         
+        # Leilões alterados desde a leitura: relê os que seguem ativos
+        pendentes = {}
+        for leilao_id in conflitos:
+            leilao = buscar_leilao(leilao_id)
+            if leilao is not None and leilao['status'] == 'ativo':
+                pendentes[leilao_id] = leilao
+        if not pendentes:
+            break
     else:
-        # Nenhum lance foi feito
-        atualizar_leilao(leilao_id, {
-            "status": "finalizado",
-            "vencedor_id": None
+        # Voltam à agenda (finalizar_vencidos) ou ficam para a próxima verificação
+        log.warning("leilões não finalizados por conflito de versão", extra={
+            "leiloes": sorted(pendentes)
         })
-        print(f"📭 Leilão finalizado sem lances")
+    
+    liquidar_vencedores(finalizados)
+    
+    duracao = time.perf_counter() - inicio
+    
+    agora = time.time()
+    for leilao, _, _ in finalizados.values():
+        ATRASO_FINALIZACAO.observar(max(0.0, agora - prazo_do_leilao(leilao)))
+    LEILOES_FINALIZADOS.inc(len(finalizados))
+    
+    for leilao_id, (leilao, lance_vencedor, _) in finalizados.items():
+        registrar_resultado(leilao_id, leilao, lance_vencedor)
+    
+    notificacao.publicar_varios(CANAL_PRECOS, [
+        {
+            "tipo": "finalizado",
+            "leilao_id": leilao_id,
+            "vencedor_id": dados["vencedor_id"],
+            "preco_atual": dados.get("preco_atual", leilao["preco_atual"])
+        }
+        for leilao_id, (leilao, _, dados) in finalizados.items()
+    ])
+    
+    if finalizados:
+        campos = {"finalizados": len(finalizados), "duracao_ms": round(duracao * 1000, 1)}
+        if duracao > 0:
+            campos["leiloes_por_s"] = round(len(finalizados) / duracao)
+        log.info("lote de leilões finalizado", extra=campos)
+    
+    return len(finalizados), sorted(pendentes)
+
+def liquidar_vencedores(finalizados):
+    """
+    Debita do saldo de cada vencedor a reserva do lance vencedor. Leilões
+    gravados antes das reservas (sem lance_lider_id) não têm o que
+    liquidar. Uma falha só é registrada: reservas.reconciliar liquida
+    depois o que ficou para trás.
+    """
+    liquidacoes = {}
+    for leilao, lance_vencedor, _ in finalizados.values():
+        if lance_vencedor and leilao.get('lance_lider_id'):
+            liquidacoes.setdefault(leilao['lider_id'], []).append(leilao['lance_lider_id'])
+    try:
+        reservas.liquidar(liquidacoes)
+    except Exception:
+        log.exception("falha ao liquidar reservas", extra={"usuarios": sorted(liquidacoes)})
+
+def finalizar_leilao(leilao_id, leilao):
+    """
+    Finaliza um leilão específico, definindo o vencedor
+    """
+    return finalizar_leiloes({leilao_id: leilao})
 
 def verificar_leiloes_expirados():
     """
     Verifica todos os leilões ativos e finaliza os que expiraram
     """
-    print("\n🔍 Verificando leilões expirados...")
+    log.debug("verificando leilões expirados")
     
-    leiloes = ler_json("leiloes.json")
+    # Apenas os leilões ativos (no SQLite, pelo índice de status)
+    leiloes = leiloes_ativos()
     agora = datetime.now()
     
-    leiloes_finalizados = 0
+    expirados = {}
     
     for leilao_id, leilao in leiloes.items():
-        # Verifica apenas leilões ativos
-        if leilao['status'] != 'ativo':
-            continue
-        
         # Verifica se já passou da data fim
         data_fim = datetime.fromisoformat(leilao['data_fim'])
         
         if agora > data_fim:
-            finalizar_leilao(leilao_id, leilao)
-            leiloes_finalizados += 1
+            expirados[leilao_id] = leilao
     
-    if leiloes_finalizados == 0:
-        print("✓ Nenhum leilão expirado encontrado")
-    else:
-        print(f"\n📊 Total de leilões finalizados: {leiloes_finalizados}")
+    leiloes_finalizados = finalizar_leiloes(expirados)
+    
+    log.info("verificação concluída", extra={"finalizados": leiloes_finalizados})
     
     return leiloes_finalizados
 
+def arquivar_historico():
+    """
+    Move para a camada fria (utils/arquivamento.py) os leilões
+    finalizados há mais de RETENCAO_DIAS. Uma falha só é registrada:
+    o arquivamento é retomado na próxima rodada.
+    """
+    try:
+        arquivados = arquivamento.arquivar_finalizados()
+    except Exception:
+        log.exception("falha no arquivamento")
+        return 0
+    
+    if arquivados:
+        log.info("leilões arquivados", extra={
+            "arquivados": arquivados, "retencao_dias": arquivamento.RETENCAO_DIAS
+        })
+    return arquivados
+
+def compactar_historico():
+    """
+    Regrava o histórico de lances sem linhas ilegíveis deixadas por
+    escritas interrompidas (só quando há alguma). Uma falha só é registrada.
+    """
+    try:
+        descartadas = compactar_log("lances.json")
+    except Exception:
+        log.exception("falha na compactação do histórico")
+        return 0
+    if descartadas:
+        log.warning("histórico de lances compactado", extra={"linhas_descartadas": descartadas})
+    return descartadas
+
+def reconciliar_reservas():
+    """
+    Corrige as reservas de saldo deixadas por quedas do processador ou do
+    finalizador (ver utils/reservas.py). Uma falha só é registrada.
+    """
+    try:
+        corrigidas = reservas.reconciliar()
+    except Exception:
+        log.exception("falha na reconciliação de reservas")
+        return
+    if corrigidas["liberadas"] or corrigidas["liquidadas"]:
+        log.warning("reservas reconciliadas", extra=corrigidas)
+
+# ==================== AGENDA DE EXPIRAÇÃO ====================
+
+def prazo_do_leilao(leilao):
+    """Instante (epoch) em que o leilão expira"""
+    return datetime.fromisoformat(leilao['data_fim']).timestamp()
+
+def montar_agenda(leiloes):
+    """
+    Monta a agenda (heap de (prazo, leilao_id)) com os leilões ativos.
+    O topo é sempre o próximo leilão a expirar.
+    """
+    agenda = [
+        (prazo_do_leilao(leilao), leilao_id)
+        for leilao_id, leilao in leiloes.items()
+        if leilao['status'] == 'ativo'
+    ]
+    heapq.heapify(agenda)
+    return agenda
+
+def agendar(agenda, evento):
+    """Inclui na agenda um leilão anunciado no canal de leilões"""
+    if evento.get('tipo') != 'leilao_criado':
+        return
+    try:
+        prazo = datetime.fromisoformat(evento['data_fim']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return
+    heapq.heappush(agenda, (prazo, evento['leilao_id']))
+
+def finalizar_vencidos(agenda):
+    """
+    Retira da agenda e finaliza os leilões cujo prazo já passou.
+    Entradas repetidas ou já finalizadas são ignoradas; os que seguem em
+    conflito voltam à agenda daqui a REAGENDAR_CONFLITO_SEGUNDOS.
+    """
+    agora = time.time()
+    vencidos = {}
+    
+    while agenda and agenda[0][0] <= agora:
+        _, leilao_id = heapq.heappop(agenda)
+        leilao = buscar_leilao(leilao_id)
+        if leilao is None or leilao['status'] != 'ativo':
+            continue
+        vencidos[leilao_id] = leilao
+    
+    # Leilões que terminam no mesmo instante são finalizados num só commit
+    finalizados, pendentes = _finalizar_leiloes(vencidos)
+    # Ainda em conflito (lances chegando no prazo): tenta de novo em
+    # breve, em vez de esperar a ressincronização
+    for leilao_id in pendentes:
+        heapq.heappush(agenda, (time.time() + REAGENDAR_CONFLITO_SEGUNDOS, leilao_id))
+    return finalizados
+
+def executar_agendador():
+    """
+    Finaliza cada leilão no instante do seu data_fim.
+    
+    Dorme até o próximo prazo da agenda e acorda antes se a API anunciar
+    um leilão novo; ocioso, não lê nenhum arquivo (a não ser na
+    ressincronização a cada RESSINCRONIZAR_SEGUNDOS e na manutenção a
+    cada INTERVALO_ARQUIVAMENTO: reconciliação, arquivamento e compactação).
+    """
+    with notificacao.assinar(CANAL_LEILOES) as assinatura:
+        # Assina antes de ler o arquivo para não perder leilões criados no meio
+        agenda = montar_agenda(leiloes_ativos())
+        proxima_ressincronizacao = time.monotonic() + RESSINCRONIZAR_SEGUNDOS
+        proximo_arquivamento = time.monotonic()
+        log.info("agenda montada", extra={"leiloes_ativos": len(agenda)})
+        
+        while True:
+            finalizar_vencidos(agenda)
+            
+            if time.monotonic() >= proxima_ressincronizacao:
+                agenda = montar_agenda(leiloes_ativos())
+                proxima_ressincronizacao = time.monotonic() + RESSINCRONIZAR_SEGUNDOS
+                continue
+            
+            if time.monotonic() >= proximo_arquivamento:
+                reconciliar_reservas()
+                arquivar_historico()
+                compactar_historico()
+                proximo_arquivamento = time.monotonic() + INTERVALO_ARQUIVAMENTO
+                continue
+            
+            espera = min(proxima_ressincronizacao, proximo_arquivamento) - time.monotonic()
+            if agenda:
+                espera = min(espera, agenda[0][0] - time.time())
+            
+            evento = assinatura.receber(max(espera, 0))
+            while evento is not None:
+                agendar(agenda, evento)
+                evento = assinatura.receber(0)
+
 def executar_finalizador(modo='continuo'):
     """
     Executa o finalizador de leilões.
     
     Modos:
-    - 'continuo': executa a cada 10 segundos indefinidamente
+    - 'continuo': finaliza cada leilão no momento em que expira
     - 'unico': executa uma vez e encerra
     """
-    print("=" * 60)
-    print("⚡ LAMBDA 2 - FINALIZADOR DE LEILÕES")
-    print("=" * 60)
+    logs.configurar()
+    log.info("finalizador iniciado", extra={
+        "modo": modo, "metricas": metricas.iniciar_exportacao()
+    })
     
     if modo == 'continuo':
-        print("Modo: Execução contínua (a cada 10 segundos)")
-        print("Pressione Ctrl+C para parar\n")
-        
         try:
-            while True:
-                verificar_leiloes_expirados()
-                print("\n⏳ Aguardando 10 segundos...\n")
-                time.sleep(10)
+            executar_agendador()
         
         except KeyboardInterrupt:
-            print("\n\n🛑 Finalizador parado pelo usuário")
+            log.info("finalizador parado pelo usuário")
     
     else:
-        print("Modo: Execução única\n")
         verificar_leiloes_expirados()
-        print("\n✓ Execução concluída")
+        reconciliar_reservas()
+        arquivar_historico()
+        compactar_historico()
 
 def executar_agora():
     """
     Executa uma verificação imediata (útil para testes)
     """
-    print("⚡ Executando verificação imediata...")
+    logs.configurar()
     verificar_leiloes_expirados()
 
 if __name__ == "__main__":
@@ -3,120 +3,595 @@ Lambda 1: Processador de Lances
 Consome mensagens da fila SQS, valida e processa lances
 """
 
+import copy
 import sys
 import os
+import queue
 import time
+import zlib
+from collections import ChainMap
 from datetime import datetime
 
 # Adiciona o diretório raiz ao path para importar utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.storage import (
-    consumir_fila, adicionar_lance, 
-    atualizar_leilao, ler_json
+    adicionar_lances, atualizar_se_versao, lances_do_leilao, ler_json,
+    versao_do_registro, TENTATIVAS_CAS
 )
 from utils.validadores import validar_lance_completo
+from utils import fila, logs, metricas, notificacao, reservas
 
-def processar_lance(mensagem):
+# Espera máxima de cada long polling na fila (segundos). A espera acaba
+# antes assim que uma mensagem chega, então o valor não adiciona latência.
+TEMPO_ESPERA_FILA = 20
+
+# Máximo de mensagens aplicadas de uma vez no modo em lote
+TAMANHO_LOTE = 100
+
+# Quantidade padrão de workers no modo paralelo
+WORKERS = os.cpu_count() or 2
+# Espera máxima pelos workers ao encerrar o modo paralelo (segundos)
+TEMPO_ENCERRAMENTO = 5
+
+# Canal dos eventos de preço (stream SSE da API)
+CANAL_PRECOS = "precos"
+
+log = logs.obter("processador")
+# Linhas por lance: amostradas (LEILAO_LOG_AMOSTRAGEM)
+log_lances = logs.obter("lances")
+
+LANCES = metricas.contador(
+    "leilao_processador_lances_total",
+    "Lances por resultado (processado, rejeitado, duplicado, erro)")
+DURACAO_LOTE = metricas.histograma(
+    "leilao_processador_lote_segundos", "Tempo para processar e gravar um lote")
+
+def publicar_lances(lances):
+    """Avisa os streams em tempo real da API sobre os lances aceitos"""
+    eventos = [
+        {
+            "tipo": "lance",
+            "leilao_id": lance["leilao_id"],
+            "preco_atual": lance["valor"],
+            "lance": {
+                chave: lance[chave]
+                for chave in ("id", "usuario_id", "valor", "data_hora")
+            }
+        }
+        for lance in lances if lance["status"] == "processado"
+    ]
+    if eventos:
+        notificacao.publicar_varios(CANAL_PRECOS, eventos)
+
+# ==================== DEDUPLICAÇÃO ====================
+
+def corpos_recebidos(recebidas):
+    """Corpos das mensagens recebidas; as reentregas levam reentrega=True"""
+    return [
+        dict(recebida['corpo'], reentrega=True) if recebida['recebimentos'] > 1
+        else recebida['corpo']
+        for recebida in recebidas
+    ]
+
+def lance_no_historico(mensagem):
+    """Se o lance da mensagem já está no histórico do leilão"""
+    if mensagem.get('tipo') != 'novo_lance':
+        return False
+    lance_id = f"lance_{mensagem['mensagem_id']}"
+    return any(lance['id'] == lance_id
+               for lance in lances_do_leilao(mensagem['dados']['leilao_id']))
+
+def separar_repetidas(mensagens):
     """
-    Processa uma mensagem de lance da fila.
-    Valida e atualiza os dados se válido.
+    Separa as mensagens já aplicadas das novas: chave marcada no índice
+    de deduplicação da fila, cópia de outra mensagem do lote ou, numa
+    reentrega, lance já gravado no histórico (queda entre a gravação e
+    a marcação). Retorna (novas, repetidas).
     """
-    print(f"\n📨 Processando mensagem: {mensagem['mensagem_id']}")
+    por_chave = {}
+    repetidas = []
+    for mensagem in mensagens:
+        chave = fila.chave_deduplicacao(mensagem)
+        if chave in por_chave:
+            repetidas.append(mensagem)
+        else:
+            por_chave[chave] = mensagem
     
-    dados = mensagem['dados']
-    leilao_id = dados['leilao_id']
-    usuario_id = dados['usuario_id']
-    valor = dados['valor']
+    aplicadas = fila.chaves_aplicadas(list(por_chave))
+    novas = []
+    for chave, mensagem in por_chave.items():
+        if chave in aplicadas or (mensagem.get('reentrega') and lance_no_historico(mensagem)):
+            repetidas.append(mensagem)
+        else:
+            novas.append(mensagem)
     
-    # Valida o lance completamente
-    valido, mensagem_validacao = validar_lance_completo(leilao_id, usuario_id, valor)
+    if repetidas:
+        LANCES.inc(len(repetidas), resultado="duplicado")
+        log.info("mensagens repetidas ignoradas", extra={
+            "mensagem_ids": [m.get('mensagem_id') for m in repetidas]
+        })
+    return novas, repetidas
+
+def processar_lance(mensagem):
+    """
+    Processa uma mensagem de lance da fila: um lote de uma mensagem só
+    (mesma validação, reserva de saldo e compare-and-set de processar_lote).
+
+    Retorna True (processado), False (rejeitado) ou None se a mensagem
+    já tinha sido aplicada.
+    """
+    processados, rejeitados = processar_lote([mensagem])
+    if processados + rejeitados == 0:
+        return None
+    return processados == 1
+
+def _ler_uma_vez(documento, lidos, chave):
+    """
+    Copia o registro para `lidos` na primeira vez que o lote o toca. As
+    validações e o compare-and-set usam essa cópia: o documento pode ser
+    uma visão viva (backend SQLite) ou o cache compartilhado entre threads.
+    """
+    if chave not in lidos:
+        registro = documento.get(chave)
+        if registro is not None:
+            lidos[chave] = copy.deepcopy(registro)
+
+def aplicar_mensagens(mensagens, usuarios, leiloes):
+    """
+    Valida as mensagens (já em ordem) sobre o estado em memória, sem
+    gravar nada. Um lance posterior já enxerga o preco_atual elevado
+    pelos anteriores e o saldo reservado por eles; quem é superado no
+    próprio lote tem a reserva liberada na hora, como no modo unitário.
+
+    Retorna (lances, alterados, leiloes_lidos, usuarios_lidos): os
+    lances com status, os leilões alterados {leilao_id: leilao} e as
+    cópias dos registros como estavam na validação, base do
+    compare-and-set.
+    """
+    # Leilões e usuários alterados ficam numa camada por cima das cópias
+    # lidas; os documentos compartilhados só mudam no commit
+    leiloes_lidos = {}
+    usuarios_lidos = {}
+    alterados = {}
+    leiloes_lote = ChainMap(alterados, leiloes_lidos)
+    usuarios_lote = ChainMap({}, usuarios_lidos)
+    lances = []
     
-    if not valido:
-        print(f"❌ Lance rejeitado: {mensagem_validacao}")
-        # Registra lance como rejeitado
+    for mensagem in mensagens:
+        dados = mensagem['dados']
+        leilao_id = dados['leilao_id']
+        usuario_id = dados['usuario_id']
+        valor = dados['valor']
+        
+        _ler_uma_vez(leiloes, leiloes_lidos, leilao_id)
+        _ler_uma_vez(usuarios, usuarios_lidos, usuario_id)
+        
+        valido, mensagem_validacao = validar_lance_completo(
+            leilao_id, usuario_id, valor, usuarios_lote, leiloes_lote
+        )
+        
         lance = {
             "id": f"lance_{mensagem['mensagem_id']}",
             "leilao_id": leilao_id,
             "usuario_id": usuario_id,
             "valor": valor,
             "data_hora": mensagem['timestamp'],
-            "status": "rejeitado",
-            "motivo": mensagem_validacao
+            "status": "processado" if valido else "rejeitado"
         }
-        adicionar_lance(lance)
-        return False
+        
+        if not valido:
+            lance["motivo"] = mensagem_validacao
+        else:
+            anterior = leiloes_lote[leilao_id]
+            lider_id = anterior.get('lider_id')
+            if lider_id and anterior.get('lance_lider_id'):
+                _ler_uma_vez(usuarios, usuarios_lidos, lider_id)
+                lider = usuarios_lote.get(lider_id)
+                campos = lider and reservas.sem_reservas(lider, [anterior['lance_lider_id']])
+                if campos:
+                    usuarios_lote[lider_id] = dict(lider, **campos)
+            
+            alterados[leilao_id] = dict(anterior, preco_atual=valor,
+                                        lider_id=usuario_id, lance_lider_id=lance["id"])
+            usuario = usuarios_lote[usuario_id]
+            usuarios_lote[usuario_id] = dict(
+                usuario, **reservas.com_reservas(usuario, [(lance["id"], leilao_id, valor)])
+            )
+        
+        lances.append(lance)
     
-    # Lance válido - processa
-    print(f"✅ Lance válido! Processando...")
-    
-    # Adiciona lance ao histórico
-    lance = {
-        "id": f"lance_{mensagem['mensagem_id']}",
-        "leilao_id": leilao_id,
-        "usuario_id": usuario_id,
-        "valor": valor,
-        "data_hora": mensagem['timestamp'],
-        "status": "processado"
-    }
-    adicionar_lance(lance)
+    return lances, alterados, leiloes_lidos, usuarios_lidos
+
+def gravar_lote(alterados, leiloes_lidos, usuarios_lidos):
+    """
+    Grava os leilões alterados por um lote e as reservas de saldo dos
+    seus líderes, em três passos com compare-and-set contra os registros
+    lidos na validação (aplicar_mensagens):
+
+    1. reserva o valor para o líder final de cada leilão (os líderes
+       intermediários do lote já foram superados);
+    2. grava os leilões cujas reservas entraram;
+    3. libera a reserva do líder anterior de cada leilão gravado e as
+       do passo 1 cujos leilões não puderam ser gravados.
+
+    Reservar antes de gravar o leilão impede que dois leilões gastem o
+    mesmo saldo; uma queda no meio deixa reservas sobrando, corrigidas
+    por reservas.reconciliar. Retorna os leilões em conflito (a validar
+    de novo sobre o estado atual).
+    """
+    novas = {}
+    for leilao_id, leilao in alterados.items():
+        novas.setdefault(leilao['lider_id'], []).append(
+            (leilao['lance_lider_id'], leilao_id, leilao['preco_atual']))
+    sem_reserva = set(atualizar_se_versao("usuarios.json", {
+        usuario_id: (versao_do_registro(usuarios_lidos[usuario_id]),
+                     reservas.com_reservas(usuarios_lidos[usuario_id], lances))
+        for usuario_id, lances in novas.items()
+    }))
+    
+    conflitos = {lid for lid, leilao in alterados.items() if leilao['lider_id'] in sem_reserva}
+    conflitos.update(atualizar_se_versao("leiloes.json", {
+        leilao_id: (versao_do_registro(leiloes_lidos[leilao_id]), {
+            campo: leilao[campo] for campo in ("preco_atual", "lider_id", "lance_lider_id")
+        })
+        for leilao_id, leilao in alterados.items() if leilao_id not in conflitos
+    }))
+    
+    liberacoes = {}
+    for leilao_id, leilao in alterados.items():
+        if leilao['lider_id'] in sem_reserva:
+            continue
+        # Leilão gravado: o líder anterior foi superado; em conflito: desfaz a reserva nova
+        anterior = leiloes_lidos[leilao_id]
+        lider_id, lance_id = (
+            (leilao['lider_id'], leilao['lance_lider_id']) if leilao_id in conflitos
+            else (anterior.get('lider_id'), anterior.get('lance_lider_id'))
+        )
+        if lance_id:
+            liberacoes.setdefault(lider_id, []).append(lance_id)
+    reservas.liberar(liberacoes)
     
-    # Atualiza preço atual do leilão
-    atualizar_leilao(leilao_id, {"preco_atual": valor})
+    return conflitos
+
+def processar_lote(mensagens):
+    """
+    Processa um lote de mensagens de lance com uma única carga de estado
+    e um único commit por arquivo.
+
+    As mensagens são aplicadas em ordem de timestamp sobre o estado em
+    memória. Leilões e reservas de saldo são gravados com compare-and-set
+    (gravar_lote): os leilões que outro processo alterou desde a leitura
+    (ex.: finalizados no meio do lote), ou cujo líder teve o saldo
+    alterado, têm os seus lances validados de novo sobre o estado atual;
+    os demais não esperam por eles. Mensagens já aplicadas são ignoradas
+    (separar_repetidas). Retorna (processados, rejeitados).
+    """
+    mensagens, repetidas = separar_repetidas(mensagens)
+    if not mensagens:
+        fila.marcar_aplicadas(repetidas)
+        return 0, 0
     
-    # Busca informações para log
     usuarios = ler_json("usuarios.json")
     leiloes = ler_json("leiloes.json")
-    usuario = usuarios.get(usuario_id, {})
-    leilao = leiloes.get(leilao_id, {})
     
-    print(f"💰 Novo lance: R$ {valor:.2f}")
-    print(f"   Usuário: {usuario.get('nome', usuario_id)}")
-    print(f"   Leilão: {leilao.get('titulo', leilao_id)}")
+    pendentes = sorted(
+        (m for m in mensagens if m['tipo'] == 'novo_lance'),
+        key=lambda m: m['timestamp']
+    )
+    lances = []
+    gravados = {}
     
-    return True
+    for _ in range(TENTATIVAS_CAS):
+        lances_tentativa, alterados, leiloes_lidos, usuarios_lidos = aplicar_mensagens(
+            pendentes, usuarios, leiloes)
+        conflitos = gravar_lote(alterados, leiloes_lidos, usuarios_lidos)
+        
+        lances.extend(l for l in lances_tentativa if l['leilao_id'] not in conflitos)
+        gravados.update((lid, l) for lid, l in alterados.items() if lid not in conflitos)
+        if not conflitos:
+            break
+        
+        log.info("conflito de versão, revalidando", extra={"leiloes": sorted(conflitos)})
+        pendentes = [m for m in pendentes if m['dados']['leilao_id'] in conflitos]
+        usuarios = ler_json("usuarios.json")
+        leiloes = ler_json("leiloes.json")
+    else:
+        # Disputa persistente: os lances restantes são rejeitados (e
+        # confirmados) em vez de voltarem à fila depois de parte do lote gravada
+        for lance in lances_tentativa:
+            if lance['leilao_id'] not in conflitos:
+                continue
+            if lance['status'] == 'processado':
+                lance.update(status="rejeitado", motivo="Conflito de atualização do leilão")
+            lances.append(lance)
+    
+    # Histórico: um único append com todos os lances do lote
+    adicionar_lances(lances)
+    # Marca depois de gravar e antes da confirmação na fila
+    fila.marcar_aplicadas(mensagens + repetidas)
+    publicar_lances(lances)
+    
+    processados = sum(1 for lance in lances if lance['status'] == 'processado')
+    rejeitados = len(lances) - processados
+    
+    log.info("lote processado", extra={
+        "mensagens": len(mensagens), "processados": processados, "rejeitados": rejeitados
+    })
+    for lance in lances:
+        if lance['status'] == 'rejeitado':
+            log_lances.info("lance rejeitado", extra={
+                "lance_id": lance['id'], "leilao_id": lance['leilao_id'],
+                "usuario_id": lance['usuario_id'], "valor": lance['valor'],
+                "motivo": lance['motivo']
+            })
+    for leilao_id, leilao in gravados.items():
+        log_lances.info("preço atualizado", extra={
+            "leilao_id": leilao_id, "preco_atual": leilao['preco_atual']
+        })
+    
+    return processados, rejeitados
 
-def executar_processamento():
+def receber_lote(tamanho):
     """
-    Função principal que executa continuamente,
-    consumindo e processando mensagens da fila.
+    Recebe até `tamanho` mensagens: espera (long polling) pela primeira
+    leva e depois junta o que já estiver visível, sem esperar mais.
     """
-    print("=" * 60)
-    print("⚡ LAMBDA 1 - PROCESSADOR DE LANCES")
-    print("=" * 60)
-    print("Aguardando mensagens na fila...")
-    print("Pressione Ctrl+C para parar\n")
+    recebidas = fila.receber(
+        max_mensagens=fila.MAX_MENSAGENS_POR_LOTE,
+        tempo_espera=TEMPO_ESPERA_FILA
+    )
     
-    total_processados = 0
-    total_rejeitados = 0
+    while recebidas and len(recebidas) < tamanho:
+        mais = fila.receber(
+            max_mensagens=min(fila.MAX_MENSAGENS_POR_LOTE, tamanho - len(recebidas))
+        )
+        if not mais:
+            break
+        recebidas.extend(mais)
+    
+    return recebidas
+
+def novas_estatisticas(workers):
+    """Contadores por worker: {indice: {processados, rejeitados, erros}}"""
+    return {
+        indice: {"processados": 0, "rejeitados": 0, "erros": 0}
+        for indice in range(workers)
+    }
+
+def registrar_resultado(estatisticas, indice, processados, rejeitados, erros, duracao=None):
+    """Soma o resultado de um lote aos contadores do worker e às métricas"""
+    estatisticas[indice]["processados"] += processados
+    estatisticas[indice]["rejeitados"] += rejeitados
+    estatisticas[indice]["erros"] += erros
+    LANCES.inc(processados, resultado="processado")
+    LANCES.inc(rejeitados, resultado="rejeitado")
+    LANCES.inc(erros, resultado="erro")
+    if duracao is not None:
+        DURACAO_LOTE.observar(duracao)
+
+def relatar_estatisticas(estatisticas):
+    """Registra os totais acumulados (e os de cada worker, no modo paralelo)"""
+    campos = {
+        chave: sum(c[chave] for c in estatisticas.values())
+        for chave in ("processados", "rejeitados", "erros")
+    }
+    if len(estatisticas) > 1:
+        campos["por_worker"] = estatisticas
+    log.info("estatísticas", extra=campos)
+
+def particao_do_leilao(leilao_id, workers):
+    """Worker responsável por um leilão (estável entre execuções)"""
+    return zlib.crc32(leilao_id.encode('utf-8')) % workers
+
+def executar_worker(indice, entrada, resultados):
+    """
+    Laço de um worker do modo paralelo: recebe sub-lotes (sempre dos
+    mesmos leilões), processa, confirma na fila e devolve os contadores.
+
+    Um sub-lote com erro volta à fila após o visibility timeout. Até ele
+    ser reentregue a partição fica retida: os sub-lotes seguintes também
+    voltam à fila, para reaparecer junto com ele, sem ultrapassá-lo (a
+    ordem dos lances de cada leilão é preservada).
+    """
+    # Ids do sub-lote com erro e até quando esperar pela reentrega
+    # (depois disso ele pode ter ido para a DLQ)
+    retidas = set()
+    retida_ate = 0.0
+    while True:
+        recebidas = entrada.get()
+        if recebidas is None:
+            return
+        
+        if retidas:
+            if any(recebida['id'] in retidas for recebida in recebidas) \
+                    or time.monotonic() >= retida_ate:
+                retidas = set()
+            else:
+                restante = retida_ate - time.monotonic()
+                for recebida in recebidas:
+                    fila.alterar_visibilidade(recebida['recibo'], restante)
+                log.info("partição retida, mensagens devolvidas à fila", extra={
+                    "worker": indice, "mensagens": len(recebidas)
+                })
+                continue
+        
+        inicio = time.perf_counter()
+        try:
+            processados, rejeitados = processar_lote(corpos_recebidos(recebidas))
+        except Exception:
+            # Sem confirmação: as mensagens voltam após o visibility timeout
+            log.exception("erro ao processar lote", extra={
+                "worker": indice, "mensagens": len(recebidas)
+            })
+            resultados.put((indice, 0, 0, len(recebidas), None))
+            retidas = {recebida['id'] for recebida in recebidas}
+            retida_ate = time.monotonic() + fila.VISIBILIDADE_PADRAO
+            continue
+        
+        fila.confirmar_lote([recebida['recibo'] for recebida in recebidas])
+        resultados.put((indice, processados, rejeitados, 0, time.perf_counter() - inicio))
+
+def executar_worker_em_processo(indice, entrada, resultados):
+    """
+    Worker em processo separado. Os totais voltam ao processo principal
+    pelos resultados; as métricas internas (storage, validadores) só são
+    exportadas se LEILAO_METRICAS_ARQUIVO tiver {pid} (um arquivo por worker).
+    """
+    logs.configurar()
+    if "{pid}" in os.environ.get("LEILAO_METRICAS_ARQUIVO", ""):
+        metricas.iniciar_arquivo(os.environ["LEILAO_METRICAS_ARQUIVO"].format(pid=os.getpid()))
+    executar_worker(indice, entrada, resultados)
+
+def executar_paralelo(workers, tamanho_lote, usar_processos, estatisticas):
+    """
+    Distribui as mensagens entre `workers` workers particionando por
+    leilao_id: cada leilão é sempre tratado pelo mesmo worker, o que
+    preserva a ordem dos lances e a regra de incremento mínimo, enquanto
+    leilões diferentes são processados em paralelo.
+    """
+    if usar_processos:
+        import multiprocessing
+        Fila, Executor = multiprocessing.Queue, multiprocessing.Process
+        alvo = executar_worker_em_processo
+    else:
+        import threading
+        Fila, Executor = queue.Queue, threading.Thread
+        alvo = executar_worker
+    
+    # Filas limitadas: se um worker atrasa, o despacho espera em vez de
+    # segurar mensagens além do visibility timeout
+    entradas = [Fila(maxsize=2) for _ in range(workers)]
+    resultados = Fila()
+    executores = [
+        Executor(target=alvo, args=(indice, entradas[indice], resultados),
+                 daemon=True)
+        for indice in range(workers)
+    ]
+    for executor in executores:
+        executor.start()
     
     try:
         while True:
-            # Consome todas as mensagens da fila
-            mensagens = consumir_fila()
+            mensagens = receber_lote(tamanho_lote)
             
             if mensagens:
-                print(f"\n🔔 {len(mensagens)} nova(s) mensagem(ns) na fila")
+                log.debug("mensagens recebidas", extra={"quantidade": len(mensagens)})
+                particoes = {}
+                for recebida in mensagens:
+                    leilao_id = recebida['corpo'].get('dados', {}).get('leilao_id', '')
+                    particoes.setdefault(particao_do_leilao(leilao_id, workers), []).append(recebida)
                 
-                for mensagem in mensagens:
-                    if mensagem['tipo'] == 'novo_lance':
-                        sucesso = processar_lance(mensagem)
-                        if sucesso:
-                            total_processados += 1
-                        else:
-                            total_rejeitados += 1
+                for indice, recebidas in particoes.items():
+                    entradas[indice].put(recebidas)
+            
+            # Junta os resultados já devolvidos pelos workers
+            atualizou = False
+            while True:
+                try:
+                    resultado = resultados.get_nowait()
+                except queue.Empty:
+                    break
+                registrar_resultado(estatisticas, *resultado)
+                atualizou = True
+            
+            if atualizou:
+                relatar_estatisticas(estatisticas)
+    finally:
+        # Um worker travado (fila de entrada cheia) não segura o encerramento
+        prazo = time.monotonic() + TEMPO_ENCERRAMENTO
+        for entrada in entradas:
+            try:
+                entrada.put(None, timeout=max(prazo - time.monotonic(), 0.01))
+            except queue.Full:
+                pass
+        for executor in executores:
+            executor.join(timeout=max(prazo - time.monotonic(), 0))
+
+def executar_processamento(modo='lote', tamanho_lote=TAMANHO_LOTE,
+                           workers=WORKERS, usar_processos=False):
+    """
+    Função principal que executa continuamente,
+    consumindo e processando mensagens da fila.
+    
+    Modos:
+    - 'lote': aplica até tamanho_lote mensagens por commit (padrão)
+    - 'unitario': processa e grava uma mensagem por vez
+    - 'paralelo': `workers` workers (threads ou processos), particionados por leilão
+    """
+    logs.configurar()
+    log.info("processador iniciado", extra={
+        "modo": modo,
+        "workers": workers if modo == 'paralelo' else 1,
+        "metricas": metricas.iniciar_exportacao()
+    })
+    
+    estatisticas = novas_estatisticas(workers if modo == 'paralelo' else 1)
+    
+    try:
+        if modo == 'paralelo':
+            executar_paralelo(workers, tamanho_lote, usar_processos, estatisticas)
+        
+        while True:
+            # Long polling: bloqueia até chegar mensagem ou esgotar a espera
+            mensagens = receber_lote(tamanho_lote if modo == 'lote' else 1)
+            
+            if mensagens and modo == 'lote':
+                log.debug("mensagens recebidas", extra={"quantidade": len(mensagens)})
+                inicio = time.perf_counter()
+                try:
+                    processados, rejeitados = processar_lote(corpos_recebidos(mensagens))
+                except Exception:
+                    # Sem confirmação: o lote volta à fila após o visibility timeout
+                    log.exception("erro ao processar lote", extra={"mensagens": len(mensagens)})
+                    registrar_resultado(estatisticas, 0, 0, 0, len(mensagens))
+                    continue
                 
-                print(f"\n📊 Estatísticas:")
-                print(f"   Processados: {total_processados}")
-                print(f"   Rejeitados: {total_rejeitados}")
+                fila.confirmar_lote([recebida['recibo'] for recebida in mensagens])
+                registrar_resultado(estatisticas, 0, processados, rejeitados, 0,
+                                    time.perf_counter() - inicio)
+                relatar_estatisticas(estatisticas)
             
-            # Aguarda 2 segundos antes de verificar novamente
-            time.sleep(2)
+            elif mensagens:
+                log.debug("mensagens recebidas", extra={"quantidade": len(mensagens)})
+                
+                for recebida, mensagem in zip(mensagens, corpos_recebidos(mensagens)):
+                    try:
+                        if mensagem['tipo'] == 'novo_lance':
+                            sucesso = processar_lance(mensagem)
+                            if sucesso is not None:
+                                registrar_resultado(estatisticas, 0, int(sucesso), int(not sucesso), 0)
+                    except Exception:
+                        # Sem confirmação: a mensagem volta à fila após o
+                        # visibility timeout e vai para a DLQ se falhar sempre
+                        log.exception("erro ao processar mensagem", extra={"mensagem_id": recebida['id']})
+                        registrar_resultado(estatisticas, 0, 0, 0, 1)
+                        continue
+                    
+                    fila.confirmar(recebida['recibo'])
+                
+                relatar_estatisticas(estatisticas)
             
     except KeyboardInterrupt:
-        print("\n\n🛑 Processador finalizado pelo usuário")
-        print(f"Total processado: {total_processados} lances")
-        print(f"Total rejeitado: {total_rejeitados} lances")
+        log.info("processador parado pelo usuário")
+        relatar_estatisticas(estatisticas)
 
 if __name__ == "__main__":
-    executar_processamento()
\ No newline at end of file
+    # Verifica argumentos de linha de comando
+    if len(sys.argv) > 1:
+        if sys.argv[1] == '--unitario' or sys.argv[1] == '-u':
+            executar_processamento('unitario')
+        elif (sys.argv[1] == '--lote' or sys.argv[1] == '-l') and len(sys.argv) > 2:
+            executar_processamento('lote', int(sys.argv[2]))
+        elif (sys.argv[1] == '--workers' or sys.argv[1] == '-w') and len(sys.argv) > 2:
+            executar_processamento('paralelo', workers=int(sys.argv[2]),
+                                   usar_processos='--processos' in sys.argv)
+        else:
+            print("Uso:")
+            print("  python lambda_processador.py                        (modo em lote)")
+            print("  python lambda_processador.py --lote N               (lotes de até N mensagens)")
+            print("  python lambda_processador.py --unitario             (uma mensagem por vez)")
+            print("  python lambda_processador.py --workers N            (N threads, particionado por leilão)")
+            print("  python lambda_processador.py --workers N --processos (N processos)")
+    else:
+        executar_processamento()
\ No newline at end of file
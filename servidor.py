@@ -0,0 +1,262 @@
+"""
+Servidor de produção da API (WSGI, pré-fork).
+
+O processo principal importa o app, abre o socket, aquece os caches do
+storage e cria WORKERS processos com fork; cada worker atende com até
+THREADS requisições simultâneas (servidor WSGI do Werkzeug, que vem com
+o Flask, em HTTP/1.1). Os caches aquecidos antes do fork são herdados
+pelos workers. Entre processos, as escritas são coordenadas pelas
+travas de arquivo do utils.storage (fcntl/msvcrt) e pelas transações
+SQLite da fila.
+
+SIGTERM ou SIGINT (Ctrl+C) encerram com calma: os workers param de
+aceitar conexões, fecham os streams SSE e esperam as requisições em
+andamento por até TEMPO_ENCERRAMENTO segundos. Um worker que morre é recriado.
+
+    python servidor.py [--workers N] [--threads N] [--host H] [--porta P]
+
+Padrões pelas variáveis LEILAO_WORKERS, LEILAO_THREADS, LEILAO_HOST e
+LEILAO_PORTA. Sem fork (Windows), roda um único processo com threads.
+"""
+
+import argparse
+import itertools
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+from app import app, PRECOS
+from utils import fila, logs, storage
+
+WORKERS = int(os.environ.get("LEILAO_WORKERS", os.cpu_count() or 2))
+# Requisições simultâneas por worker (streams SSE ocupam uma cada)
+THREADS = int(os.environ.get("LEILAO_THREADS", "32"))
+HOST = os.environ.get("LEILAO_HOST", "0.0.0.0")
+PORTA = int(os.environ.get("LEILAO_PORTA", "5000"))
+# Espera máxima pelas requisições em andamento no encerramento (segundos)
+TEMPO_ENCERRAMENTO = 10
+# Conexão keep-alive sem atividade é fechada após N segundos (acima do
+# heartbeat do stream SSE, que escreve a cada 15 s)
+TEMPO_OCIOSO = 30
+# Fila de conexões do socket compartilhado
+BACKLOG = 1024
+# Sem vaga livre, o laço de accept confere o encerramento a cada N segundos
+INTERVALO_VAGA = 0.5
+
+log = logs.obter("servidor")
+
+# ==================== WORKER ====================
+
+class _Manipulador(WSGIRequestHandler):
+    timeout = TEMPO_OCIOSO
+
+    def log_request(self, *args, **kwargs):
+        # Acessos já são contados em /metrics; erros continuam no log
+        pass
+
+class ServidorWSGI(ThreadedWSGIServer):
+    """
+    Servidor WSGI com uma thread por requisição, limitado a `threads`
+    simultâneas: no limite, o laço de accept espera e as conexões novas
+    aguardam no backlog do socket.
+    """
+
+    def __init__(self, host, porta, app, threads, fd=None):
+        super().__init__(host, porta, app, handler=_Manipulador, fd=fd)
+        self._vagas = threading.BoundedSemaphore(threads)
+        self._em_andamento = 0
+        self._condicao = threading.Condition()
+        self.encerrando = threading.Event()
+
+    def encerrar(self):
+        """
+        Para de aceitar conexões. Chamar fora do laço de serve_forever:
+        shutdown() espera por ele.
+        """
+        self.encerrando.set()
+        self.shutdown()
+
+    def process_request(self, request, client_address):
+        # Espera por uma vaga sem ficar surdo ao encerramento (com todas
+        # as vagas em streams SSE, a espera não teria fim)
+        while not self._vagas.acquire(timeout=INTERVALO_VAGA):
+            if self.encerrando.is_set():
+                self.shutdown_request(request)
+                return
+        with self._condicao:
+            self._em_andamento += 1
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._liberar()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._liberar()
+
+    def _liberar(self):
+        with self._condicao:
+            self._em_andamento -= 1
+            self._condicao.notify_all()
+        self._vagas.release()
+
+    def aguardar_requisicoes(self, prazo):
+        """Espera as requisições em andamento; retorna quantas sobraram"""
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._em_andamento == 0, timeout=prazo)
+            return self._em_andamento
+
+def executar_worker(indice, ouvinte, threads):
+    """Laço de um worker: atende pelo socket herdado até SIGTERM/SIGINT"""
+    logs.configurar()
+    host, porta = ouvinte.getsockname()[:2]
+    servidor = ServidorWSGI(host, porta, app, threads, fd=ouvinte.fileno())
+    parada = threading.Event()
+
+    def encerrar():
+        # Streams SSE abertos terminam já (o cliente reconecta em outro
+        # processo) e devolvem as suas vagas ao laço de accept
+        PRECOS.encerrar()
+        servidor.encerrar()
+
+    def parar(sinal, quadro):
+        # O sinal chega na thread do laço de serve_forever: encerra em outra
+        if not parada.is_set():
+            parada.set()
+            threading.Thread(target=encerrar, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, parar)
+    signal.signal(signal.SIGINT, parar)
+
+    log.info("worker iniciado", extra={"worker": indice, "pid": os.getpid(), "threads": threads})
+    servidor.serve_forever()
+    servidor.server_close()
+    # Streams aceitos enquanto o encerramento começava
+    PRECOS.encerrar()
+    restantes = servidor.aguardar_requisicoes(TEMPO_ENCERRAMENTO)
+    log.info("worker encerrado", extra={"worker": indice, "interrompidas": restantes})
+
+# ==================== PROCESSO PRINCIPAL ====================
+
+def abrir_socket(host, porta):
+    """
+    Socket de escuta compartilhado pelos workers. Não bloqueante: quando
+    vários workers acordam para a mesma conexão, os que perdem o accept
+    voltam ao laço em vez de ficarem presos nele (e surdos ao shutdown).
+    """
+    ouvinte = socket.create_server((host, porta), backlog=BACKLOG)
+    ouvinte.set_inheritable(True)
+    ouvinte.setblocking(False)
+    return ouvinte
+
+def aquecer():
+    """
+    Carrega antes do fork o que a primeira requisição de cada worker
+    leria: documentos, contadores do /status, índice de lances e o
+    banco da fila (criação e migrações rodam uma vez só).
+    """
+    inicio = time.perf_counter()
+    storage.ler_json("usuarios.json")
+    leiloes = storage.ler_json("leiloes.json")
+    storage.contadores()
+    for leilao_id in itertools.islice(leiloes, 1):
+        storage.pagina_lances_do_leilao(leilao_id, 1)
+    fila.contar()
+    return time.perf_counter() - inicio
+
+def _interromper(sinal, quadro):
+    raise KeyboardInterrupt
+
+def _criar_worker(indice, ouvinte, threads):
+    pid = os.fork()
+    if pid:
+        return pid
+    # Processo filho: nunca volta para o laço do processo principal
+    codigo = 0
+    try:
+        executar_worker(indice, ouvinte, threads)
+    except BaseException:
+        log.exception("worker falhou", extra={"worker": indice})
+        codigo = 1
+    finally:
+        logs.encerrar()
+        os._exit(codigo)
+
+def _aguardar_workers(workers, prazo):
+    """Colhe os workers até o prazo; retorna os que não saíram"""
+    limite = time.monotonic() + prazo
+    while workers and time.monotonic() < limite:
+        for pid in list(workers):
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                del workers[pid]
+        time.sleep(0.05)
+    return workers
+
+def executar_servidor(host=HOST, porta=PORTA, workers=WORKERS, threads=THREADS):
+    """
+    Abre o socket, aquece os caches e mantém `workers` workers vivos até
+    SIGTERM/SIGINT. O processo principal não loga pelo utils.logs (que
+    usa uma thread de escrita): fica sem threads, para o fork ser seguro.
+    """
+    ouvinte = abrir_socket(host, porta)
+    duracao = aquecer()
+
+    print("=" * 50)
+    print("🚀 Sistema de Leilão Online (produção)")
+    print("=" * 50)
+    print(f"API em http://{host}:{porta}")
+    print(f"Workers: {workers} x {threads} threads | caches aquecidos em {duracao * 1000:.0f} ms")
+    print("=" * 50, flush=True)
+
+    if not hasattr(os, "fork"):
+        executar_worker(0, ouvinte, threads)
+        return
+
+    signal.signal(signal.SIGTERM, _interromper)
+    ativos = {}
+    try:
+        for indice in range(workers):
+            ativos[_criar_worker(indice, ouvinte, threads)] = (indice, time.monotonic())
+
+        while True:
+            pid, status = os.wait()
+            if pid not in ativos:
+                continue
+            indice, inicio = ativos.pop(pid)
+            print(f"⚠️ Worker {indice} (pid {pid}) saiu com status {status}; recriando",
+                  file=sys.stderr, flush=True)
+            # Worker que morre logo ao subir: espera um pouco antes de recriar
+            if time.monotonic() - inicio < 1:
+                time.sleep(1)
+            ativos[_criar_worker(indice, ouvinte, threads)] = (indice, time.monotonic())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        print("Encerrando workers...", flush=True)
+        for pid in ativos:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in _aguardar_workers(ativos, TEMPO_ENCERRAMENTO + 2):
+            os.kill(pid, signal.SIGKILL)
+        ouvinte.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de produção da API de leilões")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="processos (padrão: núcleos)")
+    parser.add_argument("--threads", type=int, default=THREADS, help="requisições simultâneas por worker")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--porta", type=int, default=PORTA)
+    argumentos = parser.parse_args()
+    executar_servidor(argumentos.host, argumentos.porta, argumentos.workers, argumentos.threads)
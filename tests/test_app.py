@@ -0,0 +1,118 @@
+"""
+API: listagens (formato original sem limit/cursor, continuidade do
+cursor e filtro por status), respostas 304 do cache HTTP e o stream SSE.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from email.utils import formatdate
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import notificacao, storage
+import app as api
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    fim = (datetime.now() + timedelta(hours=1)).isoformat()
+    for i in range(7):
+        storage.inserir_leilao(f"L{i}", {
+            "titulo": f"L{i}", "descricao": "", "preco_inicial": 100.0, "preco_atual": 100.0,
+            "data_fim": fim, "status": "ativo" if i % 2 == 0 else "finalizado",
+            "vencedor_id": None
+        })
+    yield api.app.test_client()
+    storage.limpar_cache()
+
+def _todas_as_paginas(cliente, **filtros):
+    ids, cursor = [], None
+    while True:
+        query = dict(filtros, limit=2, **({"cursor": cursor} if cursor else {}))
+        pagina = cliente.get("/leiloes", query_string=query)
+        assert pagina.status_code == 200
+        corpo = pagina.get_json()
+        assert len(corpo["leiloes"]) <= 2
+        ids.extend(corpo["leiloes"])
+        cursor = corpo["proximo_cursor"]
+        if cursor is None:
+            return ids
+
+def test_sem_limit_nem_cursor_mantem_o_formato_original(cliente):
+    resposta = cliente.get("/leiloes")
+    assert resposta.status_code == 200
+    assert sorted(resposta.get_json()) == [f"L{i}" for i in range(7)]
+    assert resposta.get_json()["L0"]["titulo"] == "L0"
+
+def test_cursor_percorre_todos_os_leiloes_sem_repetir(cliente):
+    assert _todas_as_paginas(cliente) == [f"L{i}" for i in range(7)]
+
+def test_filtro_por_status_com_e_sem_paginacao(cliente):
+    assert _todas_as_paginas(cliente, status="ativo") == ["L0", "L2", "L4", "L6"]
+    assert sorted(cliente.get("/leiloes?status=finalizado").get_json()) == ["L1", "L3", "L5"]
+
+def test_etag_responde_304_ate_o_leilao_mudar(cliente):
+    primeira = cliente.get("/leiloes/L0")
+    assert primeira.status_code == 200 and primeira.headers["ETag"]
+
+    repetida = cliente.get("/leiloes/L0", headers={"If-None-Match": primeira.headers["ETag"]})
+    assert repetida.status_code == 304
+    assert repetida.headers["ETag"] == primeira.headers["ETag"]
+
+    storage.atualizar_leilao("L0", {"preco_atual": 200.0})
+    depois = cliente.get("/leiloes/L0", headers={"If-None-Match": primeira.headers["ETag"]})
+    assert depois.status_code == 200
+    assert depois.get_json()["preco_atual"] == 200.0
+
+def test_if_modified_since_ignorado_para_versao_recente(cliente):
+    _, modificado = storage.versao("leiloes.json", "L0")
+    # Cliente com a data (truncada ao segundo) da versão anterior
+    antes = formatdate(int(modificado), usegmt=True)
+    storage.atualizar_leilao("L0", {"preco_atual": 200.0})
+
+    resposta = cliente.get("/leiloes/L0", headers={"If-Modified-Since": antes})
+    assert resposta.status_code == 200
+    assert "Last-Modified" not in resposta.headers
+
+def test_if_modified_since_responde_304_para_versao_antiga(cliente, monkeypatch):
+    monkeypatch.setattr(api, "IDADE_MINIMA_LAST_MODIFIED", -1)
+    primeira = cliente.get("/leiloes/L0")
+    assert "Last-Modified" in primeira.headers
+
+    resposta = cliente.get("/leiloes/L0",
+                           headers={"If-Modified-Since": primeira.headers["Last-Modified"]})
+    assert resposta.status_code == 304
+
+@pytest.fixture
+def precos(monkeypatch):
+    # Assinatura nova, registrada no DATA_DIR do teste
+    difusor = notificacao.Difusor("precos", "leilao_id")
+    monkeypatch.setattr(api, "PRECOS", difusor)
+    monkeypatch.setattr(api, "INTERVALO_STREAM", 2)
+    return difusor
+
+def test_stream_recebe_o_evento_de_preco_publicado(cliente, precos):
+    stream = iter(cliente.get("/leiloes/L0/stream").response)
+    assert next(stream).startswith(b"event: estado")
+
+    notificacao.publicar("precos", {"leilao_id": "L0", "preco_atual": 150.0, "valor": 150.0})
+    evento = next(stream)
+    assert evento.startswith(b"event: lance")
+    assert json.loads(evento.split(b"data: ", 1)[1])["preco_atual"] == 150.0
+
+def test_encerrar_termina_os_streams_abertos(cliente, precos):
+    resposta = cliente.get("/leiloes/L0/stream")
+    stream = iter(resposta.response)
+    next(stream)
+    assert precos.ouvintes() == 1
+
+    precos.encerrar()
+    with pytest.raises(StopIteration):
+        next(stream)
+    resposta.close()
+    assert precos.ouvintes() == 0
@@ -0,0 +1,57 @@
+"""
+Dados iniciais de data/: o seed (usuarios.json, leiloes.json e o log
+lances.jsonl) carrega em todos os backends, e um lances.json antigo em
+formato array é convertido para lances.jsonl.
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils import storage
+
+SEED = os.path.join(RAIZ, "data")
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage, "_migracao_feita", False)
+    storage.limpar_cache()
+    yield tmp_path
+    storage.limpar_cache()
+
+def _seed(nome):
+    with open(os.path.join(SEED, nome), encoding="utf-8") as f:
+        return json.load(f)
+
+def test_seed_carrega_em_qualquer_backend(dados):
+    for nome in ("usuarios.json", "leiloes.json", "lances.jsonl"):
+        shutil.copy(os.path.join(SEED, nome), dados / nome)
+    assert not os.path.exists(os.path.join(SEED, "lances.json"))
+
+    leiloes = _seed("leiloes.json")
+    totais = storage.contadores()
+    assert totais["usuarios"] == len(_seed("usuarios.json"))
+    assert totais["leiloes"] == len(leiloes)
+    assert totais["lances"] == 0
+    for leilao_id, leilao in leiloes.items():
+        assert storage.buscar_leilao(leilao_id)["titulo"] == leilao["titulo"]
+
+@pytest.mark.skipif(storage.BACKEND != "json", reason="só o backend JSON")
+def test_lances_json_antigo_vira_log_jsonl(dados):
+    lances = [{"leilao_id": "L", "usuario_id": "A", "valor": v,
+               "data_hora": f"2029-01-01T00:00:0{i}"} for i, v in enumerate((110.0, 120.0))]
+    with open(dados / "lances.json", "w", encoding="utf-8") as f:
+        json.dump(lances, f)
+
+    assert [l["valor"] for l in storage.lances_do_leilao("L")] == [110.0, 120.0]
+    assert not (dados / "lances.json").exists()
+    assert (dados / "lances.json.migrado").exists()
+    with open(dados / "lances.jsonl", encoding="utf-8") as f:
+        assert [json.loads(linha)["valor"] for linha in f] == [110.0, 120.0]
@@ -0,0 +1,99 @@
+"""
+Fila SQS simulada: reentrega depois do visibility timeout, DLQ depois de
+MAX_RECEBIMENTOS, recibo vencido e a migração única da fila antiga.
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import fila, storage
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    yield tmp_path
+    storage.limpar_cache()
+
+def test_reentrega_depois_da_visibilidade(dados):
+    mensagem_id = fila.enviar({"valor": 1})
+
+    primeira = fila.receber(visibilidade=0.05)
+    assert [m["id"] for m in primeira] == [mensagem_id]
+    # Invisível enquanto não vence o prazo
+    assert fila.receber() == []
+
+    time.sleep(0.1)
+    segunda = fila.receber()
+    assert [m["id"] for m in segunda] == [mensagem_id]
+    assert segunda[0]["recebimentos"] == 2
+
+def test_move_para_dlq_depois_de_max_recebimentos(dados, monkeypatch):
+    monkeypatch.setattr(fila, "MAX_RECEBIMENTOS", 2)
+    mensagem_id = fila.enviar({"valor": 1})
+
+    for _ in range(2):
+        assert [m["id"] for m in fila.receber(visibilidade=0)] == [mensagem_id]
+    assert fila.receber(visibilidade=0) == []
+
+    assert fila.contar() == 0
+    assert [m["id"] for m in fila.receber(fila=fila.FILA_DLQ)] == [mensagem_id]
+
+def test_confirmar_rejeita_recibo_vencido(dados):
+    fila.enviar({"valor": 1})
+    vencido = fila.receber(visibilidade=0)[0]["recibo"]
+    atual = fila.receber()[0]["recibo"]
+
+    assert fila.confirmar(vencido) is False
+    assert fila.confirmar(atual) is True
+    assert fila.contar() == 0
+
+def test_migracao_da_fila_json_roda_uma_vez(dados, monkeypatch):
+    antigo = os.path.join(str(dados), "fila_sqs.json")
+    with open(antigo, "w", encoding="utf-8") as f:
+        json.dump([{"mensagem_id": "m1"}, {"mensagem_id": "m2"}], f)
+
+    assert fila.contar() == 2
+    assert not os.path.exists(antigo)
+    assert os.path.exists(antigo + ".migrado")
+
+    # Outro processo que leu o arquivo antes da renomeação não importa de novo
+    shutil.copy(antigo + ".migrado", antigo)
+    monkeypatch.setattr(fila, "_inicializadas", set())
+    fila._local.chave = None
+    assert fila.contar() == 2
+    assert not os.path.exists(antigo)
+
+def test_envio_repetido_dentro_do_ttl_e_descartado(dados):
+    primeiro, enviada = fila.enviar_deduplicado({"valor": 1}, "chave-1")
+    assert enviada
+    repetido, enviada = fila.enviar_deduplicado({"valor": 1}, "chave-1")
+    assert (repetido, enviada) == (primeiro, False)
+    assert fila.contar() == 1
+
+def test_chave_volta_a_valer_depois_do_ttl(dados, monkeypatch):
+    monkeypatch.setattr(fila, "TTL_DEDUPLICACAO", 0.05)
+    primeiro, _ = fila.enviar_deduplicado({"valor": 1}, "chave-1")
+    time.sleep(0.1)
+    segundo, enviada = fila.enviar_deduplicado({"valor": 1}, "chave-1")
+    assert enviada and segundo != primeiro
+    assert fila.contar() == 2
+
+def test_poda_mantem_as_chaves_mais_recentes(dados, monkeypatch):
+    monkeypatch.setattr(fila, "PODA_A_CADA", 1)
+    monkeypatch.setattr(fila, "MAX_CHAVES_DEDUPLICACAO", 2)
+    for i in range(4):
+        fila.enviar_deduplicado({"valor": i}, f"chave-{i}")
+        time.sleep(0.01)
+
+    assert fila.mensagem_deduplicada("chave-0") is None
+    assert fila.mensagem_deduplicada("chave-1") is None
+    assert fila.mensagem_deduplicada("chave-2") is not None
+    assert fila.mensagem_deduplicada("chave-3") is not None
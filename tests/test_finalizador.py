@@ -0,0 +1,61 @@
+"""
+Finalizador: leilões que seguem em conflito de versão depois de
+TENTATIVAS_CAS voltam à agenda, em vez de esperar a ressincronização,
+e todo lote finalizado registra a duração.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import storage
+from lambdas import lambda_finalizador
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    storage.inserir_leilao("L", {
+        "titulo": "L", "descricao": "", "preco_inicial": 100.0, "preco_atual": 100.0,
+        "data_fim": (datetime.now() - timedelta(seconds=1)).isoformat(),
+        "status": "ativo", "vencedor_id": None
+    })
+    yield tmp_path
+    storage.limpar_cache()
+
+def test_leilao_em_conflito_volta_para_a_agenda(dados, monkeypatch):
+    cas = lambda_finalizador.atualizar_se_versao
+    monkeypatch.setattr(lambda_finalizador, "atualizar_se_versao",
+                        lambda arquivo, atualizacoes: list(atualizacoes))
+    agenda = lambda_finalizador.montar_agenda(storage.ler_json("leiloes.json"))
+
+    assert lambda_finalizador.finalizar_vencidos(agenda) == 0
+    [(prazo, leilao_id)] = agenda
+    assert leilao_id == "L" and prazo > datetime.now().timestamp()
+
+    # Resolvido o conflito, a nova tentativa finaliza no prazo reagendado
+    monkeypatch.setattr(lambda_finalizador, "atualizar_se_versao", cas)
+    agenda[:] = [(0, "L")]
+    assert lambda_finalizador.finalizar_vencidos(agenda) == 1
+    assert storage.buscar_leilao("L")["status"] == "finalizado"
+    assert agenda == []
+
+def test_lote_de_um_leilao_registra_a_duracao(dados, caplog):
+    with caplog.at_level("INFO", logger="leilao.finalizador"):
+        assert lambda_finalizador.finalizar_leiloes({"L": storage.buscar_leilao("L")}) == 1
+
+    [lote] = [r for r in caplog.records if r.getMessage() == "lote de leilões finalizado"]
+    assert lote.finalizados == 1
+    assert lote.duracao_ms >= 0
+
+def test_verificacao_finaliza_so_os_ativos_vencidos(dados):
+    storage.inserir_leilao("M", dict(storage.buscar_leilao("L"), data_fim="2999-01-01T00:00:00"))
+    assert set(storage.leiloes_ativos()) == {"L", "M"}
+
+    assert lambda_finalizador.verificar_leiloes_expirados() == 1
+    assert storage.buscar_leilao("L")["status"] == "finalizado"
+    assert list(storage.leiloes_ativos()) == ["M"]
@@ -0,0 +1,27 @@
+"""
+Exportação de métricas: porta ocupada vira aviso no log, sem derrubar a lambda.
+"""
+
+import logging
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import metricas
+
+def test_porta_ocupada_gera_aviso_no_log(monkeypatch, caplog):
+    with socket.socket() as ocupada:
+        ocupada.bind(("127.0.0.1", 0))
+        ocupada.listen()
+        porta = ocupada.getsockname()[1]
+        monkeypatch.setenv("LEILAO_METRICAS_PORTA", str(porta))
+        monkeypatch.delenv("LEILAO_METRICAS_ARQUIVO", raising=False)
+
+        with caplog.at_level(logging.WARNING, logger="leilao.metricas"):
+            assert metricas.iniciar_exportacao() is None
+
+    [registro] = caplog.records
+    assert registro.levelno == logging.WARNING
+    assert registro.porta == str(porta)
@@ -0,0 +1,84 @@
+"""
+Processador de lances: o modo em lote chega ao mesmo resultado que o
+unitário (uma mensagem por vez) para a mesma sequência de lances.
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import storage
+from lambdas import lambda_processador
+
+# (usuário, valor) em ordem; o leilão começa em R$ 500 e cada usuário tem R$ 1000
+SEQUENCIA_SUPERADO_VOLTA = [("A", 600.0), ("B", 700.0), ("A", 750.0)]
+SEQUENCIA_COBRE_PROPRIO = [("A", 600.0), ("A", 900.0), ("B", 950.0), ("A", 1000.0)]
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    yield tmp_path
+    storage.limpar_cache()
+
+def _preparar():
+    for usuario_id in ("A", "B"):
+        storage.inserir_usuario(usuario_id, {"nome": usuario_id, "email": f"{usuario_id}@x", "saldo": 1000.0})
+    storage.inserir_leilao("L", {
+        "titulo": "L", "descricao": "", "preco_inicial": 500.0, "preco_atual": 500.0,
+        "data_fim": (datetime.now() + timedelta(hours=1)).isoformat(),
+        "status": "ativo", "vencedor_id": None
+    })
+
+def _mensagens(sequencia):
+    inicio = datetime.now()
+    return [
+        {
+            "tipo": "novo_lance",
+            "mensagem_id": uuid.uuid4().hex,
+            "timestamp": (inicio + timedelta(milliseconds=i)).isoformat(),
+            "dados": {"leilao_id": "L", "usuario_id": usuario_id, "valor": valor}
+        }
+        for i, (usuario_id, valor) in enumerate(sequencia)
+    ]
+
+def _resultado():
+    lances = sorted(storage.ler_json("lances.json"), key=lambda l: l["data_hora"])
+    usuarios = storage.ler_json("usuarios.json")
+    leilao = storage.buscar_leilao("L")
+    return {
+        "status": [(l["usuario_id"], l["valor"], l["status"]) for l in lances],
+        "leilao": (leilao["preco_atual"], leilao["lider_id"]),
+        "reservado": {uid: usuarios[uid].get("reservado", 0.0) for uid in ("A", "B")},
+    }
+
+def _executar(modo, sequencia):
+    _preparar()
+    mensagens = _mensagens(sequencia)
+    if modo == "lote":
+        lambda_processador.processar_lote(mensagens)
+    else:
+        for mensagem in mensagens:
+            lambda_processador.processar_lance(mensagem)
+    return _resultado()
+
+@pytest.mark.parametrize("sequencia", [SEQUENCIA_SUPERADO_VOLTA, SEQUENCIA_COBRE_PROPRIO])
+def test_lote_e_unitario_dao_o_mesmo_resultado(dados, tmp_path_factory, monkeypatch, sequencia):
+    lote = _executar("lote", sequencia)
+
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path_factory.mktemp("unitario")))
+    storage.limpar_cache()
+    unitario = _executar("unitario", sequencia)
+
+    assert lote == unitario
+    assert all(status == "processado" for _, _, status in lote["status"])
+
+def test_superado_no_lote_recupera_o_saldo(dados):
+    resultado = _executar("lote", SEQUENCIA_SUPERADO_VOLTA)
+    assert resultado["leilao"] == (750.0, "A")
+    assert resultado["reservado"] == {"A": 750.0, "B": 0.0}
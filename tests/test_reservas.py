@@ -0,0 +1,88 @@
+"""
+Saldo reservado: o lance que lidera reserva o valor, o superado libera,
+o finalizador liquida a reserva do vencedor e a reconciliação corrige
+reservas deixadas por uma queda.
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import reservas, storage
+from lambdas import lambda_finalizador, lambda_processador
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    for usuario_id in ("A", "B"):
+        storage.inserir_usuario(usuario_id, {"nome": usuario_id, "email": f"{usuario_id}@x", "saldo": 1000.0})
+    storage.inserir_leilao("L", {
+        "titulo": "L", "descricao": "", "preco_inicial": 500.0, "preco_atual": 500.0,
+        "data_fim": (datetime.now() + timedelta(hours=1)).isoformat(),
+        "status": "ativo", "vencedor_id": None
+    })
+    yield tmp_path
+    storage.limpar_cache()
+
+def _lance(usuario_id, valor):
+    lambda_processador.processar_lance({
+        "tipo": "novo_lance",
+        "mensagem_id": uuid.uuid4().hex,
+        "timestamp": datetime.now().isoformat(),
+        "dados": {"leilao_id": "L", "usuario_id": usuario_id, "valor": valor}
+    })
+
+def test_lance_lider_reserva_e_superado_libera(dados):
+    _lance("A", 600.0)
+    a = storage.buscar_usuario("A")
+    assert reservas.reservado(a) == 600.0
+    assert reservas.disponivel(a) == 400.0
+
+    _lance("B", 700.0)
+    assert reservas.reservado(storage.buscar_usuario("A")) == 0.0
+    assert reservas.reservado(storage.buscar_usuario("B")) == 700.0
+
+def test_cobrir_o_proprio_lance_usa_a_reserva_no_leilao(dados):
+    _lance("A", 600.0)
+    a, leilao = storage.buscar_usuario("A"), storage.buscar_leilao("L")
+    assert reservas.disponivel(a) + reservas.credito_no_leilao("A", a, leilao) == 1000.0
+
+    _lance("A", 950.0)
+    assert reservas.reservado(storage.buscar_usuario("A")) == 950.0
+
+def test_finalizacao_liquida_a_reserva_do_vencedor(dados):
+    _lance("A", 600.0)
+    storage.atualizar_leilao("L", {"data_fim": (datetime.now() - timedelta(seconds=1)).isoformat()})
+
+    assert lambda_finalizador.verificar_leiloes_expirados() == 1
+    a = storage.buscar_usuario("A")
+    assert (a["saldo"], reservas.reservado(a)) == (400.0, 0.0)
+
+    # Liquidar de novo não debita duas vezes
+    reservas.liquidar({"A": [storage.buscar_leilao("L")["lance_lider_id"]]})
+    assert storage.buscar_usuario("A")["saldo"] == 400.0
+
+def test_reconciliacao_libera_orfas_e_liquida_vencedor(dados):
+    _lance("A", 600.0)
+    # Queda do processador: reserva de um lance que não chegou a liderar
+    a = storage.buscar_usuario("A")
+    storage.atualizar_usuario("A", reservas.com_reservas(a, [("lance_perdido", "L", 300.0)]))
+    # Queda do finalizador: leilão finalizado sem a liquidação
+    storage.atualizar_leilao("L", {"status": "finalizado", "vencedor_id": "A"})
+
+    assert reservas.reconciliar(idade_minima=0) == {"liberadas": 1, "liquidadas": 1}
+    a = storage.buscar_usuario("A")
+    assert (a["saldo"], reservas.reservado(a), a["reservas"]) == (400.0, 0.0, {})
+
+def test_reconciliacao_nao_toca_reservas_recentes(dados):
+    a = storage.buscar_usuario("A")
+    storage.atualizar_usuario("A", reservas.com_reservas(a, [("lance_em_voo", "L", 300.0)]))
+
+    assert reservas.reconciliar() == {"liberadas": 0, "liquidadas": 0}
+    assert reservas.reservado(storage.buscar_usuario("A")) == 300.0
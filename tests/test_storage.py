@@ -0,0 +1,113 @@
+"""
+Backend JSON do storage: o cache de ler_json só reflete uma atualização
+depois que a escrita no disco deu certo.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import storage
+
+pytestmark = pytest.mark.skipif(storage.BACKEND != "json", reason="só o backend JSON")
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    # Confia no cache mesmo logo após a escrita (o caso dos processos de longa duração)
+    monkeypatch.setattr(storage, "JANELA_RACY_NS", 0)
+    storage.limpar_cache()
+    storage.inserir_leilao("L", {"titulo": "L", "preco_atual": 100.0, "status": "ativo"})
+    yield tmp_path
+    storage.limpar_cache()
+
+def _disco(tmp_path):
+    with open(tmp_path / "leiloes.json", encoding="utf-8") as f:
+        return json.load(f)["L"]
+
+def _falhar_escrita(monkeypatch):
+    def sem_espaco(caminho, conteudo):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(storage, "_gravar_atomico", sem_espaco)
+
+@pytest.mark.parametrize("atualizar", [
+    lambda: storage.atualizar_se_versao("leiloes.json", {"L": (1, {"status": "finalizado", "preco_atual": 999.0})}),
+    lambda: storage.atualizar_leiloes({"L": {"status": "finalizado", "preco_atual": 999.0}}),
+    lambda: storage.remover_leiloes(["L"]),
+])
+def test_escrita_que_falha_nao_altera_o_cache(dados, monkeypatch, atualizar):
+    _falhar_escrita(monkeypatch)
+    with pytest.raises(OSError):
+        atualizar()
+
+    leilao = storage.buscar_leilao("L")
+    assert leilao == _disco(dados)
+    assert (leilao["status"], leilao["preco_atual"], leilao["versao"]) == ("ativo", 100.0, 1)
+    assert storage.contadores()["leiloes_por_status"] == {"ativo": 1}
+
+def test_compare_and_set_apos_falha_usa_a_versao_do_disco(dados, monkeypatch):
+    with monkeypatch.context() as m:
+        _falhar_escrita(m)
+        with pytest.raises(OSError):
+            storage.atualizar_se_versao("leiloes.json", {"L": (1, {"preco_atual": 999.0})})
+
+    assert storage.atualizar_se_versao("leiloes.json", {"L": (2, {"preco_atual": 500.0})}) == ["L"]
+    assert storage.atualizar_se_versao("leiloes.json", {"L": (1, {"preco_atual": 500.0})}) == []
+    assert _disco(dados)["preco_atual"] == 500.0
+
+def _log(tmp_path):
+    return tmp_path / "lances.jsonl"
+
+def test_append_depois_de_linha_incompleta(dados):
+    storage.adicionar_lance({"id": "a", "leilao_id": "L", "status": "processado"})
+    with open(_log(dados), "ab") as f:
+        f.write(b'{"id": "tor')  # queda no meio do append
+    storage.limpar_cache()
+    storage.adicionar_lance({"id": "b", "leilao_id": "L", "status": "processado"})
+
+    assert [l["id"] for l in storage.ler_json("lances.json")] == ["a", "b"]
+    assert [l["id"] for l in storage.lances_do_leilao("L")] == ["a", "b"]
+    assert storage.compactar_log("lances.json") == 0
+
+def test_linha_ilegivel_e_pulada_e_compactada(dados):
+    storage.adicionar_lance({"id": "a", "leilao_id": "L", "status": "processado"})
+    with open(_log(dados), "ab") as f:
+        f.write(b'{"id": "tor{"id": "x"}\n')
+    storage.adicionar_lance({"id": "b", "leilao_id": "L", "status": "processado"})
+    storage.limpar_cache()
+
+    assert [l["id"] for l in storage.ler_json("lances.json")] == ["a", "b"]
+    assert storage.compactar_log("lances.json") == 1
+    assert storage.compactar_log("lances.json") == 0
+    assert _log(dados).read_bytes().count(b"\n") == 2
+    assert storage.contadores()["lances"] == 2
+
+def test_leitura_depois_da_escrita_usa_o_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    storage.escrever_json("usuarios.json", {"u": {"saldo": 1.0}})
+    hits = storage.estatisticas_cache()["hits"]
+
+    assert storage.ler_json("usuarios.json") == {"u": {"saldo": 1.0}}
+    assert storage.estatisticas_cache()["hits"] == hits + 1
+
+def test_grupo_sincroniza_o_temporario_antes_da_troca(dados, monkeypatch):
+    monkeypatch.setattr(storage, "DURABILIDADE", "grupo")
+    eventos = []
+    fsync_original, replace_original = storage._fsync_caminho, os.replace
+    monkeypatch.setattr(storage, "_fsync_caminho",
+                        lambda caminho: (eventos.append(("fsync", caminho)), fsync_original(caminho)))
+    monkeypatch.setattr(os, "replace",
+                        lambda origem, destino: (eventos.append(("replace", origem)),
+                                                 replace_original(origem, destino)))
+
+    caminho = str(dados / "x.json")
+    storage._gravar_atomico(caminho, b"{}")
+
+    [(_, temporario)] = [e for e in eventos if e[0] == "replace"]
+    assert eventos.index(("fsync", temporario)) < eventos.index(("replace", temporario))
+    assert open(caminho, 'rb').read() == b"{}"
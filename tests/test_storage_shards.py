@@ -0,0 +1,84 @@
+"""
+Backend de shards: migração do layout de arquivo único, total de lances
+retomado do ponto de controle e travas por subdiretório.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import storage
+
+pytestmark = pytest.mark.skipif(storage.BACKEND != "shards", reason="só o backend de shards")
+
+if storage.BACKEND == "shards":
+    from utils import storage_shards
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    yield tmp_path
+    storage.limpar_cache()
+
+def _leilao(titulo):
+    return {"titulo": titulo, "preco_atual": 100.0, "status": "ativo",
+            "data_fim": "2030-01-01T00:00:00"}
+
+def _lance(leilao_id, valor):
+    return {"leilao_id": leilao_id, "usuario_id": "A", "valor": valor,
+            "data_hora": "2029-01-01T00:00:00"}
+
+def test_migra_leiloes_json_no_primeiro_acesso(dados):
+    with open(dados / "leiloes.json", "w", encoding="utf-8") as f:
+        json.dump({"L1": _leilao("um"), "L2": _leilao("dois")}, f)
+    with open(dados / "lances.jsonl", "w", encoding="utf-8") as f:
+        for lance in (_lance("L1", 110.0), _lance("L1", 120.0), _lance("L2", 130.0)):
+            f.write(json.dumps(lance) + "\n")
+
+    assert storage.buscar_leilao("L1")["titulo"] == "um"
+    assert [l["valor"] for l in storage.lances_do_leilao("L1")] == [110.0, 120.0]
+    assert storage.contadores()["leiloes"] == 2
+    assert storage.contadores()["lances"] == 3
+    assert not (dados / "leiloes.json").exists()
+    assert (dados / "leiloes.json.migrado").exists()
+    assert (dados / "lances.jsonl.migrado").exists()
+
+def test_total_de_lances_retomado_do_ponto_de_controle(dados, monkeypatch):
+    monkeypatch.setattr(storage_shards, "INTERVALO_PONTO_DE_CONTROLE", 1)
+    storage.inserir_leilao("L", _leilao("L"))
+    storage.adicionar_lances([_lance("L", 110.0), _lance("L", 120.0)])
+    assert storage.contadores()["lances"] == 2
+    with open(storage_shards._caminho(storage_shards.PONTO_DE_CONTROLE), encoding="utf-8") as f:
+        ponto = json.load(f)
+    assert ponto["total"] == 2 and ponto["offset"] > 0
+
+    storage.adicionar_lance(_lance("L", 130.0))
+    # Um processo novo parte do ponto de controle e soma só as linhas seguintes
+    monkeypatch.setattr(storage_shards, "_total_lances", [None, 0, 0])
+    assert storage.contadores()["lances"] == 3
+
+    # As linhas antes do offset não são relidas: o total vem do ponto de controle
+    monkeypatch.setattr(storage_shards, "INTERVALO_PONTO_DE_CONTROLE", 1024 * 1024)
+    with open(storage_shards._caminho(storage_shards.PONTO_DE_CONTROLE), "w", encoding="utf-8") as f:
+        json.dump(dict(ponto, total=100), f)
+    monkeypatch.setattr(storage_shards, "_total_lances", [None, 0, 0])
+    assert storage.contadores()["lances"] == 101
+
+def test_travas_por_subdiretorio_e_nao_por_leilao(dados):
+    for i in range(20):
+        storage.inserir_leilao(f"L{i}", _leilao(str(i)))
+        storage.adicionar_lance(_lance(f"L{i}", 110.0))
+    storage.remover_leiloes([f"L{i}" for i in range(20)])
+
+    diretorio = dados / storage_shards.DIRETORIO
+    travas_de_arquivo = [
+        nome for raiz, _, arquivos in os.walk(diretorio) if raiz != str(diretorio)
+        for nome in arquivos if nome.endswith(".lock")
+    ]
+    assert travas_de_arquivo == []
+    assert len(list(diretorio.glob("*.lock"))) <= storage_shards.BUCKETS + 2
@@ -0,0 +1,60 @@
+"""
+Backend SQLite: migração automática dos arquivos JSON no primeiro acesso
+e busca dos leilões ativos pelo índice de status.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import storage
+
+pytestmark = pytest.mark.skipif(storage.BACKEND != "sqlite", reason="só o backend SQLite")
+
+if storage.BACKEND == "sqlite":
+    from utils import storage_sqlite
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.limpar_cache()
+    yield tmp_path
+    storage.limpar_cache()
+
+def _leilao(titulo, status="ativo"):
+    return {"titulo": titulo, "preco_atual": 100.0, "status": status,
+            "data_fim": "2030-01-01T00:00:00"}
+
+def test_migra_os_arquivos_json_no_primeiro_acesso(dados):
+    with open(dados / "usuarios.json", "w", encoding="utf-8") as f:
+        json.dump({"A": {"nome": "A", "email": "a@x", "saldo": 1000.0}}, f)
+    with open(dados / "leiloes.json", "w", encoding="utf-8") as f:
+        json.dump({"L1": _leilao("um"), "L2": _leilao("dois", "finalizado")}, f)
+    with open(dados / "lances.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"leilao_id": "L1", "usuario_id": "A", "valor": 110.0,
+                            "data_hora": "2029-01-01T00:00:00"}) + "\n")
+
+    assert storage.buscar_usuario("A")["nome"] == "A"
+    assert storage.buscar_leilao("L1")["titulo"] == "um"
+    assert len(storage.lances_do_leilao("L1")) == 1
+    for nome in ("usuarios.json", "leiloes.json", "lances.jsonl"):
+        assert not (dados / nome).exists()
+        assert (dados / (nome + ".migrado")).exists()
+
+    # Migrar de novo o próprio DATA_DIR não apaga o que já foi migrado
+    storage_sqlite.migrar_de_json()
+    assert storage.contadores()["leiloes"] == 2
+
+def test_leiloes_ativos_usa_o_indice_de_status(dados):
+    storage.inserir_leilao("L1", _leilao("um"))
+    storage.inserir_leilao("L2", _leilao("dois", "finalizado"))
+
+    assert list(storage.leiloes_ativos()) == ["L1"]
+    plano = storage_sqlite._conexao().execute(
+        "EXPLAIN QUERY PLAN SELECT id, dados FROM leiloes WHERE status = 'ativo' ORDER BY data_fim"
+    ).fetchall()
+    assert "idx_leiloes_status_fim" in str(plano)
@@ -0,0 +1,44 @@
+"""
+Instantâneo por leilão da pré-validação: só leilões ativos e dentro do
+prazo ficam em memória, até MAX_INSTANTANEOS.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import validadores
+
+@pytest.fixture(autouse=True)
+def instantaneos(monkeypatch):
+    monkeypatch.setattr(validadores, "_instantaneo_leiloes", validadores.OrderedDict())
+    return validadores._instantaneo_leiloes
+
+def _leilao(status="ativo", horas=1.0, preco=100.0):
+    return {"status": status, "preco_atual": preco,
+            "data_fim": (datetime.now() + timedelta(hours=horas)).isoformat()}
+
+def test_leilao_finalizado_sai_do_instantaneo(instantaneos):
+    validadores.instantaneo_do_leilao("L", _leilao())
+    assert "L" in instantaneos
+    validadores.instantaneo_do_leilao("L", _leilao(status="finalizado"))
+    assert "L" not in instantaneos
+
+def test_leilao_com_prazo_vencido_nao_fica_guardado(instantaneos):
+    prazo, lance_minimo = validadores.instantaneo_do_leilao("L", _leilao(horas=-1))
+    assert prazo < datetime.now().timestamp()
+    assert lance_minimo == pytest.approx(105.0)
+    assert "L" not in instantaneos
+
+def test_limite_descarta_os_usados_ha_mais_tempo(instantaneos, monkeypatch):
+    monkeypatch.setattr(validadores, "MAX_INSTANTANEOS", 2)
+    leilao = _leilao()
+    for leilao_id in ("A", "B"):
+        validadores.instantaneo_do_leilao(leilao_id, leilao)
+    validadores.instantaneo_do_leilao("A", leilao)
+    validadores.instantaneo_do_leilao("C", leilao)
+    assert list(instantaneos) == ["A", "C"]
@@ -0,0 +1,178 @@
+"""
+Camada fria do histórico de leilões.
+
+Leilões finalizados há mais de RETENCAO_DIAS saem do armazenamento
+quente (leiloes.json e lances.jsonl, tabelas do SQLite ou shards) e vão,
+com todos os seus lances, para segmentos gzip imutáveis em data/arquivo/:
+
+    data/arquivo/<ns>.json.gz   {"leiloes": {id: leilao}, "lances": {id: [lances]}}
+    data/arquivo/indice.json    {leilao_id: segmento}
+
+GET /leiloes/<id> e GET /lances/<id> recorrem à camada fria quando o
+leilão não está mais no armazenamento quente. Um segmento só é
+descompactado na primeira consulta a um dos seus leilões e fica num
+cache LRU de SEGMENTOS_EM_CACHE segmentos.
+
+O finalizador arquiva a cada INTERVALO_ARQUIVAMENTO segundos (ver
+lambdas/lambda_finalizador.py). Execução manual:
+    python -m utils.arquivamento [retencao_dias]
+"""
+
+import functools
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from utils import metricas, storage
+
+# Dias após o data_fim em que um leilão finalizado continua quente
+RETENCAO_DIAS = float(os.environ.get("LEILAO_RETENCAO_DIAS", "30"))
+LEILOES_POR_SEGMENTO = 1000
+SEGMENTOS_EM_CACHE = 8
+
+DIRETORIO = "arquivo"
+INDICE = os.path.join(DIRETORIO, "indice.json")
+
+LEILOES_ARQUIVADOS = metricas.contador(
+    "leilao_arquivados_total", "Leilões movidos para a camada fria")
+SEGMENTOS_CARREGADOS = metricas.contador(
+    "leilao_segmentos_carregados_total", "Segmentos da camada fria descompactados")
+
+_trava = threading.Lock()
+# (assinatura de indice.json, índice)
+_indice: List = [None, {}]
+
+def _caminho(relativo: str) -> str:
+    return os.path.join(storage.DATA_DIR, relativo)
+
+# ==================== LEITURA ====================
+
+def _ler_indice() -> Dict[str, str]:
+    """Índice leilao_id -> segmento, relido só quando o arquivo muda"""
+    assinatura = storage._assinatura(_caminho(INDICE))
+    if assinatura is None:
+        return {}
+    with _trava:
+        if _indice[0] == assinatura:
+            return _indice[1]
+
+    with open(_caminho(INDICE), 'r', encoding='utf-8') as f:
+        indice = json.load(f)
+    with _trava:
+        _indice[:] = [assinatura, indice]
+    return indice
+
+@functools.lru_cache(maxsize=SEGMENTOS_EM_CACHE)
+def _carregar_segmento(caminho: str) -> Dict:
+    """Segmento descompactado (imutável: o nome nunca é reaproveitado)"""
+    with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+        segmento = json.load(f)
+    SEGMENTOS_CARREGADOS.inc()
+    return segmento
+
+def _segmento_do_leilao(leilao_id: str) -> Optional[Dict]:
+    nome = _ler_indice().get(leilao_id)
+    if nome is None:
+        return None
+    return _carregar_segmento(_caminho(os.path.join(DIRETORIO, nome)))
+
+def buscar_leilao_arquivado(leilao_id: str) -> Optional[Dict]:
+    """Leilão da camada fria (None se não foi arquivado)"""
+    segmento = _segmento_do_leilao(leilao_id)
+    return None if segmento is None else segmento["leiloes"].get(leilao_id)
+
+def pagina_lances_arquivados(leilao_id: str, limite: int,
+                             cursor: Optional[str] = None) -> Optional[Tuple[List[Dict], Optional[str]]]:
+    """
+    Página de lances de um leilão arquivado, no mesmo formato de
+    storage.pagina_lances_do_leilao (None se o leilão não foi arquivado).
+    """
+    segmento = _segmento_do_leilao(leilao_id)
+    if segmento is None:
+        return None
+    # Os lances são gravados em ordem cronológica
+    itens = [
+        (lance.get('data_hora', ''), lance.get('id', ''), posicao, lance)
+        for posicao, lance in enumerate(segmento["lances"].get(leilao_id, []))
+    ]
+    return storage._paginar_lances(itens, limite, cursor)
+
+def versao_arquivada(leilao_id: str) -> Tuple[str, float]:
+    """
+    Versão (token, modificado_em) de um leilão arquivado, para ETag:
+    o segmento é imutável, então o nome dele basta. ("0", 0.0) se o
+    leilão não foi arquivado.
+    """
+    nome = _ler_indice().get(leilao_id)
+    if nome is None:
+        return "0", 0.0
+    marca = nome.split(".", 1)[0]
+    return f"a{int(marca):x}", int(marca) / 1e9
+
+# ==================== ARQUIVAMENTO ====================
+
+def _expirado(leilao: Dict, limite: datetime) -> bool:
+    return (leilao.get('status') == 'finalizado'
+            and datetime.fromisoformat(leilao['data_fim']) < limite)
+
+def arquivar_finalizados(retencao_dias: float = RETENCAO_DIAS) -> int:
+    """
+    Move para a camada fria os leilões finalizados com data_fim anterior
+    a retencao_dias atrás, em segmentos de até LEILOES_POR_SEGMENTO.
+    Segmento e índice são gravados antes da remoção do armazenamento
+    quente: uma queda no meio deixa o leilão nas duas camadas (a quente
+    prevalece) e a próxima execução o arquiva de novo.
+    Retorna quantos leilões foram arquivados.
+    """
+    limite = datetime.now() - timedelta(days=retencao_dias)
+    candidatos = [
+        leilao_id for leilao_id, leilao in storage.ler_json("leiloes.json").items()
+        if _expirado(leilao, limite)
+    ]
+    if not candidatos:
+        return 0
+
+    os.makedirs(_caminho(DIRETORIO), exist_ok=True)
+    arquivados = 0
+    with storage._trava_arquivo(INDICE):
+        for inicio in range(0, len(candidatos), LEILOES_POR_SEGMENTO):
+            leiloes = {}
+            for leilao_id in candidatos[inicio:inicio + LEILOES_POR_SEGMENTO]:
+                leilao = storage.buscar_leilao(leilao_id)
+                if leilao is not None and _expirado(leilao, limite):
+                    leiloes[leilao_id] = leilao
+            if not leiloes:
+                continue
+
+            segmento = {
+                "leiloes": leiloes,
+                "lances": {leilao_id: storage.lances_do_leilao(leilao_id) for leilao_id in leiloes},
+            }
+            nome = f"{time.time_ns()}.json.gz"
+            storage._gravar_atomico(
+                _caminho(os.path.join(DIRETORIO, nome)),
+                gzip.compress(json.dumps(segmento, ensure_ascii=False).encode('utf-8'))
+            )
+
+            indice = dict(_ler_indice())
+            indice.update((leilao_id, nome) for leilao_id in leiloes)
+            storage._gravar_atomico(
+                _caminho(INDICE), json.dumps(indice, ensure_ascii=False).encode('utf-8')
+            )
+
+            storage.remover_leiloes(list(leiloes))
+            arquivados += len(leiloes)
+            LEILOES_ARQUIVADOS.inc(len(leiloes))
+
+    return arquivados
+
+if __name__ == "__main__":
+    dias = float(sys.argv[1]) if len(sys.argv) > 1 else RETENCAO_DIAS
+    total = arquivar_finalizados(dias)
+    print(f"✓ {total} leilões finalizados há mais de {dias:g} dias arquivados em "
+          f"{_caminho(DIRETORIO)}")
@@ -0,0 +1,553 @@
+"""
+Fila SQS simulada sobre SQLite.
+
+Segura entre processos (API Flask e vários processadores): o recebimento
+marca as mensagens como invisíveis por um tempo (visibility timeout) e
+elas só saem da fila quando confirmadas. Mensagens não confirmadas
+voltam a ficar visíveis e, depois de MAX_RECEBIMENTOS tentativas, vão
+para a fila de mensagens mortas (DLQ).
+
+A entrega é "pelo menos uma vez". Para aplicar cada mensagem uma única
+vez há um índice de deduplicação (como o MessageDeduplicationId do SQS
+FIFO) no mesmo banco: o produtor envia com uma chave (enviar_deduplicado)
+e o consumidor consulta e marca as chaves aplicadas.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils import metricas, notificacao, storage
+
+# Com o backend SQLite a fila fica no mesmo banco dos demais dados
+ARQUIVO_FILA = "leilao.db" if storage.BACKEND == "sqlite" else "fila_sqs.db"
+FILA_PADRAO = "fila_sqs"
+FILA_DLQ = "fila_sqs_dlq"
+
+# Limite de mensagens por chamada a receber(), como no SQS
+MAX_MENSAGENS_POR_LOTE = 10
+# Segundos que uma mensagem recebida fica invisível para outros consumidores
+VISIBILIDADE_PADRAO = 30
+# Recebimentos sem confirmação antes de a mensagem ir para a DLQ
+MAX_RECEBIMENTOS = 5
+# Notificação de novas mensagens entre processos: cada consumidor assina
+# este canal de utils/notificacao.py (uma porta UDP efêmera por processo,
+# registrada em data/canais/) e enviar() avisa todos eles, que acordam na
+# hora, sem polling. Deployments com DATA_DIR diferentes não se misturam.
+CANAL_NOTIFICACAO = "fila"
+# Backoff de polling usado quando não há escuta de notificações
+# (assinatura indisponível): começa curto e dobra até o máximo
+BACKOFF_INICIAL = 0.005
+BACKOFF_MAXIMO = 0.5
+# Sem notificação, reconsulta no máximo a cada N segundos por segurança
+ESPERA_MAXIMA_COM_ESCUTA = 1.0
+# Deduplicação: cada chave vale por TTL_DEDUPLICACAO segundos desde o
+# envio; acima de MAX_CHAVES_DEDUPLICACAO saem as usadas há mais tempo
+TTL_DEDUPLICACAO = float(os.environ.get("LEILAO_IDEMPOTENCIA_TTL", 24 * 3600))
+MAX_CHAVES_DEDUPLICACAO = 100_000
+# Limpeza de chaves vencidas a cada N chaves gravadas pelo processo
+PODA_A_CADA = 100
+# Nome da importação da fila antiga (fila_sqs.json/.jsonl) em `migracoes`
+MIGRACAO_FILA_JSON = "fila_sqs_json"
+
+ESPERA_NA_FILA = metricas.histograma(
+    "leilao_fila_espera_segundos", "Tempo entre o envio e o primeiro recebimento",
+    metricas.LIMITES_LATENCIA + (30, 60, 300))
+MENSAGENS = metricas.contador(
+    "leilao_fila_mensagens_total", "Mensagens por fila e evento (enviada, recebida, dlq)")
+
+_local = threading.local()
+_inicializadas = set()
+_inicializacao_trava = threading.Lock()
+
+# Condição acordada a cada nova mensagem (local ou de outro processo)
+_condicao = threading.Condition()
+_geracao = 0
+_escuta_ativa = False
+_escuta_pid: Optional[int] = None
+_gravadas_desde_poda = 0
+_poda_trava = threading.Lock()
+
+class ChaveReutilizadaError(Exception):
+    """Chave de deduplicação já usada para uma mensagem com outro conteúdo"""
+    pass
+
+def _caminho() -> str:
+    return os.path.join(storage.DATA_DIR, ARQUIVO_FILA)
+
+def _conexao() -> sqlite3.Connection:
+    """Conexão SQLite da thread atual (recriada após fork ou troca de DATA_DIR)"""
+    caminho = _caminho()
+    chave = (caminho, os.getpid())
+    if getattr(_local, "chave", None) != chave:
+        storage.garantir_diretorio()
+        conexao = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute(f"PRAGMA synchronous={storage.SQLITE_SYNCHRONOUS[storage.DURABILIDADE]}")
+        _local.conexao = conexao
+        _local.chave = chave
+        _inicializar(conexao, caminho)
+    return _local.conexao
+
+def _inicializar(conexao: sqlite3.Connection, caminho: str):
+    """Cria o esquema e migra a fila antiga em JSON, uma vez por processo"""
+    with _inicializacao_trava:
+        if caminho in _inicializadas:
+            return
+        conexao.executescript("""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS mensagens (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                fila TEXT NOT NULL,
+                id TEXT NOT NULL,
+                corpo TEXT NOT NULL,
+                enviada_em REAL NOT NULL,
+                visivel_em REAL NOT NULL,
+                recebimentos INTEGER NOT NULL DEFAULT 0,
+                recibo TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_mensagens_visiveis
+                ON mensagens (fila, visivel_em, seq);
+            CREATE INDEX IF NOT EXISTS idx_mensagens_recibo
+                ON mensagens (recibo);
+
+            -- Profundidade de cada fila mantida por triggers: contar() é O(1)
+            CREATE TABLE IF NOT EXISTS contagens (
+                fila TEXT PRIMARY KEY,
+                total INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO contagens (fila, total)
+                SELECT fila, COUNT(*) FROM mensagens GROUP BY fila;
+            CREATE TRIGGER IF NOT EXISTS contar_mensagem_inserida AFTER INSERT ON mensagens
+            BEGIN
+                INSERT INTO contagens (fila, total) VALUES (NEW.fila, 1)
+                    ON CONFLICT (fila) DO UPDATE SET total = total + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS contar_mensagem_removida AFTER DELETE ON mensagens
+            BEGIN
+                UPDATE contagens SET total = total - 1 WHERE fila = OLD.fila;
+            END;
+            CREATE TRIGGER IF NOT EXISTS contar_mensagem_movida AFTER UPDATE OF fila ON mensagens
+            WHEN OLD.fila IS NOT NEW.fila
+            BEGIN
+                UPDATE contagens SET total = total - 1 WHERE fila = OLD.fila;
+                INSERT INTO contagens (fila, total) VALUES (NEW.fila, 1)
+                    ON CONFLICT (fila) DO UPDATE SET total = total + 1;
+            END;
+
+            -- Índice de deduplicação: TTL por criada_em, LRU por usada_em
+            CREATE TABLE IF NOT EXISTS deduplicacao (
+                chave TEXT PRIMARY KEY,
+                mensagem_id TEXT NOT NULL,
+                impressao TEXT,
+                aplicada INTEGER NOT NULL DEFAULT 0,
+                criada_em REAL NOT NULL,
+                usada_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_deduplicacao_criada
+                ON deduplicacao (criada_em);
+            CREATE INDEX IF NOT EXISTS idx_deduplicacao_usada
+                ON deduplicacao (usada_em);
+
+            -- Migrações já aplicadas (a importação da fila antiga roda uma vez)
+            CREATE TABLE IF NOT EXISTS migracoes (
+                nome TEXT PRIMARY KEY,
+                aplicada_em REAL NOT NULL
+            );
+            COMMIT;
+        """)
+        _migrar_fila_json(conexao)
+        _inicializadas.add(caminho)
+
+def _migrar_fila_json(conexao: sqlite3.Connection):
+    """
+    Importa mensagens pendentes dos formatos antigos (fila_sqs.json em
+    array e fila_sqs.jsonl com offset consumido) e renomeia os arquivos
+    para *.migrado.
+
+    Segura entre processos: a importação e o registro em `migracoes`
+    acontecem na mesma transação BEGIN IMMEDIATE, então só um processo
+    importa; quem chegar depois (ou cair entre o COMMIT e a renomeação)
+    encontra o registro e apenas renomeia os arquivos.
+    """
+    antigo = os.path.join(storage.DATA_DIR, "fila_sqs.json")
+    log = os.path.join(storage.DATA_DIR, "fila_sqs.jsonl")
+    if not (os.path.exists(antigo) or os.path.exists(log)):
+        return
+
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        aplicada = conexao.execute(
+            "SELECT 1 FROM migracoes WHERE nome = ?", (MIGRACAO_FILA_JSON,)
+        ).fetchone()
+        if aplicada is None:
+            pendentes = _ler_fila_json(antigo, log)
+            if pendentes:
+                _inserir(conexao, FILA_PADRAO, pendentes)
+            conexao.execute(
+                "INSERT INTO migracoes (nome, aplicada_em) VALUES (?, ?)",
+                (MIGRACAO_FILA_JSON, time.time())
+            )
+
+    for caminho in (antigo, log):
+        if os.path.exists(caminho):
+            os.replace(caminho, caminho + ".migrado")
+
+def _ler_fila_json(antigo: str, log: str) -> List[Dict]:
+    """Mensagens pendentes nos arquivos da fila antiga"""
+    pendentes = []
+    if os.path.exists(antigo):
+        try:
+            with open(antigo, 'r', encoding='utf-8') as f:
+                pendentes.extend(json.load(f))
+        except json.JSONDecodeError:
+            pass
+
+    if os.path.exists(log):
+        inicio = 0
+        try:
+            with open(log + ".offset", 'r', encoding='utf-8') as f:
+                marcador = json.load(f)
+            if marcador.get("inode") == os.stat(log).st_ino:
+                inicio = marcador.get("offset", 0)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        with open(log, 'rb') as f:
+            f.seek(inicio)
+            for linha in f:
+                if linha.endswith(b"\n") and linha.strip():
+                    pendentes.append(json.loads(linha))
+    return pendentes
+
+def _inserir(conexao: sqlite3.Connection, fila: str, corpos: List[Dict]) -> List[str]:
+    agora = time.time()
+    ids = [c.get("mensagem_id") or f"msg_{uuid.uuid4().hex[:8]}" for c in corpos]
+    conexao.executemany(
+        "INSERT INTO mensagens (fila, id, corpo, enviada_em, visivel_em) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (fila, mid, json.dumps(c, ensure_ascii=False), agora, agora)
+            for mid, c in zip(ids, corpos)
+        ]
+    )
+    return ids
+
+# ==================== ENVIO ====================
+
+def enviar(corpo: Dict, fila: str = FILA_PADRAO) -> str:
+    """Envia uma mensagem para a fila e retorna seu id"""
+    return enviar_lote([corpo], fila)[0]
+
+def enviar_lote(corpos: List[Dict], fila: str = FILA_PADRAO) -> List[str]:
+    """Envia várias mensagens em uma única transação"""
+    if not corpos:
+        return []
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        ids = _inserir(conexao, fila, corpos)
+    MENSAGENS.inc(len(ids), fila=fila, evento="enviada")
+    _notificar()
+    return ids
+
+# ==================== DEDUPLICAÇÃO ====================
+
+def chave_deduplicacao(corpo: Dict) -> str:
+    """Chave da mensagem no índice: a do produtor ou, sem ela, o mensagem_id"""
+    return corpo.get("chave_deduplicacao") or f"mensagem:{corpo.get('mensagem_id')}"
+
+def _consultar(conexao: sqlite3.Connection, chave: str, impressao: Optional[str],
+               agora: float) -> Optional[str]:
+    linha = conexao.execute(
+        "SELECT mensagem_id, impressao FROM deduplicacao "
+        "WHERE chave = ? AND criada_em > ?",
+        (chave, agora - TTL_DEDUPLICACAO)
+    ).fetchone()
+    if linha is None:
+        return None
+    if impressao is not None and linha[1] is not None and linha[1] != impressao:
+        raise ChaveReutilizadaError(f"Chave {chave!r} já usada com outro conteúdo")
+    return linha[0]
+
+def mensagem_deduplicada(chave: str, impressao: Optional[str] = None) -> Optional[str]:
+    """
+    mensagem_id já enviado com a chave nos últimos TTL_DEDUPLICACAO
+    segundos, ou None. Com `impressao` (resumo do conteúdo), levanta
+    ChaveReutilizadaError se a chave foi usada para outro conteúdo.
+    """
+    conexao = _conexao()
+    agora = time.time()
+    mensagem_id = _consultar(conexao, chave, impressao, agora)
+    if mensagem_id is not None:
+        with conexao:
+            conexao.execute("UPDATE deduplicacao SET usada_em = ? WHERE chave = ?",
+                            (agora, chave))
+    return mensagem_id
+
+def enviar_deduplicado(corpo: Dict, chave: str, impressao: Optional[str] = None,
+                       fila: str = FILA_PADRAO) -> Tuple[str, bool]:
+    """
+    Envia a mensagem só se a chave não foi usada nos últimos
+    TTL_DEDUPLICACAO segundos; chave e mensagem são gravadas na mesma
+    transação. Retorna (mensagem_id, enviada): numa repetição, o id da
+    mensagem original e False.
+    """
+    agora = time.time()
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        existente = _consultar(conexao, chave, impressao, agora)
+        if existente is not None:
+            conexao.execute("UPDATE deduplicacao SET usada_em = ? WHERE chave = ?",
+                            (agora, chave))
+            return existente, False
+        mensagem_id = _inserir(conexao, fila, [dict(corpo, chave_deduplicacao=chave)])[0]
+        conexao.execute(
+            "INSERT OR REPLACE INTO deduplicacao "
+            "(chave, mensagem_id, impressao, aplicada, criada_em, usada_em) "
+            "VALUES (?, ?, ?, 0, ?, ?)",
+            (chave, mensagem_id, impressao, agora, agora)
+        )
+        _podar(conexao, 1, agora)
+    MENSAGENS.inc(fila=fila, evento="enviada")
+    _notificar()
+    return mensagem_id, True
+
+def chaves_aplicadas(chaves: List[str]) -> Set[str]:
+    """Quais das chaves já foram marcadas como aplicadas pelo consumidor"""
+    if not chaves:
+        return set()
+    conexao = _conexao()
+    aplicadas = set()
+    for i in range(0, len(chaves), 500):
+        bloco = chaves[i:i + 500]
+        marcadores = ",".join("?" * len(bloco))
+        aplicadas.update(chave for (chave,) in conexao.execute(
+            f"SELECT chave FROM deduplicacao WHERE aplicada = 1 AND chave IN ({marcadores})",
+            bloco
+        ))
+    return aplicadas
+
+def marcar_aplicadas(corpos: List[Dict]):
+    """
+    Registra as mensagens como aplicadas (depois de gravar o efeito e
+    antes de confirmar): uma reentrega não será aplicada de novo.
+    """
+    if not corpos:
+        return
+    agora = time.time()
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        conexao.executemany(
+            "INSERT INTO deduplicacao (chave, mensagem_id, aplicada, criada_em, usada_em) "
+            "VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (chave) DO UPDATE SET aplicada = 1, usada_em = excluded.usada_em",
+            [(chave_deduplicacao(c), c.get("mensagem_id", ""), agora, agora) for c in corpos]
+        )
+        _podar(conexao, len(corpos), agora)
+
+def _podar(conexao: sqlite3.Connection, gravadas: int, agora: float):
+    """
+    A cada PODA_A_CADA chaves gravadas, apaga as vencidas e, acima de
+    MAX_CHAVES_DEDUPLICACAO, as usadas há mais tempo (chamar numa transação).
+    """
+    global _gravadas_desde_poda
+    with _poda_trava:
+        _gravadas_desde_poda += gravadas
+        if _gravadas_desde_poda < PODA_A_CADA:
+            return
+        _gravadas_desde_poda = 0
+    conexao.execute("DELETE FROM deduplicacao WHERE criada_em <= ?",
+                    (agora - TTL_DEDUPLICACAO,))
+    conexao.execute(
+        "DELETE FROM deduplicacao WHERE chave IN ("
+        "  SELECT chave FROM deduplicacao ORDER BY usada_em DESC LIMIT -1 OFFSET ?"
+        ")",
+        (MAX_CHAVES_DEDUPLICACAO,)
+    )
+
+# ==================== NOTIFICAÇÃO ====================
+
+def _acordar_locais():
+    global _geracao
+    with _condicao:
+        _geracao += 1
+        _condicao.notify_all()
+
+def _notificar():
+    """
+    Acorda consumidores deste processo e de todos os outros (best-effort:
+    um aviso perdido é coberto pela reconsulta de ESPERA_MAXIMA_COM_ESCUTA)
+    """
+    _acordar_locais()
+    try:
+        notificacao.publicar(CANAL_NOTIFICACAO, {})
+    except OSError:
+        pass
+
+def _escutar(assinatura: notificacao.Assinatura):
+    """Thread de escuta: converte avisos em notify da condição local"""
+    while True:
+        assinatura.receber()
+        # Avisos acumulados valem por um só
+        while assinatura.receber(0) is not None:
+            pass
+        _acordar_locais()
+
+def iniciar_escuta() -> bool:
+    """
+    Assina (uma vez por processo) os avisos de novas mensagens.
+    Retorna False se a assinatura não pôde ser criada; nesse caso
+    receber() usa polling com backoff adaptativo.
+    """
+    global _escuta_ativa, _escuta_pid
+    with _condicao:
+        # Após um fork a thread de escuta não existe no processo filho
+        if _escuta_pid == os.getpid():
+            return _escuta_ativa
+        _escuta_pid = os.getpid()
+        _escuta_ativa = False
+
+        try:
+            assinatura = notificacao.assinar(CANAL_NOTIFICACAO)
+        except OSError:
+            return False
+
+        threading.Thread(target=_escutar, args=(assinatura,), daemon=True,
+                         name="fila-notificacoes").start()
+        _escuta_ativa = True
+        return True
+
+# ==================== RECEBIMENTO ====================
+
+def _receber_visiveis(max_mensagens: int, visibilidade: float, fila: str) -> List[Dict]:
+    """Reserva atomicamente até max_mensagens mensagens visíveis"""
+    conexao = _conexao()
+    agora = time.time()
+    recebidas = []
+
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        linhas = conexao.execute(
+            "SELECT seq, id, corpo, enviada_em, recebimentos FROM mensagens "
+            "WHERE fila = ? AND visivel_em <= ? ORDER BY seq LIMIT ?",
+            (fila, agora, max_mensagens)
+        ).fetchall()
+
+        for seq, mid, corpo, enviada_em, recebimentos in linhas:
+            if recebimentos >= MAX_RECEBIMENTOS:
+                # Falhou vezes demais: move para a DLQ
+                conexao.execute(
+                    "UPDATE mensagens SET fila = ?, visivel_em = ?, "
+                    "recebimentos = 0, recibo = NULL WHERE seq = ?",
+                    (FILA_DLQ, agora, seq)
+                )
+                MENSAGENS.inc(fila=fila, evento="dlq")
+                continue
+
+            if recebimentos == 0:
+                ESPERA_NA_FILA.observar(agora - enviada_em, fila=fila)
+
+            recibo = uuid.uuid4().hex
+            conexao.execute(
+                "UPDATE mensagens SET visivel_em = ?, recebimentos = ?, "
+                "recibo = ? WHERE seq = ?",
+                (agora + visibilidade, recebimentos + 1, recibo, seq)
+            )
+            recebidas.append({
+                "id": mid,
+                "recibo": recibo,
+                "corpo": json.loads(corpo),
+                "enviada_em": enviada_em,
+                "recebimentos": recebimentos + 1,
+            })
+
+    if recebidas:
+        MENSAGENS.inc(len(recebidas), fila=fila, evento="recebida")
+    return recebidas
+
+def receber(max_mensagens: int = 1, tempo_espera: float = 0,
+            visibilidade: float = VISIBILIDADE_PADRAO,
+            fila: str = FILA_PADRAO) -> List[Dict]:
+    """
+    Recebe até max_mensagens mensagens (máximo MAX_MENSAGENS_POR_LOTE).
+
+    Com tempo_espera > 0 faz long polling: espera até esse número de
+    segundos por pelo menos uma mensagem. A espera é bloqueante e acorda
+    assim que enviar() é chamado em qualquer processo; se a escuta de
+    notificações não estiver disponível, consulta com backoff adaptativo.
+
+    Cada mensagem retornada tem id, recibo, corpo, enviada_em e
+    recebimentos; ela fica invisível por `visibilidade` segundos e deve
+    ser confirmada com confirmar(recibo).
+    """
+    max_mensagens = max(1, min(max_mensagens, MAX_MENSAGENS_POR_LOTE))
+    limite = time.monotonic() + tempo_espera
+    if tempo_espera > 0:
+        iniciar_escuta()
+    backoff = BACKOFF_INICIAL
+
+    while True:
+        with _condicao:
+            geracao = _geracao
+
+        mensagens = _receber_visiveis(max_mensagens, visibilidade, fila)
+        restante = limite - time.monotonic()
+        if mensagens or restante <= 0:
+            return mensagens
+
+        espera = ESPERA_MAXIMA_COM_ESCUTA if _escuta_ativa else backoff
+        with _condicao:
+            # Só dorme se nada chegou desde a consulta acima
+            if _geracao == geracao:
+                _condicao.wait(min(espera, restante))
+        backoff = min(backoff * 2, BACKOFF_MAXIMO)
+
+def confirmar(recibo: str) -> bool:
+    """Confirma o processamento (apaga a mensagem). Retorna False se o recibo expirou"""
+    return confirmar_lote([recibo]) == 1
+
+def confirmar_lote(recibos: List[str]) -> int:
+    """Confirma várias mensagens; retorna quantas foram apagadas"""
+    if not recibos:
+        return 0
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        cursor = conexao.executemany(
+            "DELETE FROM mensagens WHERE recibo = ?",
+            [(r,) for r in recibos]
+        )
+        return cursor.rowcount
+
+def alterar_visibilidade(recibo: str, segundos: float) -> bool:
+    """Muda o tempo de invisibilidade de uma mensagem recebida (0 devolve à fila)"""
+    conexao = _conexao()
+    with conexao:
+        cursor = conexao.execute(
+            "UPDATE mensagens SET visivel_em = ? WHERE recibo = ?",
+            (time.time() + segundos, recibo)
+        )
+        return cursor.rowcount == 1
+
+# ==================== CONSULTA ====================
+
+def contar(fila: str = FILA_PADRAO) -> int:
+    """Quantidade de mensagens na fila (visíveis ou em processamento)"""
+    linha = _conexao().execute(
+        "SELECT total FROM contagens WHERE fila = ?", (fila,)
+    ).fetchone()
+    return linha[0] if linha else 0
+
+def listar(fila: str = FILA_PADRAO, limite: Optional[int] = None) -> List[Dict]:
+    """Corpos das mensagens da fila, em ordem de chegada (para debug)"""
+    linhas = _conexao().execute(
+        "SELECT corpo FROM mensagens WHERE fila = ? ORDER BY seq LIMIT ?",
+        (fila, -1 if limite is None else limite)
+    ).fetchall()
+    return [json.loads(corpo) for (corpo,) in linhas]
\ No newline at end of file
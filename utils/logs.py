@@ -0,0 +1,157 @@
+"""
+Logging estruturado das lambdas e do servidor da API.
+
+Os eventos saem em JSON (uma linha por evento) e são escritos por uma
+thread em segundo plano: quem loga só enfileira o registro
+(QueueHandler), sem esperar pelo stdout. Linhas por lance passam por
+amostragem, para não dominarem o processamento sob carga.
+
+Configuração pelas variáveis de ambiente:
+
+    LEILAO_LOG_NIVEL=INFO          DEBUG, INFO, WARNING, ERROR
+    LEILAO_LOG_FORMATO=json        json ou texto
+    LEILAO_LOG_AMOSTRAGEM=0.01     fração das linhas por lance registradas
+
+Campos estruturados vão em `extra`:
+
+    log.info("lote processado", extra={"processados": 10, "rejeitados": 2})
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+NIVEL = os.environ.get("LEILAO_LOG_NIVEL", "INFO").upper()
+FORMATO = os.environ.get("LEILAO_LOG_FORMATO", "json")
+AMOSTRAGEM = float(os.environ.get("LEILAO_LOG_AMOSTRAGEM", "0.01"))
+
+# Logger raiz do sistema e logger das linhas por lance (com amostragem)
+RAIZ = "leilao"
+LANCES = "leilao.lances"
+
+# Atributos de todo LogRecord; o resto veio de `extra`
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "erro",
+}
+
+_trava = threading.Lock()
+_ouvinte: Optional[QueueListener] = None
+_pid: Optional[int] = None
+
+def _campos_extras(registro: logging.LogRecord) -> dict:
+    return {
+        chave: valor for chave, valor in vars(registro).items()
+        if chave not in _ATRIBUTOS_PADRAO
+    }
+
+class FormatadorJson(logging.Formatter):
+    """Um objeto JSON por linha: ts, nivel, logger, msg e os campos extras"""
+
+    def format(self, registro: logging.LogRecord) -> str:
+        evento = {
+            "ts": datetime.fromtimestamp(registro.created).isoformat(timespec="milliseconds"),
+            "nivel": registro.levelname,
+            "logger": registro.name,
+            "msg": registro.getMessage(),
+        }
+        evento.update(_campos_extras(registro))
+        if getattr(registro, "erro", None):
+            evento["erro"] = registro.erro
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+class FormatadorTexto(logging.Formatter):
+    """Formato legível para o terminal: campos extras como chave=valor"""
+
+    def format(self, registro: logging.LogRecord) -> str:
+        hora = datetime.fromtimestamp(registro.created).strftime("%H:%M:%S.%f")[:-3]
+        campos = " ".join(f"{chave}={valor}" for chave, valor in _campos_extras(registro).items())
+        linha = f"{hora} {registro.levelname:<7} {registro.getMessage()}"
+        if campos:
+            linha += f"  {campos}"
+        if getattr(registro, "erro", None):
+            linha += "\n" + registro.erro
+        return linha
+
+class FiltroAmostragem(logging.Filter):
+    """Deixa passar só uma fração dos registros abaixo de WARNING"""
+
+    def __init__(self, taxa: float):
+        super().__init__()
+        self.taxa = taxa
+
+    def filter(self, registro: logging.LogRecord) -> bool:
+        return registro.levelno >= logging.WARNING or random.random() < self.taxa
+
+class _ManipuladorFila(QueueHandler):
+    """
+    Enfileira o registro já com a mensagem resolvida e a exceção como
+    texto (campo erro), mantendo os campos extras para o formatador.
+    """
+
+    def prepare(self, registro: logging.LogRecord) -> logging.LogRecord:
+        registro.msg = registro.getMessage()
+        registro.args = None
+        if registro.exc_info:
+            registro.erro = logging.Formatter().formatException(registro.exc_info)
+            registro.exc_info = None
+            registro.exc_text = None
+        return registro
+
+def _parar():
+    if _ouvinte is not None and _pid == os.getpid():
+        _ouvinte.stop()
+
+def configurar():
+    """
+    Configura o logger "leilao" (uma vez por processo; de novo em
+    processos filhos, que não herdam a thread de escrita).
+    """
+    global _ouvinte, _pid
+    with _trava:
+        if _pid == os.getpid():
+            return
+
+        saida = logging.StreamHandler(sys.stdout)
+        saida.setFormatter(FormatadorTexto() if FORMATO == "texto" else FormatadorJson())
+        fila = queue.SimpleQueue()
+
+        raiz = logging.getLogger(RAIZ)
+        for manipulador in list(raiz.handlers):
+            raiz.removeHandler(manipulador)
+        raiz.addHandler(_ManipuladorFila(fila))
+        raiz.setLevel(NIVEL)
+        raiz.propagate = False
+
+        lances = logging.getLogger(LANCES)
+        for filtro in list(lances.filters):
+            lances.removeFilter(filtro)
+        lances.addFilter(FiltroAmostragem(AMOSTRAGEM))
+
+        _ouvinte = QueueListener(fila, saida)
+        _ouvinte.start()
+        if _pid is None:
+            atexit.register(_parar)
+        _pid = os.getpid()
+
+def encerrar():
+    """
+    Escreve os registros pendentes do processo. Para saídas que não
+    passam pelo atexit (os._exit, ex.: workers do servidor.py).
+    """
+    global _pid
+    with _trava:
+        if _ouvinte is not None and _pid == os.getpid():
+            _ouvinte.stop()
+            _pid = None
+
+def obter(nome: str) -> logging.Logger:
+    """Logger "leilao.<nome>" (ex.: obter("processador"), obter("lances"))"""
+    return logging.getLogger(f"{RAIZ}.{nome}")
@@ -0,0 +1,231 @@
+"""
+Métricas no formato de texto do Prometheus (contadores e histogramas).
+
+A API expõe /metrics; as lambdas exportam por HTTP local ou por arquivo,
+conforme as variáveis de ambiente (ver iniciar_exportacao()):
+
+    LEILAO_METRICAS_PORTA=9101            servidor HTTP em /metrics
+    LEILAO_METRICAS_ARQUIVO=data/x.prom   reescreve o arquivo periodicamente
+
+Cada métrica aceita rótulos como argumentos nomeados:
+
+    REQUISICOES.inc(rota="/lances", status=202)
+    with DURACAO.cronometrar(arquivo="leiloes.json"):
+        ...
+"""
+
+import atexit
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from utils import logs
+
+# Limites dos buckets de latência (segundos)
+LIMITES_LATENCIA = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                    0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Intervalo de regravação do arquivo de métricas (segundos)
+INTERVALO_ARQUIVO = 5
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+log = logs.obter("metricas")
+
+_registro: Dict[str, "Metrica"] = {}
+_registro_trava = threading.Lock()
+
+def _chave(rotulos: Dict) -> Tuple:
+    return tuple(sorted((nome, str(valor)) for nome, valor in rotulos.items()))
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _formatar_rotulos(chave: Tuple, extra: Tuple = ()) -> str:
+    pares = chave + extra
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str):
+        self.nome = nome
+        self.ajuda = ajuda
+        self._trava = threading.Lock()
+
+    def linhas(self) -> List[str]:
+        raise NotImplementedError
+
+class Contador(Metrica):
+    """Valor que só cresce (eventos, bytes)"""
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str):
+        super().__init__(nome, ajuda)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, valor: float = 1, **rotulos):
+        chave = _chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos) -> float:
+        with self._trava:
+            return self._valores.get(_chave(rotulos), 0)
+
+    def linhas(self) -> List[str]:
+        with self._trava:
+            valores = sorted(self._valores.items())
+        return [
+            f"{self.nome}{_formatar_rotulos(chave)} {_formatar_numero(valor)}"
+            for chave, valor in valores
+        ]
+
+class Histograma(Metrica):
+    """Distribuição de valores (latências) em buckets cumulativos"""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, limites: Tuple = LIMITES_LATENCIA):
+        super().__init__(nome, ajuda)
+        self.limites = tuple(sorted(limites))
+        # chave -> [contagens por bucket (+Inf no fim), soma]
+        self._series: Dict[Tuple, list] = {}
+
+    def observar(self, valor: float, **rotulos):
+        chave = _chave(rotulos)
+        posicao = bisect.bisect_left(self.limites, valor)
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][posicao] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        """Observa a duração do bloco em segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def linhas(self) -> List[str]:
+        with self._trava:
+            series = sorted((chave, list(contagens), soma)
+                            for chave, (contagens, soma) in self._series.items())
+        linhas = []
+        for chave, contagens, soma in series:
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float("inf"),), contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(chave, (("le", _formatar_numero(float(limite))),))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_formatar_rotulos(chave)} {soma!r}")
+            linhas.append(f"{self.nome}_count{_formatar_rotulos(chave)} {acumulado}")
+        return linhas
+
+def _registrar(classe, nome: str, ajuda: str, *args):
+    with _registro_trava:
+        metrica = _registro.get(nome)
+        if metrica is None:
+            metrica = _registro[nome] = classe(nome, ajuda, *args)
+        elif not isinstance(metrica, classe):
+            raise ValueError(f"Métrica {nome} já registrada como {metrica.tipo}")
+        return metrica
+
+def contador(nome: str, ajuda: str) -> Contador:
+    """Retorna o contador `nome`, criando-o na primeira chamada"""
+    return _registrar(Contador, nome, ajuda)
+
+def histograma(nome: str, ajuda: str, limites: Tuple = LIMITES_LATENCIA) -> Histograma:
+    """Retorna o histograma `nome`, criando-o na primeira chamada"""
+    return _registrar(Histograma, nome, ajuda, limites)
+
+def exportar_texto() -> str:
+    """Todas as métricas no formato de exposição do Prometheus"""
+    with _registro_trava:
+        metricas = sorted(_registro.values(), key=lambda m: m.nome)
+    linhas = []
+    for metrica in metricas:
+        linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+        linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+        linhas.extend(metrica.linhas())
+    return "\n".join(linhas) + "\n"
+
+# ==================== EXPORTAÇÃO DAS LAMBDAS ====================
+
+class _Manipulador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = exportar_texto().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TIPO_CONTEUDO)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *_):
+        pass
+
+def iniciar_servidor(porta: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics numa thread em segundo plano"""
+    servidor = ThreadingHTTPServer((host, porta), _Manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True,
+                     name="metricas-http").start()
+    return servidor
+
+def gravar_arquivo(caminho: str):
+    """Grava as métricas atuais no arquivo (troca atômica)"""
+    with open(caminho + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(exportar_texto())
+    os.replace(caminho + ".tmp", caminho)
+
+def iniciar_arquivo(caminho: str, intervalo: float = INTERVALO_ARQUIVO):
+    """Regrava o arquivo de métricas a cada `intervalo` segundos"""
+    def gravar_periodicamente():
+        while True:
+            time.sleep(intervalo)
+            try:
+                gravar_arquivo(caminho)
+            except OSError:
+                pass
+
+    threading.Thread(target=gravar_periodicamente, daemon=True,
+                     name="metricas-arquivo").start()
+    # Grava também na saída, para execuções curtas
+    atexit.register(gravar_arquivo, caminho)
+
+def iniciar_exportacao() -> Optional[str]:
+    """
+    Liga a exportação configurada no ambiente (usada pelas lambdas).
+    O caminho do arquivo aceita {pid}, útil com workers em processos.
+    Retorna uma descrição do destino, ou None se nada foi configurado.
+    """
+    porta = os.environ.get("LEILAO_METRICAS_PORTA")
+    arquivo = os.environ.get("LEILAO_METRICAS_ARQUIVO")
+    destinos = []
+    if porta:
+        try:
+            iniciar_servidor(int(porta))
+            destinos.append(f"http://127.0.0.1:{porta}/metrics")
+        except OSError as e:
+            log.warning("porta de métricas indisponível", extra={"porta": porta, "erro": str(e)})
+    if arquivo:
+        arquivo = arquivo.format(pid=os.getpid())
+        iniciar_arquivo(arquivo)
+        destinos.append(arquivo)
+    return ", ".join(destinos) or None
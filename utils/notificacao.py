@@ -0,0 +1,255 @@
+"""
+Notificações locais entre processos (publish/subscribe best-effort).
+
+Cada assinante abre um socket UDP em 127.0.0.1 numa porta efêmera e se
+registra criando o arquivo data/canais/<canal>/<porta>. publicar() envia
+o evento (JSON) a todas as portas registradas no canal.
+
+Todos os assinantes recebem cada evento (o aviso de novas mensagens da
+fila, em utils/fila.py, acorda assim todos os consumidores). Eventos
+podem se perder; quem assina deve ter uma ressincronização periódica
+como rede de segurança.
+
+Difusor distribui os eventos de um canal dentro do processo por chave
+(ex.: leilao_id): uma única assinatura alimenta qualquer número de
+ouvintes locais, cada um com a sua fila.
+"""
+
+import atexit
+import json
+import os
+import queue
+import select
+import socket
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from utils import storage
+
+HOST = "127.0.0.1"
+# Maior evento aceito (um datagrama UDP)
+TAMANHO_MAXIMO = 60000
+# Eventos pendentes por ouvinte do Difusor; além disso descarta os mais antigos
+PENDENTES_POR_OUVINTE = 100
+
+_envio_trava = threading.Lock()
+_socket_envio: Optional[socket.socket] = None
+
+def _diretorio_canal(canal: str) -> str:
+    return os.path.join(storage.DATA_DIR, "canais", canal)
+
+def _processo_vivo(pid: int) -> bool:
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _limpar_registros_orfaos(diretorio: str):
+    """Remove registros de assinantes cujo processo já terminou"""
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            continue
+        if pid and not _processo_vivo(pid):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+# ==================== PUBLICAÇÃO ====================
+
+def publicar(canal: str, evento: Dict) -> int:
+    """
+    Envia o evento a todos os assinantes do canal.
+    Retorna quantos assinantes foram avisados (nunca levanta erro de rede).
+    """
+    return publicar_varios(canal, [evento])
+
+def publicar_varios(canal: str, eventos: Iterable[Dict]) -> int:
+    """
+    Envia vários eventos, listando os assinantes uma única vez.
+    Sem assinantes, os eventos nem são serializados.
+    Retorna quantos envios foram feitos.
+    """
+    global _socket_envio
+    diretorio = _diretorio_canal(canal)
+    try:
+        portas = os.listdir(diretorio)
+    except FileNotFoundError:
+        return 0
+    if not portas:
+        return 0
+
+    pacotes = []
+    for evento in eventos:
+        dados = json.dumps(evento, ensure_ascii=False).encode("utf-8")
+        if len(dados) > TAMANHO_MAXIMO:
+            raise ValueError(f"Evento maior que {TAMANHO_MAXIMO} bytes")
+        pacotes.append(dados)
+
+    avisados = 0
+    with _envio_trava:
+        if _socket_envio is None:
+            _socket_envio = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _socket_envio.setblocking(False)
+        for porta in portas:
+            for dados in pacotes:
+                try:
+                    _socket_envio.sendto(dados, (HOST, int(porta)))
+                    avisados += 1
+                except (OSError, ValueError):
+                    # Assinante sumiu ou buffer cheio: o evento se perde
+                    pass
+    return avisados
+
+# ==================== ASSINATURA ====================
+
+class Assinatura:
+    """Inscrição de um processo num canal; use receber() para ler eventos"""
+
+    def __init__(self, canal: str):
+        self.canal = canal
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((HOST, 0))
+        self._socket.setblocking(False)
+        self.porta = self._socket.getsockname()[1]
+        self._pid = os.getpid()
+
+        diretorio = _diretorio_canal(canal)
+        os.makedirs(diretorio, exist_ok=True)
+        _limpar_registros_orfaos(diretorio)
+        self._registro = os.path.join(diretorio, str(self.porta))
+        with open(self._registro, 'w', encoding='utf-8') as f:
+            f.write(str(os.getpid()))
+        atexit.register(self.fechar)
+
+    def fileno(self) -> int:
+        return self._socket.fileno()
+
+    def receber(self, tempo_espera: Optional[float] = None) -> Optional[Dict]:
+        """
+        Retorna o próximo evento, esperando até tempo_espera segundos
+        (None espera indefinidamente). Retorna None se nada chegou.
+        """
+        limite = None if tempo_espera is None else time.monotonic() + tempo_espera
+        while True:
+            try:
+                dados = self._socket.recv(TAMANHO_MAXIMO)
+            except (BlockingIOError, InterruptedError):
+                dados = None
+            if dados:
+                try:
+                    return json.loads(dados)
+                except ValueError:
+                    continue
+
+            restante = None if limite is None else limite - time.monotonic()
+            if restante is not None and restante <= 0:
+                return None
+            select.select([self._socket], [], [], restante)
+
+    def fechar(self):
+        # Um processo filho (fork) não desfaz a inscrição do pai
+        if self._socket.fileno() == -1 or os.getpid() != self._pid:
+            return
+        try:
+            os.remove(self._registro)
+        except FileNotFoundError:
+            pass
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+def assinar(canal: str) -> Assinatura:
+    """Inscreve o processo atual no canal"""
+    return Assinatura(canal)
+
+# ==================== DIFUSÃO NO PROCESSO ====================
+
+class Difusor:
+    """
+    Reparte os eventos de um canal entre ouvintes do processo, pela
+    chave `campo` de cada evento. A assinatura (e a thread que a lê) só
+    é criada na primeira inscrição e é uma só por processo, qualquer que
+    seja o número de ouvintes.
+    """
+
+    def __init__(self, canal: str, campo: str):
+        self.canal = canal
+        self.campo = campo
+        self._ouvintes: Dict[str, Set[queue.Queue]] = {}
+        self._trava = threading.Lock()
+        self._pid: Optional[int] = None
+
+    def _iniciar(self):
+        # Sob a trava; um processo filho (fork) cria a sua própria assinatura
+        if self._pid == os.getpid():
+            return
+        assinatura = Assinatura(self.canal)
+        threading.Thread(target=self._distribuir, args=(assinatura,), daemon=True,
+                         name=f"difusor-{self.canal}").start()
+        self._pid = os.getpid()
+
+    def _distribuir(self, assinatura: Assinatura):
+        while True:
+            evento = assinatura.receber()
+            if not isinstance(evento, dict):
+                continue
+            with self._trava:
+                ouvintes = list(self._ouvintes.get(evento.get(self.campo), ()))
+            for fila in ouvintes:
+                _entregar(fila, evento)
+
+    def inscrever(self, chave: str) -> queue.Queue:
+        """Fila que passa a receber os eventos da chave"""
+        fila = queue.Queue(maxsize=PENDENTES_POR_OUVINTE)
+        with self._trava:
+            self._iniciar()
+            self._ouvintes.setdefault(chave, set()).add(fila)
+        return fila
+
+    def cancelar(self, chave: str, fila: queue.Queue):
+        with self._trava:
+            ouvintes = self._ouvintes.get(chave)
+            if ouvintes is None:
+                return
+            ouvintes.discard(fila)
+            if not ouvintes:
+                del self._ouvintes[chave]
+
+    def encerrar(self):
+        """Entrega None a todos os ouvintes do processo: hora de terminar"""
+        with self._trava:
+            filas = [fila for filas in self._ouvintes.values() for fila in filas]
+        for fila in filas:
+            _entregar(fila, None)
+
+    def ouvintes(self) -> int:
+        """Total de ouvintes inscritos no processo"""
+        with self._trava:
+            return sum(len(filas) for filas in self._ouvintes.values())
+
+def _entregar(fila: queue.Queue, evento: Optional[Dict]):
+    """Entrega sem bloquear; um ouvinte lento perde os eventos mais antigos"""
+    while True:
+        try:
+            fila.put_nowait(evento)
+            return
+        except queue.Full:
+            try:
+                fila.get_nowait()
+            except queue.Empty:
+                pass
@@ -0,0 +1,139 @@
+"""
+Saldo reservado dos usuários.
+
+Além do saldo total, cada usuário guarda as reservas dos seus lances que
+lideram leilões e a soma delas:
+
+    "saldo": 1000.0,
+    "reservado": 300.0,
+    "reservas": {"lance_msg_1a2b": {"leilao_id": "leilao_1", "valor": 300.0, "criada_em": ...}}
+
+O processador reserva o valor quando o lance passa a liderar e libera a
+reserva do líder anterior quando ele é superado; o finalizador liquida a
+reserva do vencedor (debita do saldo). O leilão aponta para o lance que
+o lidera (lance_lider_id).
+
+A verificação de saldo é O(1), qualquer que seja o histórico de lances:
+disponível = saldo - reservado, somando a reserva que o usuário já tem
+no leilão quando cobre o próprio lance.
+"""
+
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.storage import (
+    atualizar_se_versao, buscar_leilao, ler_json, versao_do_registro,
+    ConflitoDeVersaoError, TENTATIVAS_CAS
+)
+
+# Reservas mais novas que isso não são tocadas pela reconciliação (podem
+# ser de um lance ainda sendo gravado)
+IDADE_MINIMA_RECONCILIACAO = 300
+
+# ==================== CONSULTA ====================
+
+def reservado(usuario: Dict) -> float:
+    return usuario.get('reservado', 0.0)
+
+def disponivel(usuario: Dict) -> float:
+    """Saldo livre para novos lances"""
+    return usuario['saldo'] - reservado(usuario)
+
+def credito_no_leilao(usuario_id: str, usuario: Dict, leilao: Optional[Dict]) -> float:
+    """Reserva do usuário no leilão que ele já lidera (volta a ficar livre se cobrir o próprio lance)"""
+    if leilao is None or leilao.get('lider_id') != usuario_id:
+        return 0.0
+    reserva = usuario.get('reservas', {}).get(leilao.get('lance_lider_id'))
+    return reserva['valor'] if reserva else 0.0
+
+# ==================== CAMPOS DO USUÁRIO ====================
+
+def _campos(reservas: Dict[str, Dict]) -> Dict:
+    return {"reservas": reservas, "reservado": sum(r['valor'] for r in reservas.values())}
+
+def com_reservas(usuario: Dict, novas: Iterable[Tuple[str, str, float]]) -> Dict:
+    """Campos do usuário com as reservas (lance_id, leilao_id, valor) incluídas"""
+    reservas = dict(usuario.get('reservas', {}))
+    agora = time.time()
+    for lance_id, leilao_id, valor in novas:
+        reservas[lance_id] = {"leilao_id": leilao_id, "valor": valor, "criada_em": agora}
+    return _campos(reservas)
+
+def sem_reservas(usuario: Dict, lance_ids: Iterable[str]) -> Optional[Dict]:
+    """Campos do usuário sem as reservas dos lances (None se não tem nenhuma delas)"""
+    reservas = dict(usuario.get('reservas', {}))
+    removidas = [reservas.pop(lance_id) for lance_id in lance_ids if lance_id in reservas]
+    return _campos(reservas) if removidas else None
+
+def com_liquidacao(usuario: Dict, lance_ids: Iterable[str]) -> Optional[Dict]:
+    """Campos do usuário com as reservas debitadas do saldo (None se já liquidadas)"""
+    reservas = dict(usuario.get('reservas', {}))
+    removidas = [reservas.pop(lance_id) for lance_id in lance_ids if lance_id in reservas]
+    if not removidas:
+        return None
+    return dict(_campos(reservas), saldo=usuario['saldo'] - sum(r['valor'] for r in removidas))
+
+# ==================== GRAVAÇÃO ====================
+
+def _aplicar(operacoes: Dict[str, List[str]],
+             calcular: Callable[[Dict, List[str]], Optional[Dict]]):
+    """
+    Aplica calcular(usuario, lance_ids) a cada usuário com
+    compare-and-set, relendo os que mudaram no meio.
+    """
+    pendentes = {usuario_id: lances for usuario_id, lances in operacoes.items() if lances}
+    for _ in range(TENTATIVAS_CAS):
+        if not pendentes:
+            return
+        usuarios = ler_json("usuarios.json")
+        atualizacoes = {}
+        for usuario_id, lance_ids in pendentes.items():
+            usuario = usuarios.get(usuario_id)
+            campos = calcular(usuario, lance_ids) if usuario is not None else None
+            if campos is not None:
+                atualizacoes[usuario_id] = (versao_do_registro(usuario), campos)
+        conflitos = atualizar_se_versao("usuarios.json", atualizacoes) if atualizacoes else []
+        pendentes = {usuario_id: pendentes[usuario_id] for usuario_id in conflitos}
+    if pendentes:
+        raise ConflitoDeVersaoError(f"usuarios.json: reservas de {sorted(pendentes)} em disputa")
+
+def liberar(liberacoes: Dict[str, List[str]]):
+    """Libera reservas ({usuario_id: [lance_id]}): lances superados ou não gravados"""
+    _aplicar(liberacoes, sem_reservas)
+
+def liquidar(liquidacoes: Dict[str, List[str]]):
+    """Debita do saldo as reservas dos lances vencedores ({usuario_id: [lance_id]})"""
+    _aplicar(liquidacoes, com_liquidacao)
+
+# ==================== RECONCILIAÇÃO ====================
+
+def reconciliar(idade_minima: float = IDADE_MINIMA_RECONCILIACAO) -> Dict[str, int]:
+    """
+    Corrige reservas deixadas por uma queda entre as gravações do
+    processador ou do finalizador: a reserva de um lance que não lidera
+    mais o leilão é liberada; a do vencedor de um leilão finalizado é
+    liquidada. Percorre só os usuários com reservas. Retorna as contagens.
+    """
+    from utils.arquivamento import buscar_leilao_arquivado
+
+    limite = time.time() - idade_minima
+    liberacoes: Dict[str, List[str]] = {}
+    liquidacoes: Dict[str, List[str]] = {}
+    for usuario_id, usuario in ler_json("usuarios.json").items():
+        for lance_id, reserva in usuario.get('reservas', {}).items():
+            if reserva.get('criada_em', 0) > limite:
+                continue
+            leilao = (buscar_leilao(reserva['leilao_id'])
+                      or buscar_leilao_arquivado(reserva['leilao_id']))
+            lidera = leilao is not None and leilao.get('lance_lider_id') == lance_id
+            if lidera and leilao['status'] == 'finalizado':
+                liquidacoes.setdefault(usuario_id, []).append(lance_id)
+            elif not lidera:
+                liberacoes.setdefault(usuario_id, []).append(lance_id)
+
+    liberar(liberacoes)
+    liquidar(liquidacoes)
+    return {
+        "liberadas": sum(len(l) for l in liberacoes.values()),
+        "liquidadas": sum(len(l) for l in liquidacoes.values()),
+    }
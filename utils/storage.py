@@ -1,81 +1,1150 @@
+import bisect
+import itertools
 import json
 import os
-from typing import Any, Dict, List
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 DATA_DIR = "data"
 
+# Backend de persistência: "json" (arquivos em data/, padrão), "sqlite"
+# (data/leilao.db, ver utils/storage_sqlite.py) ou "shards" (um arquivo
+# por leilão em data/leiloes/, ver utils/storage_shards.py). Escolhido
+# pela variável de ambiente LEILAO_STORAGE antes de importar o módulo.
+BACKEND = os.environ.get("LEILAO_STORAGE", "json")
+
+# Janela (em ns) em que um arquivo recém-modificado não é confiado ao cache.
+# Duas escritas no mesmo "tick" do sistema de arquivos com o mesmo tamanho
+# teriam a mesma assinatura, então arquivos muito recentes são relidos.
+JANELA_RACY_NS = 50_000_000
+
+# Arquivos mantidos como log append-only (JSON Lines). Os chamadores
+# continuam usando o nome antigo (ex.: ler_json("lances.json")).
+# A fila SQS simulada fica em utils/fila.py.
+ARQUIVOS_LOG = {
+    "lances.json": "lances.jsonl",
+}
+
+# Durabilidade das escritas (variável LEILAO_DURABILIDADE):
+# - "nenhuma": sem fsync; uma queda de energia pode perder as últimas escritas
+# - "fsync": fsync a cada escrita antes de retornar
+# - "grupo": group commit; escritas concorrentes esperam um único fsync,
+#   feito a cada INTERVALO_GRUPO segundos
+DURABILIDADE = os.environ.get("LEILAO_DURABILIDADE", "fsync")
+INTERVALO_GRUPO = 0.005
+# Equivalente para os bancos SQLite (fila e backend sqlite, em modo WAL)
+SQLITE_SYNCHRONOUS = {"nenhuma": "OFF", "fsync": "FULL", "grupo": "NORMAL"}
+
+# Journal write-ahead opcional dos documentos JSON (LEILAO_JOURNAL=1): cada
+# escrita é registrada em <arquivo>.journal antes de substituir o arquivo,
+# e a recuperação reaplica o último estado bom se o arquivo estiver
+# corrompido ou atrás do journal.
+JOURNAL = os.environ.get("LEILAO_JOURNAL") == "1"
+# Acima deste tamanho o journal é reduzido ao último registro
+LIMITE_JOURNAL = 4 * 1024 * 1024
+
+# Tentativas de uma atualização otimista (compare-and-set) em conflito
+TENTATIVAS_CAS = 10
+
+class ConflitoDeVersaoError(Exception):
+    """Um compare-and-set conflitou em todas as tentativas"""
+
+class ArquivoCorrompidoError(Exception):
+    """Arquivo de dados ilegível e sem journal para recuperá-lo"""
+
+DURACAO_LEITURA = metricas.histograma(
+    "leilao_storage_leitura_segundos", "Tempo de ler_json (com cache) por arquivo")
+BYTES_LIDOS = metricas.contador(
+    "leilao_storage_lidos_bytes_total", "Bytes lidos do disco por arquivo")
+DURACAO_ESCRITA = metricas.histograma(
+    "leilao_storage_escrita_segundos", "Tempo de escrita (incluindo fsync) por arquivo")
+BYTES_ESCRITOS = metricas.contador(
+    "leilao_storage_escritos_bytes_total", "Bytes gravados por arquivo")
+LINHAS_ILEGIVEIS = metricas.contador(
+    "leilao_storage_linhas_ilegiveis_total", "Linhas de logs JSONL puladas por não serem JSON válido")
+
+# Cache em memória: arquivo -> (assinatura, lido_em_ns, dados)
+_cache: Dict[str, Tuple[Tuple[int, int, int], int, Any]] = {}
+# Cache dos logs: arquivo -> (inode, offset_lido, registros)
+_cache_logs: Dict[str, Tuple[int, int, List[Dict]]] = {}
+_cache_trava = threading.Lock()
+_logs_trava = threading.Lock()
+_estatisticas_cache = {"hits": 0, "misses": 0}
+
+# Índice secundário dos lances por leilão (protegido por _logs_trava):
+# leilao_id -> [(data_hora, id, seq, lance)] em ordem cronológica
+_indice_lances: Dict[str, List[Tuple[str, str, int, Dict]]] = {}
+# leilao_id -> último lance com status "processado"
+_ultimo_processado: Dict[str, Dict] = {}
+_seq_indice = itertools.count()
+
+_travas_locais: Dict[str, threading.Lock] = {}
+_travas_mantidas = threading.local()
+_migracao_feita = False
+_recuperados = set()
+
+# Group commit: caminhos aguardando fsync e a geração do último flush
+_grupo_condicao = threading.Condition()
+_grupo_pendentes = set()
+_grupo_geracao = 0
+_grupo_pid: Optional[int] = None
+
 def garantir_diretorio():
     """Cria o diretório data se não existir"""
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
+def _assinatura(caminho: str) -> Optional[Tuple[int, int, int]]:
+    """Retorna (mtime_ns, tamanho, inode) do arquivo, ou None se não existir"""
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _guardar_no_cache(arquivo: str, assinatura, lido_em: int, dados: Any):
+    with _cache_trava:
+        _cache[arquivo] = (assinatura, lido_em, dados)
+
+def _lido_em_escrita(assinatura) -> int:
+    """
+    lido_em de uma entrada gravada por nós mesmos (write-through): a
+    assinatura foi tomada com a trava, logo após a escrita, então o
+    conteúdo é conhecido e a entrada já vale fora da janela racy.
+    """
+    return assinatura[0] + JANELA_RACY_NS + 1
+
+def estatisticas_cache() -> Dict[str, int]:
+    """Retorna os contadores de hits/misses do cache de leitura"""
+    with _cache_trava:
+        return dict(_estatisticas_cache, arquivos=len(_cache) + len(_cache_logs))
+
+def limpar_cache():
+    """Descarta todo o conteúdo do cache (útil para testes)"""
+    with _cache_trava:
+        _cache.clear()
+        _cache_logs.clear()
+
+@contextmanager
+def _trava_arquivo(arquivo: str):
+    """
+    Trava exclusiva entre threads e processos para um arquivo de dados.
+    Usa um arquivo .lock ao lado do arquivo protegido. É reentrante na
+    mesma thread (ex.: atualizar_leilao -> escrever_json).
+    """
+    mantidas = getattr(_travas_mantidas, "arquivos", None)
+    if mantidas is None:
+        mantidas = _travas_mantidas.arquivos = set()
+    if arquivo in mantidas:
+        yield
+        return
+
+    with _cache_trava:
+        trava_local = _travas_locais.setdefault(arquivo, threading.Lock())
+
+    with trava_local:
+        garantir_diretorio()
+        caminho = os.path.join(DATA_DIR, arquivo + ".lock")
+        with open(caminho, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.001)
+            mantidas.add(arquivo)
+            try:
+                yield
+            finally:
+                mantidas.discard(arquivo)
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    # Group commit adiado enquanto a thread segurava travas
+    alvo = getattr(_travas_mantidas, "alvo_grupo", 0)
+    if alvo and not mantidas:
+        _travas_mantidas.alvo_grupo = 0
+        _aguardar_grupo(alvo)
+
+# ==================== DURABILIDADE ====================
+
+def _fsync_caminho(caminho: str):
+    """fsync de um arquivo ou diretório pelo caminho"""
+    try:
+        fd = os.open(caminho, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # Alguns sistemas (ex.: Windows) não permitem fsync de diretório
+        pass
+    finally:
+        os.close(fd)
+
+def _executar_grupo():
+    """Thread de group commit: um fsync por caminho a cada INTERVALO_GRUPO"""
+    global _grupo_geracao
+    while True:
+        time.sleep(INTERVALO_GRUPO)
+        with _grupo_condicao:
+            if not _grupo_pendentes:
+                continue
+            caminhos = list(_grupo_pendentes)
+            _grupo_pendentes.clear()
+            geracao = _grupo_geracao + 1
+
+        for caminho in caminhos:
+            _fsync_caminho(caminho)
+
+        with _grupo_condicao:
+            _grupo_geracao = geracao
+            _grupo_condicao.notify_all()
+
+def _sincronizar(*caminhos: str):
+    """Torna as escritas nos caminhos duráveis conforme DURABILIDADE"""
+    if DURABILIDADE == "fsync":
+        for caminho in caminhos:
+            _fsync_caminho(caminho)
+    elif DURABILIDADE == "grupo":
+        alvo = _agendar_grupo(caminhos)
+        if getattr(_travas_mantidas, "arquivos", None):
+            # Não espera segurando travas: a espera fica para quando a
+            # última trava da thread for liberada (ver _trava_arquivo)
+            _travas_mantidas.alvo_grupo = max(getattr(_travas_mantidas, "alvo_grupo", 0), alvo)
+        else:
+            _aguardar_grupo(alvo)
+
+def _agendar_grupo(caminhos) -> int:
+    """Inclui os caminhos no próximo fsync em grupo; retorna a geração a esperar"""
+    global _grupo_pid
+    with _grupo_condicao:
+        if _grupo_pid != os.getpid():
+            _grupo_pid = os.getpid()
+            threading.Thread(target=_executar_grupo, daemon=True,
+                             name="storage-group-commit").start()
+        _grupo_pendentes.update(caminhos)
+        # Espera o flush que inclui estes caminhos (o seguinte ao atual)
+        return _grupo_geracao + 1
+
+def _aguardar_grupo(alvo: int):
+    with _grupo_condicao:
+        while _grupo_geracao < alvo:
+            _grupo_condicao.wait()
+
+def _gravar_atomico(caminho: str, conteudo: bytes):
+    """
+    Grava num temporário e troca com os.replace: leitores concorrentes e
+    uma queda no meio da escrita nunca deixam o arquivo pela metade.
+    """
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, 'wb') as f:
+        f.write(conteudo)
+        if DURABILIDADE == "fsync":
+            f.flush()
+            os.fsync(f.fileno())
+    if DURABILIDADE == "grupo":
+        # Os dados precisam estar no disco antes da troca, senão uma queda
+        # pode deixar o arquivo vazio: espera o fsync em grupo do temporário
+        # (dividido com as escritas concorrentes) mesmo segurando travas
+        _aguardar_grupo(_agendar_grupo([temporario]))
+    os.replace(temporario, caminho)
+
+    # O conteúdo já é durável; falta a entrada no diretório
+    _sincronizar(os.path.dirname(caminho) or ".")
+
+def _caminho_journal(arquivo: str) -> str:
+    return os.path.join(DATA_DIR, arquivo + ".journal")
+
+def _registrar_no_journal(arquivo: str, conteudo: bytes):
+    """Anexa o novo conteúdo ao journal (cabeçalho 'crc tamanho' + dados)"""
+    caminho = _caminho_journal(arquivo)
+    registro = b"%08x %d\n" % (zlib.crc32(conteudo), len(conteudo)) + conteudo + b"\n"
+
+    try:
+        tamanho = os.path.getsize(caminho)
+    except FileNotFoundError:
+        tamanho = 0
+
+    if tamanho + len(registro) > LIMITE_JOURNAL:
+        # Checkpoint: o journal passa a conter só o último estado
+        _gravar_atomico(caminho, registro)
+        return
+
+    with open(caminho, 'ab') as f:
+        f.write(registro)
+        if DURABILIDADE == "fsync":
+            f.flush()
+            os.fsync(f.fileno())
+    if DURABILIDADE == "grupo":
+        _sincronizar(caminho)
+
+def _ultimo_registro_journal(arquivo: str) -> Optional[bytes]:
+    """Último registro íntegro (CRC confere) do journal, ou None"""
+    try:
+        with open(_caminho_journal(arquivo), 'rb') as f:
+            dados = f.read()
+    except FileNotFoundError:
+        return None
+
+    ultimo = None
+    posicao = 0
+    while posicao < len(dados):
+        fim_cabecalho = dados.find(b"\n", posicao)
+        if fim_cabecalho < 0:
+            break
+        try:
+            crc, tamanho = dados[posicao:fim_cabecalho].split()
+            crc, tamanho = int(crc, 16), int(tamanho)
+        except ValueError:
+            break
+        conteudo = dados[fim_cabecalho + 1:fim_cabecalho + 1 + tamanho]
+        if len(conteudo) < tamanho or zlib.crc32(conteudo) != crc:
+            break
+        ultimo = conteudo
+        posicao = fim_cabecalho + 1 + tamanho + 1
+    return ultimo
+
+def recuperar(arquivo: str) -> bool:
+    """
+    Reaplica o último estado bom do journal se o arquivo estiver ausente,
+    corrompido ou diferente dele. Retorna True se o arquivo foi reescrito.
+    """
+    with _trava_arquivo(arquivo):
+        conteudo = _ultimo_registro_journal(arquivo)
+        if conteudo is None:
+            return False
+
+        caminho = os.path.join(DATA_DIR, arquivo)
+        try:
+            with open(caminho, 'rb') as f:
+                atual = f.read()
+        except FileNotFoundError:
+            atual = None
+
+        if atual == conteudo:
+            return False
+        _gravar_atomico(caminho, conteudo)
+        return True
+
+# ==================== LOGS JSONL ====================
+
+def _caminho_log(arquivo: str) -> str:
+    return os.path.join(DATA_DIR, ARQUIVOS_LOG[arquivo])
+
+def migrar_para_jsonl():
+    """
+    Migração única dos arquivos antigos em formato array (lances.json)
+    para os logs JSONL. O arquivo antigo é renomeado para <nome>.migrado
+    para não ser migrado de novo.
+    """
+    global _migracao_feita
+    garantir_diretorio()
+
+    for arquivo in ARQUIVOS_LOG:
+        antigo = os.path.join(DATA_DIR, arquivo)
+        if not os.path.exists(antigo):
+            continue
+
+        with _trava_arquivo(arquivo):
+            if not os.path.exists(antigo):
+                continue
+            try:
+                with open(antigo, 'r', encoding='utf-8') as f:
+                    registros = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ArquivoCorrompidoError(f"{antigo} está corrompido: {e}") from e
+            _anexar_log(arquivo, registros, travar=False)
+            os.replace(antigo, antigo + ".migrado")
+
+    _migracao_feita = True
+
+def _garantir_migracao():
+    if not _migracao_feita:
+        migrar_para_jsonl()
+
+def iterar_log(arquivo: str, inicio: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """
+    Leitor em streaming de um log JSONL.
+    Gera (offset_após_registro, registro) a partir do byte `inicio`.
+    Uma última linha incompleta (escrita interrompida) é ignorada e
+    linhas que não são JSON válido são puladas (ver compactar_log).
+    """
+    _garantir_migracao()
+    return _iterar_jsonl(_caminho_log(arquivo), inicio)
+
+def _iterar_jsonl(caminho: str, inicio: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """iterar_log sobre um caminho qualquer (também usado pelos shards)"""
+    for offset, registro in _ler_linhas_jsonl(caminho, inicio):
+        if registro is not None:
+            yield offset, registro
+
+def _ler_linhas_jsonl(caminho: str, inicio: int = 0) -> Iterator[Tuple[int, Optional[Dict]]]:
+    """(offset_após_linha, registro) de cada linha completa; None se a linha é ilegível"""
+    if not os.path.exists(caminho):
+        return
+
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        offset = inicio
+        for linha in f:
+            if not linha.endswith(b"\n"):
+                break
+            offset += len(linha)
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                LINHAS_ILEGIVEIS.inc()
+                registro = None
+            yield offset, registro
+
+def _inicio_de_linha(caminho: str, offset: int) -> bool:
+    """Se o byte `offset` do arquivo começa uma linha (vem logo depois de uma quebra de linha)"""
+    if offset == 0:
+        return True
+    try:
+        with open(caminho, 'rb') as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\n"
+    except FileNotFoundError:
+        return False
+
+def _linhas_jsonl(registros: List[Dict]) -> bytes:
+    return "".join(
+        json.dumps(r, ensure_ascii=False, separators=(',', ':')) + "\n"
+        for r in registros
+    ).encode('utf-8')
+
+def _cortar_linha_incompleta(f):
+    """
+    Corta a última linha do arquivo se ela não termina em quebra de
+    linha (append interrompido por uma queda), para o próximo registro
+    não ser emendado nela. `f` aberto em 'a+b', com a trava do arquivo.
+    """
+    fim = f.seek(0, os.SEEK_END)
+    if fim == 0:
+        return
+    f.seek(fim - 1)
+    if f.read(1) == b"\n":
+        return
+    posicao = fim
+    while posicao > 0:
+        inicio = max(0, posicao - 65536)
+        f.seek(inicio)
+        quebra = f.read(posicao - inicio).rfind(b"\n")
+        if quebra >= 0:
+            f.truncate(inicio + quebra + 1)
+            return
+        posicao = inicio
+    f.truncate(0)
+
+def _anexar_linhas(caminho: str, conteudo: bytes):
+    """
+    Um único write no fim do arquivo, durável conforme DURABILIDADE.
+    Chamar com a trava do arquivo (ver _cortar_linha_incompleta).
+    """
+    with open(caminho, 'a+b') as f:
+        _cortar_linha_incompleta(f)
+        f.write(conteudo)
+        if DURABILIDADE == "fsync":
+            f.flush()
+            os.fsync(f.fileno())
+    if DURABILIDADE == "grupo":
+        _sincronizar(caminho)
+
+def _anexar_log(arquivo: str, registros: List[Dict], travar: bool = True):
+    """Anexa registros ao log com um único write (O(1) no tamanho do log)"""
+    if not registros:
+        return
+
+    conteudo = _linhas_jsonl(registros)
+
+    def gravar():
+        contadores = _copiar_contadores(arquivo) if arquivo in ARQUIVOS_CONTADOS else None
+        with DURACAO_ESCRITA.cronometrar(arquivo=arquivo):
+            _anexar_linhas(_caminho_log(arquivo), conteudo)
+        BYTES_ESCRITOS.inc(len(conteudo), arquivo=arquivo)
+        if contadores is not None:
+            contadores["total"] += len(registros)
+            _salvar_contadores(arquivo, contadores)
+
+    if travar:
+        with _trava_arquivo(arquivo):
+            gravar()
+    else:
+        gravar()
+
+def _reescrever_log(arquivo: str, registros: List[Dict]):
+    """Reescreve o log inteiro atomicamente (usado na compactação)"""
+    _gravar_atomico(_caminho_log(arquivo), _linhas_jsonl(registros))
+    if arquivo in ARQUIVOS_CONTADOS:
+        _salvar_contadores(arquivo, {"total": len(registros)})
+
+def _ler_log_em_cache(arquivo: str) -> List[Dict]:
+    """
+    Retorna todos os registros do log. Como o arquivo só cresce, uma
+    leitura após appends processa apenas os bytes novos.
+    """
+    _garantir_migracao()
+    assinatura = _assinatura(_caminho_log(arquivo))
+    if assinatura is None:
+        return []
+    _, tamanho, inode = assinatura
+
+    with _logs_trava:
+        entrada = _cache_logs.get(arquivo)
+        with _cache_trava:
+            if entrada is not None and entrada[0] == inode and entrada[1] == tamanho:
+                _estatisticas_cache["hits"] += 1
+                return entrada[2]
+            _estatisticas_cache["misses"] += 1
+
+        novos = []
+        offset = inicio = 0
+        # Inode reaproveitado por outro arquivo: o offset lido não cai num
+        # início de linha e o log é relido do começo
+        if (entrada is not None and entrada[0] == inode and entrada[1] < tamanho
+                and _inicio_de_linha(_caminho_log(arquivo), entrada[1])):
+            offset = inicio = entrada[1]
+            for offset, registro in iterar_log(arquivo, entrada[1]):
+                novos.append(registro)
+            registros = entrada[2]
+            registros.extend(novos)
+            if arquivo == "lances.json":
+                _indexar_lances(novos)
+        else:
+            entrada = None
+
+        if entrada is None:
+            registros = []
+            offset = inicio = 0
+            for offset, registro in iterar_log(arquivo):
+                registros.append(registro)
+            if arquivo == "lances.json":
+                _indice_lances.clear()
+                _ultimo_processado.clear()
+                _indexar_lances(registros)
+
+        BYTES_LIDOS.inc(offset - inicio, arquivo=arquivo)
+        with _cache_trava:
+            _cache_logs[arquivo] = (inode, offset, registros)
+        return registros
+
+# ==================== ÍNDICE DE LANCES ====================
+
+def _indexar_lances(lances: List[Dict]):
+    """Insere lances no índice por leilão (chamar com _logs_trava)"""
+    for lance in lances:
+        leilao_id = lance.get('leilao_id')
+        data_hora = lance.get('data_hora', '')
+        bisect.insort(
+            _indice_lances.setdefault(leilao_id, []),
+            (data_hora, lance.get('id', ''), next(_seq_indice), lance)
+        )
+
+        if lance.get('status') == 'processado':
+            atual = _ultimo_processado.get(leilao_id)
+            if atual is None or data_hora >= atual.get('data_hora', ''):
+                _ultimo_processado[leilao_id] = lance
+
+def lances_do_leilao(leilao_id: str) -> List[Dict]:
+    """
+    Retorna os lances de um leilão em ordem cronológica usando o índice
+    por leilão, sem percorrer o histórico inteiro.
+    """
+    _ler_log_em_cache("lances.json")
+    with _logs_trava:
+        return [item[3] for item in _indice_lances.get(leilao_id, [])]
+
+def pagina_lances_do_leilao(leilao_id: str, limite: int,
+                            cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Página de lances de um leilão, do mais recente para o mais antigo.
+    O cursor é a chave (data_hora, id) do último lance devolvido, então
+    lances novos não deslocam as páginas seguintes.
+    Retorna (lances, proximo_cursor).
+    """
+    _ler_log_em_cache("lances.json")
+    with _logs_trava:
+        return _paginar_lances(_indice_lances.get(leilao_id, []), limite, cursor)
+
+def _paginar_lances(itens: List[Tuple], limite: int,
+                    cursor: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+    """Página sobre itens (data_hora, id, seq, lance) em ordem cronológica"""
+    fim = len(itens)
+    if cursor:
+        data_hora, _, lance_id = cursor.partition("|")
+        fim = bisect.bisect_left(itens, (data_hora, lance_id))
+    inicio = max(0, fim - limite)
+    pagina = [item[3] for item in reversed(itens[inicio:fim])]
+
+    proximo = None
+    if inicio > 0 and pagina:
+        proximo = f"{pagina[-1].get('data_hora', '')}|{pagina[-1].get('id', '')}"
+    return pagina, proximo
+
+def ultimo_lance_processado(leilao_id: str) -> Optional[Dict]:
+    """Retorna o lance processado mais recente do leilão (O(1))"""
+    _ler_log_em_cache("lances.json")
+    with _logs_trava:
+        return _ultimo_processado.get(leilao_id)
+
+def ultimos_lances_processados(leilao_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Lance processado mais recente de cada leilão pedido, numa única
+    consulta ao índice. Leilões sem lances ficam de fora do resultado.
+    """
+    _ler_log_em_cache("lances.json")
+    with _logs_trava:
+        return {
+            leilao_id: _ultimo_processado[leilao_id]
+            for leilao_id in leilao_ids
+            if leilao_id in _ultimo_processado
+        }
+
+def compactar_log(arquivo: str) -> int:
+    """
+    Regrava o log sem as linhas ilegíveis (escritas interrompidas de
+    antes do corte feito no append, ou dano no disco) e sem uma última
+    linha incompleta. Só reescreve se houver alguma; retorna quantas
+    linhas foram descartadas.
+    """
+    _garantir_migracao()
+    with _trava_arquivo(arquivo):
+        caminho = _caminho_log(arquivo)
+        registros = []
+        descartadas = fim = 0
+        for fim, registro in _ler_linhas_jsonl(caminho):
+            if registro is None:
+                descartadas += 1
+            else:
+                registros.append(registro)
+        assinatura = _assinatura(caminho)
+        if assinatura is not None and assinatura[1] > fim:
+            descartadas += 1
+        if descartadas:
+            _reescrever_log(arquivo, registros)
+        return descartadas
+
+# ==================== PAGINAÇÃO ====================
+
+# arquivo -> (documento, quantidade_de_chaves, chaves_ordenadas)
+_chaves_ordenadas: Dict[str, Tuple[Any, int, List[str]]] = {}
+
+def _obter_chaves_ordenadas(arquivo: str, dados: Dict) -> List[str]:
+    """Chaves do documento em ordem, reaproveitadas enquanto ele não muda"""
+    with _cache_trava:
+        entrada = _chaves_ordenadas.get(arquivo)
+        if entrada is not None and entrada[0] is dados and entrada[1] == len(dados):
+            return entrada[2]
+
+    chaves = sorted(dados)
+    with _cache_trava:
+        _chaves_ordenadas[arquivo] = (dados, len(dados), chaves)
+    return chaves
+
+def listar_pagina(arquivo: str, limite: int, cursor: Optional[str] = None,
+                  filtro: Optional[Callable[[Dict], bool]] = None) -> Tuple[Dict, Optional[str]]:
+    """
+    Paginação por chave (keyset) de um documento {id: registro}.
+    Os registros são ordenados pelo id e o cursor é o último id devolvido.
+    Retorna (registros_da_pagina, proximo_cursor).
+    """
+    dados = ler_json(arquivo)
+    chaves = _obter_chaves_ordenadas(arquivo, dados)
+
+    posicao = bisect.bisect_right(chaves, cursor) if cursor else 0
+    pagina = {}
+    ultimo = None
+    while posicao < len(chaves) and len(pagina) < limite:
+        chave = chaves[posicao]
+        posicao += 1
+        registro = dados.get(chave)
+        if registro is None or (filtro is not None and not filtro(registro)):
+            continue
+        pagina[chave] = registro
+        ultimo = chave
+
+    proximo = ultimo if posicao < len(chaves) else None
+    return pagina, proximo
+
+# ==================== CONTADORES ====================
+
+# Arquivos com contadores mantidos a cada escrita (para o /status)
+ARQUIVOS_CONTADOS = ("usuarios.json", "leiloes.json", "lances.json")
+
+# arquivo -> (assinatura do arquivo de dados, contadores)
+_contadores: Dict[str, Tuple[Any, Dict]] = {}
+
+def _caminho_contadores(arquivo: str) -> str:
+    return os.path.join(DATA_DIR, arquivo + ".contadores")
+
+def _assinatura_contada(arquivo: str):
+    """Assinatura do arquivo de dados à qual os contadores se referem"""
+    if arquivo in ARQUIVOS_LOG:
+        assinatura = _assinatura(_caminho_log(arquivo))
+        # Logs só crescem: (inode, tamanho) basta e vale como offset
+        return None if assinatura is None else [assinatura[2], assinatura[1]]
+    assinatura = _assinatura(os.path.join(DATA_DIR, arquivo))
+    return None if assinatura is None else list(assinatura)
+
+def _contar(arquivo: str, dados: Any) -> Dict:
+    """Contagem completa a partir do documento (só quando não há contadores válidos)"""
+    if arquivo == "leiloes.json":
+        por_status: Dict[str, int] = {}
+        for leilao in dados.values():
+            status = leilao.get('status')
+            por_status[status] = por_status.get(status, 0) + 1
+        return {"total": len(dados), "por_status": por_status}
+    return {"total": len(dados)}
+
+def _salvar_contadores(arquivo: str, contadores: Dict):
+    """
+    Grava os contadores junto com a assinatura atual do arquivo de dados.
+    Chamado com a trava do arquivo; sem fsync, pois contadores de uma
+    assinatura que não bate mais são simplesmente recalculados.
+    """
+    assinatura = _assinatura_contada(arquivo)
+    with _cache_trava:
+        _contadores[arquivo] = (assinatura, contadores)
+    caminho = _caminho_contadores(arquivo)
+    with open(caminho + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"assinatura": assinatura, "contadores": contadores}, f)
+    os.replace(caminho + ".tmp", caminho)
+
+def _ler_contadores(arquivo: str) -> Dict:
+    """
+    Contadores do arquivo no estado atual. Normalmente custa um stat
+    (memória do processo) ou a leitura do pequeno arquivo .contadores
+    gravado por outro processo; só recalcula se o arquivo de dados foi
+    alterado por fora da API ou uma escrita foi interrompida.
+    """
+    assinatura = _assinatura_contada(arquivo)
+    if assinatura is None:
+        return _contar(arquivo, {})
+
+    with _cache_trava:
+        entrada = _contadores.get(arquivo)
+    if entrada is not None and entrada[0] == assinatura:
+        return entrada[1]
+
+    salvo = None
+    try:
+        with open(_caminho_contadores(arquivo), 'r', encoding='utf-8') as f:
+            salvo = json.load(f)
+    except (FileNotFoundError, ValueError):
+        pass
+    if salvo is not None and salvo.get("assinatura") == assinatura:
+        with _cache_trava:
+            _contadores[arquivo] = (assinatura, salvo["contadores"])
+        return salvo["contadores"]
+
+    with _trava_arquivo(arquivo):
+        assinatura_salva = salvo.get("assinatura") if salvo else None
+        if (arquivo in ARQUIVOS_LOG and assinatura_salva
+                and assinatura_salva[0] == _assinatura_contada(arquivo)[0]
+                and _inicio_de_linha(_caminho_log(arquivo), assinatura_salva[1])):
+            # Mesmo log, só cresceu: conta apenas as linhas novas
+            contadores = dict(salvo["contadores"])
+            contadores["total"] += sum(1 for _ in iterar_log(arquivo, assinatura_salva[1]))
+        else:
+            contadores = _contar(arquivo, ler_json(arquivo))
+        _salvar_contadores(arquivo, contadores)
+        return contadores
+
+def _copiar_contadores(arquivo: str) -> Dict:
+    """Cópia dos contadores atuais, para ajustar antes de uma escrita"""
+    contadores = _ler_contadores(arquivo)
+    copia = dict(contadores)
+    if "por_status" in copia:
+        copia["por_status"] = dict(copia["por_status"])
+    return copia
+
+def _trocar_status(contadores: Dict, antigo: Optional[str], novo: Optional[str]):
+    por_status = contadores["por_status"]
+    if antigo is not None:
+        por_status[antigo] = por_status.get(antigo, 0) - 1
+        if por_status[antigo] <= 0:
+            del por_status[antigo]
+    if novo is not None:
+        por_status[novo] = por_status.get(novo, 0) + 1
+
+def contadores() -> Dict:
+    """
+    Totais de usuários, leilões (por status) e lances, mantidos a cada
+    escrita: não lê nem percorre os arquivos de dados.
+    """
+    usuarios = _ler_contadores("usuarios.json")
+    leiloes = _ler_contadores("leiloes.json")
+    lances = _ler_contadores("lances.json")
+    return {
+        "usuarios": usuarios["total"],
+        "leiloes": leiloes["total"],
+        "leiloes_por_status": dict(leiloes["por_status"]),
+        "lances": lances["total"],
+    }
+
+# ==================== VERSÕES ====================
+
+def versao(arquivo: str, chave: Optional[str] = None) -> Tuple[str, float]:
+    """
+    Versão atual dos dados sem ler o documento: (token, modificado_em).
+    O token muda a cada escrita; modificado_em é um epoch em segundos
+    (0.0 se ainda não há dados). Serve para ETag/Last-Modified.
+
+    Em lances.json, `chave` é um leilao_id e a versão cobre só os lances
+    desse leilão (custa um stat e, se o log cresceu, a leitura das linhas
+    novas). Nos documentos usuarios/leiloes o backend JSON versiona o
+    arquivo inteiro e ignora a `chave`.
+    """
+    if arquivo in ARQUIVOS_LOG:
+        assinatura = _assinatura(_caminho_log(arquivo))
+        if assinatura is None:
+            return "0", 0.0
+        mtime_ns, tamanho, inode = assinatura
+        if chave is None:
+            return f"{inode:x}.{tamanho:x}", mtime_ns / 1e9
+        _ler_log_em_cache(arquivo)
+        with _logs_trava:
+            entrada = _cache_logs.get(arquivo)
+            inode = entrada[0] if entrada else inode
+            # O log só cresce: a quantidade de lances identifica o conteúdo
+            total = len(_indice_lances.get(chave, ()))
+        return f"{inode:x}.{total:x}", mtime_ns / 1e9
+
+    assinatura = _assinatura(os.path.join(DATA_DIR, arquivo))
+    if assinatura is None:
+        return "0", 0.0
+    mtime_ns, tamanho, inode = assinatura
+    return f"{inode:x}.{mtime_ns:x}.{tamanho:x}", mtime_ns / 1e9
+
+# ==================== API DE ARQUIVOS ====================
+
 def ler_json(arquivo: str) -> Any:
     """
     Lê um arquivo JSON e retorna seu conteúdo.
-    Se o arquivo não existir, retorna estrutura vazia apropriada.
+    Se o arquivo não existir, retorna estrutura vazia apropriada; se
+    estiver corrompido, recupera pelo journal ou levanta
+    ArquivoCorrompidoError.
+
+    O conteúdo fica em cache e só é relido quando o mtime/tamanho do
+    arquivo muda, de modo que escritas feitas pelas lambdas (outros
+    processos) continuam visíveis. O objeto retornado é compartilhado e
+    não deve ser modificado: para alterar, grave uma cópia com
+    escrever_json() (ou use as funções de registro abaixo). Assim o
+    cache só reflete a mudança depois que a escrita deu certo.
+
+    lances.json é servido a partir do log JSONL; fila_sqs.json retorna
+    as mensagens pendentes da fila (utils/fila.py).
     """
+    with DURACAO_LEITURA.cronometrar(arquivo=arquivo):
+        return _ler_json(arquivo)
+
+def _ler_json(arquivo: str) -> Any:
+    if arquivo == "fila_sqs.json":
+        from utils import fila
+        return fila.listar()
+    if arquivo in ARQUIVOS_LOG:
+        return _ler_log_em_cache(arquivo)
+
     garantir_diretorio()
     caminho = os.path.join(DATA_DIR, arquivo)
-    
-    if not os.path.exists(caminho):
+
+    if JOURNAL and arquivo not in _recuperados:
+        # Na primeira leitura do processo, reaplica o journal se preciso
+        _recuperados.add(arquivo)
+        recuperar(arquivo)
+
+    assinatura = _assinatura(caminho)
+    if assinatura is None:
         # Retorna estrutura vazia baseada no nome do arquivo
-        if arquivo == "lances.json" or arquivo == "fila_sqs.json":
-            return []
         return {}
-    
+
+    with _cache_trava:
+        entrada = _cache.get(arquivo)
+        if (entrada is not None and entrada[0] == assinatura
+                and assinatura[0] < entrada[1] - JANELA_RACY_NS):
+            _estatisticas_cache["hits"] += 1
+            return entrada[2]
+        _estatisticas_cache["misses"] += 1
+
+    lido_em = time.time_ns()
     try:
         with open(caminho, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        # Se arquivo está corrompido, retorna estrutura vazia
-        if arquivo == "lances.json" or arquivo == "fila_sqs.json":
-            return []
-        return {}
+            dados = json.load(f)
+        BYTES_LIDOS.inc(assinatura[1], arquivo=arquivo)
+    except json.JSONDecodeError as e:
+        # Nunca devolve {} para um arquivo corrompido: isso apagaria todos
+        # os leilões/usuários na próxima escrita
+        if JOURNAL and recuperar(arquivo):
+            return _ler_json(arquivo)
+        raise ArquivoCorrompidoError(f"{caminho} está corrompido: {e}") from e
+
+    _guardar_no_cache(arquivo, assinatura, lido_em, dados)
+    return dados
 
 def escrever_json(arquivo: str, dados: Any):
     """Escreve dados em um arquivo JSON"""
+    _gravar_documento(arquivo, dados)
+
+def _gravar_documento(arquivo: str, dados: Any, contadores: Optional[Dict] = None):
+    """
+    Implementação de escrever_json. `contadores` são os contadores já
+    ajustados pelo chamador para o novo conteúdo; sem eles, são
+    recontados a partir de `dados`.
+    """
     garantir_diretorio()
+
+    if arquivo in ARQUIVOS_LOG:
+        _garantir_migracao()
+        with _trava_arquivo(arquivo):
+            _reescrever_log(arquivo, dados)
+        with _cache_trava:
+            _cache_logs.pop(arquivo, None)
+        return
+
     caminho = os.path.join(DATA_DIR, arquivo)
-    
-    with open(caminho, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
+    conteudo = json.dumps(dados, indent=2, ensure_ascii=False).encode('utf-8')
+
+    with _trava_arquivo(arquivo), DURACAO_ESCRITA.cronometrar(arquivo=arquivo):
+        if JOURNAL:
+            _registrar_no_journal(arquivo, conteudo)
+        _gravar_atomico(caminho, conteudo)
+        BYTES_ESCRITOS.inc(len(conteudo), arquivo=arquivo)
+        if arquivo in ARQUIVOS_CONTADOS:
+            _salvar_contadores(arquivo, contadores or _contar(arquivo, dados))
+        # Write-through: o próximo ler_json não precisa reabrir o arquivo.
+        # Assinatura tomada ainda com a trava: nenhum outro escritor no meio
+        assinatura = _assinatura(caminho)
+        _guardar_no_cache(arquivo, assinatura, _lido_em_escrita(assinatura), dados)
+
+# ==================== REGISTROS ====================
+
+def buscar_usuario(usuario_id: str) -> Optional[Dict]:
+    """Leitura pontual de um usuário (None se não existir)"""
+    return ler_json("usuarios.json").get(usuario_id)
+
+def buscar_leilao(leilao_id: str) -> Optional[Dict]:
+    """Leitura pontual de um leilão (None se não existir)"""
+    return ler_json("leiloes.json").get(leilao_id)
+
+def leiloes_ativos() -> Dict[str, Dict]:
+    """Leilões com status ativo ({leilao_id: leilao}), usados pelo finalizador"""
+    return {
+        leilao_id: leilao for leilao_id, leilao in ler_json("leiloes.json").items()
+        if leilao['status'] == 'ativo'
+    }
+
+def inserir_usuario(usuario_id: str, usuario: Dict):
+    """Grava um usuário novo (versão 1)"""
+    with _trava_arquivo("usuarios.json"):
+        usuarios = dict(ler_json("usuarios.json"))
+        contadores = _copiar_contadores("usuarios.json")
+        anterior = usuarios.get(usuario_id)
+        if anterior is None:
+            contadores["total"] += 1
+        usuarios[usuario_id] = dict(usuario, versao=versao_do_registro(anterior) + 1)
+        _gravar_documento("usuarios.json", usuarios, contadores)
+
+def inserir_leilao(leilao_id: str, leilao: Dict):
+    """Grava um leilão novo (versão 1)"""
+    with _trava_arquivo("leiloes.json"):
+        leiloes = dict(ler_json("leiloes.json"))
+        contadores = _copiar_contadores("leiloes.json")
+        anterior = leiloes.get(leilao_id)
+        if anterior is None:
+            contadores["total"] += 1
+        _trocar_status(contadores, anterior and anterior.get('status'), leilao.get('status'))
+        leiloes[leilao_id] = dict(leilao, versao=versao_do_registro(anterior) + 1)
+        _gravar_documento("leiloes.json", leiloes, contadores)
+
+# ==================== VERSÃO POR REGISTRO (COMPARE-AND-SET) ====================
+
+def versao_do_registro(registro: Optional[Dict]) -> int:
+    """
+    Versão de um usuário/leilão: 0 se não existe; registros gravados
+    antes do versionamento valem 1. Cada atualização soma 1.
+    """
+    if registro is None:
+        return 0
+    return registro.get('versao', 1)
+
+def _aplicar_atualizacao(arquivo: str, registro: Dict, dados: Dict, contadores: Dict) -> Dict:
+    """Cópia do registro com os dados e a versão seguinte (o registro em cache não muda)"""
+    if arquivo == "leiloes.json" and 'status' in dados:
+        _trocar_status(contadores, registro.get('status'), dados['status'])
+    novo = dict(registro)
+    novo.update(dados)
+    novo['versao'] = versao_do_registro(registro) + 1
+    return novo
+
+def atualizar_se_versao(arquivo: str, atualizacoes: Dict[str, Tuple[int, Dict]]) -> List[str]:
+    """
+    Compare-and-set: aplica cada atualização ({id: (versao_esperada,
+    dados)}) só se o registro ainda estiver na versão esperada, numa
+    única escrita do arquivo. Retorna os ids em conflito (registro
+    alterado ou removido desde a leitura), que ficam sem alteração.
+    """
+    with _trava_arquivo(arquivo):
+        documento = dict(ler_json(arquivo))
+        contadores = _copiar_contadores(arquivo)
+        conflitos = []
+        for registro_id, (versao_esperada, dados) in atualizacoes.items():
+            registro = documento.get(registro_id)
+            if registro is None or versao_do_registro(registro) != versao_esperada:
+                conflitos.append(registro_id)
+                continue
+            documento[registro_id] = _aplicar_atualizacao(arquivo, registro, dados, contadores)
+        if len(conflitos) < len(atualizacoes):
+            _gravar_documento(arquivo, documento, contadores)
+        return conflitos
+
+# ==================== FILA E LANCES ====================
 
 def adicionar_a_fila(mensagem: Dict):
     """Adiciona uma mensagem à fila SQS simulada"""
-    fila = ler_json("fila_sqs.json")
-    fila.append(mensagem)
-    escrever_json("fila_sqs.json", fila)
+    from utils import fila
+    fila.enviar(mensagem)
 
 def consumir_fila() -> List[Dict]:
     """
-    Consome todas as mensagens da fila e retorna.
-    Limpa a fila após consumir.
+    Consome todas as mensagens visíveis da fila e retorna.
+    As mensagens são confirmadas (apagadas) logo após o recebimento;
+    para processamento com confirmação explícita use utils.fila.receber().
     """
-    fila = ler_json("fila_sqs.json")
-    if fila:
-        escrever_json("fila_sqs.json", [])  # Limpa a fila
-    return fila
+    from utils import fila
+    mensagens = []
+    while True:
+        lote = fila.receber(max_mensagens=fila.MAX_MENSAGENS_POR_LOTE)
+        if not lote:
+            return mensagens
+        fila.confirmar_lote([m["recibo"] for m in lote])
+        mensagens.extend(m["corpo"] for m in lote)
 
 def adicionar_lance(lance: Dict):
-    """Adiciona um lance ao histórico"""
-    lances = ler_json("lances.json")
-    lances.append(lance)
-    escrever_json("lances.json", lances)
+    """Adiciona um lance ao histórico (append de uma linha no log)"""
+    _garantir_migracao()
+    _anexar_log("lances.json", [lance])
+    # Lê só a cauda recém-escrita para manter o índice por leilão em dia
+    _ler_log_em_cache("lances.json")
+
+def adicionar_lances(lances: List[Dict]):
+    """Adiciona vários lances ao histórico com um único append"""
+    if not lances:
+        return
+    _garantir_migracao()
+    _anexar_log("lances.json", lances)
+    _ler_log_em_cache("lances.json")
 
 def atualizar_leilao(leilao_id: str, dados: Dict):
     """Atualiza dados de um leilão específico"""
-    leiloes = ler_json("leiloes.json")
-    if leilao_id in leiloes:
-        leiloes[leilao_id].update(dados)
-        escrever_json("leiloes.json", leiloes)
-        return True
-    return False
+    return atualizar_leiloes({leilao_id: dados}) == 1
+
+def atualizar_leiloes(atualizacoes: Dict[str, Dict]) -> int:
+    """
+    Aplica atualizações em vários leilões ({leilao_id: dados}) com uma
+    única escrita de leiloes.json, sem conferir versões (última escrita
+    vence campo a campo; para decisões tomadas sobre uma leitura anterior
+    use atualizar_se_versao). Retorna quantos leilões foram atualizados.
+    """
+    with _trava_arquivo("leiloes.json"):
+        leiloes = dict(ler_json("leiloes.json"))
+        contadores = _copiar_contadores("leiloes.json")
+        atualizados = 0
+        for leilao_id, dados in atualizacoes.items():
+            if leilao_id in leiloes:
+                leiloes[leilao_id] = _aplicar_atualizacao(
+                    "leiloes.json", leiloes[leilao_id], dados, contadores)
+                atualizados += 1
+        if atualizados:
+            _gravar_documento("leiloes.json", leiloes, contadores)
+        return atualizados
 
 def atualizar_usuario(usuario_id: str, dados: Dict):
-    """Atualiza dados de um usuário específico"""
-    usuarios = ler_json("usuarios.json")
-    if usuario_id in usuarios:
-        usuarios[usuario_id].update(dados)
-        escrever_json("usuarios.json", usuarios)
-        return True
-    return False
\ No newline at end of file
+    """Atualiza dados de um usuário específico (sem conferir a versão)"""
+    with _trava_arquivo("usuarios.json"):
+        usuarios = dict(ler_json("usuarios.json"))
+        if usuario_id in usuarios:
+            contadores = _copiar_contadores("usuarios.json")
+            usuarios[usuario_id] = _aplicar_atualizacao(
+                "usuarios.json", usuarios[usuario_id], dados, contadores)
+            _gravar_documento("usuarios.json", usuarios, contadores)
+            return True
+        return False
+
+# ==================== REMOÇÃO (ARQUIVAMENTO) ====================
+
+def remover_leiloes(leilao_ids: List[str]) -> int:
+    """
+    Remove leilões e todos os lances deles do armazenamento quente (o
+    arquivamento chama depois de copiá-los para a camada fria). O log de
+    lances é reescrito sem as linhas desses leilões. Retorna quantos
+    leilões foram removidos.
+    """
+    alvo = set(leilao_ids)
+    if not alvo:
+        return 0
+
+    with _trava_arquivo("leiloes.json"):
+        leiloes = dict(ler_json("leiloes.json"))
+        contadores = _copiar_contadores("leiloes.json")
+        removidos = 0
+        for leilao_id in alvo:
+            registro = leiloes.pop(leilao_id, None)
+            if registro is None:
+                continue
+            contadores["total"] -= 1
+            _trocar_status(contadores, registro.get('status'), None)
+            removidos += 1
+        if removidos:
+            _gravar_documento("leiloes.json", leiloes, contadores)
+
+    _garantir_migracao()
+    with _trava_arquivo("lances.json"):
+        todos = [registro for _, registro in iterar_log("lances.json")]
+        mantidos = [lance for lance in todos if lance.get('leilao_id') not in alvo]
+        if len(mantidos) < len(todos):
+            _reescrever_log("lances.json", mantidos)
+    return removidos
+
+# ==================== BACKENDS ALTERNATIVOS ====================
+
+if BACKEND == "sqlite":
+    # Substitui a API pública pelas mesmas funções sobre SQLite
+    from utils.storage_sqlite import (
+        ler_json, escrever_json, buscar_usuario, buscar_leilao, leiloes_ativos,
+        inserir_usuario, inserir_leilao, adicionar_lance, adicionar_lances,
+        atualizar_leilao, atualizar_leiloes, atualizar_usuario, atualizar_se_versao,
+        lances_do_leilao, pagina_lances_do_leilao, ultimo_lance_processado,
+        ultimos_lances_processados, listar_pagina, contadores, versao,
+        remover_leiloes, compactar_log
+    )
+elif BACKEND == "shards":
+    # Leilões e lances em um arquivo por leilão; usuários seguem em JSON
+    from utils.storage_shards import (
+        ler_json, escrever_json, buscar_leilao, leiloes_ativos, inserir_leilao,
+        adicionar_lance, adicionar_lances, atualizar_leilao, atualizar_leiloes,
+        atualizar_se_versao, lances_do_leilao, pagina_lances_do_leilao,
+        ultimo_lance_processado, ultimos_lances_processados, listar_pagina,
+        contadores, versao, remover_leiloes, compactar_log
+    )
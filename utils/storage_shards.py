@@ -0,0 +1,718 @@
+"""
+Backend do utils.storage com um arquivo por leilão (shards).
+
+Cada leilão e o seu histórico de lances ficam em arquivos próprios,
+distribuídos em subdiretórios pelo hash do id:
+
+    data/leiloes/<xx>/<leilao_id>.json    registro do leilão
+    data/leiloes/<xx>/<leilao_id>.jsonl   lances do leilão (append-only)
+    data/leiloes/manifesto.json           {leilao_id: {status, data_fim}}
+    data/leiloes/alteracoes.jsonl         uma linha por escrita
+
+Um lance ou uma atualização de preço grava só os arquivos do próprio
+leilão, sob a trava do seu subdiretório. O manifesto (listagem e
+contagem por status) só é regravado quando um leilão é criado ou muda
+de status/data_fim, e o arquivo de alterações (versão da coleção e
+total de lances) só recebe appends. Usuários continuam em usuarios.json. Ativado com
+LEILAO_STORAGE=shards.
+
+O layout de arquivo único (leiloes.json + lances.jsonl) é migrado no
+primeiro acesso e os arquivos antigos são renomeados para *.migrado.
+Migração explícita, a partir de outro diretório:
+    LEILAO_STORAGE=shards python -m utils.storage_shards --migrar [diretorio_json]
+"""
+
+import bisect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils import storage
+
+DIRETORIO = "leiloes"
+# Subdiretórios de shards (evita diretórios com milhares de arquivos)
+BUCKETS = 256
+MANIFESTO = os.path.join(DIRETORIO, "manifesto.json")
+ALTERACOES = os.path.join(DIRETORIO, "alteracoes.jsonl")
+# Lances de leilao_id inválido (não viram nome de arquivo)
+LANCES_INVALIDOS = os.path.join(DIRETORIO, "lances_invalidos.jsonl")
+# Ponto de controle do total de lances, regravado a cada N bytes lidos
+PONTO_DE_CONTROLE = os.path.join(DIRETORIO, "alteracoes.contadores")
+INTERVALO_PONTO_DE_CONTROLE = 1024 * 1024
+
+# Implementações do backend JSON, que seguem valendo para usuarios.json
+# e a fila (capturadas antes de utils.storage trocar a API pública)
+_ler_json_documento = storage.ler_json
+_escrever_json_documento = storage.escrever_json
+_atualizar_se_versao_documento = storage.atualizar_se_versao
+_listar_pagina_documento = storage.listar_pagina
+_versao_documento = storage.versao
+
+_trava = threading.Lock()
+# caminho relativo -> (assinatura, lido_em, dados)
+_cache: Dict[str, Tuple[Any, int, Any]] = {}
+# (manifesto, chaves ordenadas, contagem por status)
+_indice: List[Any] = [None, [], {}]
+
+_trava_lances = threading.Lock()
+# leilao_id -> [inode, offset, itens (data_hora, id, seq, lance), último processado]
+_cache_lances: Dict[str, list] = {}
+_seq = itertools.count()
+
+_trava_total = threading.Lock()
+# Leitura incremental de alteracoes.jsonl: [inode, offset, total de lances]
+_total_lances: List[Any] = [None, 0, 0]
+
+_layouts_prontos = set()
+
+# ==================== CAMINHOS ====================
+
+def _id_valido(leilao_id: Any) -> bool:
+    return (isinstance(leilao_id, str) and leilao_id != "" and not leilao_id.startswith(".")
+            and "/" not in leilao_id and "\\" not in leilao_id)
+
+def _relativo(leilao_id: str, extensao: str) -> str:
+    bucket = f"{zlib.crc32(leilao_id.encode('utf-8')) % BUCKETS:02x}"
+    return os.path.join(DIRETORIO, bucket, f"{leilao_id}.{extensao}")
+
+def _relativo_lances(leilao_id: str) -> str:
+    return _relativo(leilao_id, "jsonl") if _id_valido(leilao_id) else LANCES_INVALIDOS
+
+def _caminho(relativo: str) -> str:
+    return os.path.join(storage.DATA_DIR, relativo)
+
+def caminho_dos_lances(leilao_id: str) -> str:
+    """Caminho do log de lances do leilão"""
+    return _caminho(_relativo_lances(leilao_id))
+
+def _preparar(relativo: str):
+    os.makedirs(os.path.dirname(_caminho(relativo)), exist_ok=True)
+
+def _trava_shard(relativo: str):
+    """
+    Trava do subdiretório do arquivo (data/leiloes/<xx>.lock), compartilhada
+    pelo registro e pelo log de lances de todos os leilões do bucket: no
+    máximo BUCKETS arquivos .lock, em vez de dois por leilão que nunca saem
+    do disco. Nunca é adquirida segurando a trava de outro bucket.
+    """
+    return storage._trava_arquivo(os.path.dirname(relativo))
+
+# ==================== ARQUIVOS ====================
+
+def _ler(relativo: str) -> Optional[Any]:
+    """Documento JSON em cache, relido só quando a assinatura muda (None se não existe)"""
+    caminho = _caminho(relativo)
+    assinatura = storage._assinatura(caminho)
+    if assinatura is None:
+        return None
+
+    with _trava:
+        entrada = _cache.get(relativo)
+    if (entrada is not None and entrada[0] == assinatura
+            and assinatura[0] < entrada[1] - storage.JANELA_RACY_NS):
+        return entrada[2]
+
+    lido_em = time.time_ns()
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError as e:
+        raise storage.ArquivoCorrompidoError(f"{caminho} está corrompido: {e}") from e
+    storage.BYTES_LIDOS.inc(assinatura[1], arquivo=os.path.basename(relativo)
+                            if relativo == MANIFESTO else "leiloes.json")
+
+    with _trava:
+        _cache[relativo] = (assinatura, lido_em, dados)
+    return dados
+
+def _gravar(relativo: str, dados: Any, rotulo: str):
+    """Grava um documento atomicamente (chamar com a trava do arquivo ou do shard)"""
+    caminho = _caminho(relativo)
+    conteudo = json.dumps(dados, indent=2, ensure_ascii=False).encode('utf-8')
+    with storage.DURACAO_ESCRITA.cronometrar(arquivo=rotulo):
+        storage._gravar_atomico(caminho, conteudo)
+    storage.BYTES_ESCRITOS.inc(len(conteudo), arquivo=rotulo)
+    assinatura = storage._assinatura(caminho)
+    with _trava:
+        _cache[relativo] = (assinatura, storage._lido_em_escrita(assinatura), dados)
+
+def _registrar_alteracoes(alteracoes: List[Dict]):
+    """
+    Anexa as alterações ({"leilao_id", "lances"?}) ao arquivo comum. Sem
+    fsync: só alimenta versões e contagens. A trava (sempre a última
+    adquirida) impede que appends grandes de processos diferentes se
+    intercalem.
+    """
+    if not alteracoes:
+        return
+    with storage._trava_arquivo(ALTERACOES), open(_caminho(ALTERACOES), 'a+b') as f:
+        storage._cortar_linha_incompleta(f)
+        f.write(storage._linhas_jsonl(alteracoes))
+
+# ==================== MANIFESTO ====================
+
+def _resumo(leilao: Dict) -> Dict:
+    return {"status": leilao.get('status'), "data_fim": leilao.get('data_fim')}
+
+def _ler_manifesto() -> Dict[str, Dict]:
+    return _ler(MANIFESTO) or {}
+
+def _indice_manifesto() -> Tuple[List[str], Dict[str, int]]:
+    """Ids em ordem e contagem por status, recalculados só quando o manifesto muda"""
+    manifesto = _ler_manifesto()
+    with _trava:
+        if _indice[0] is manifesto:
+            return _indice[1], _indice[2]
+
+    por_status: Dict[str, int] = {}
+    for resumo in manifesto.values():
+        por_status[resumo['status']] = por_status.get(resumo['status'], 0) + 1
+    chaves = sorted(manifesto)
+    with _trava:
+        _indice[:] = [manifesto, chaves, por_status]
+    return chaves, por_status
+
+def _atualizar_manifesto(leilao_ids: List[str]):
+    """Regrava as entradas dos leilões a partir dos registros atuais"""
+    with storage._trava_arquivo(MANIFESTO):
+        manifesto = dict(_ler_manifesto())
+        mudou = False
+        for leilao_id in leilao_ids:
+            registro = _ler(_relativo(leilao_id, "json"))
+            resumo = None if registro is None else _resumo(registro)
+            if manifesto.get(leilao_id) == resumo:
+                continue
+            if resumo is None:
+                manifesto.pop(leilao_id, None)
+            else:
+                manifesto[leilao_id] = resumo
+            mudou = True
+        if mudou:
+            _gravar(MANIFESTO, manifesto, "manifesto.json")
+
+def _garantir_layout():
+    """Cria o layout (migrando leiloes.json/lances.jsonl, se existirem) no primeiro acesso"""
+    diretorio = os.path.abspath(storage.DATA_DIR)
+    if diretorio in _layouts_prontos:
+        return
+    _preparar(MANIFESTO)
+    if not os.path.exists(_caminho(MANIFESTO)):
+        with storage._trava_arquivo(MANIFESTO):
+            if not os.path.exists(_caminho(MANIFESTO)):
+                _migrar(storage.DATA_DIR, renomear=True)
+    _layouts_prontos.add(diretorio)
+
+# ==================== LEILÕES COMO MAPEAMENTO ====================
+
+class Leiloes(Mapping):
+    """
+    Visão somente leitura dos leilões como {id: registro}. Acesso por
+    chave lê só o shard do leilão; a iteração segue o manifesto.
+    """
+
+    def __getitem__(self, chave: str) -> Dict:
+        registro = buscar_leilao(chave)
+        if registro is None:
+            raise KeyError(chave)
+        return registro
+
+    def __contains__(self, chave: object) -> bool:
+        return _id_valido(chave) and os.path.exists(_caminho(_relativo(chave, "json")))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_indice_manifesto()[0])
+
+    def __len__(self) -> int:
+        return len(_ler_manifesto())
+
+    def items(self) -> List[Tuple[str, Dict]]:
+        itens = []
+        for chave in _indice_manifesto()[0]:
+            registro = buscar_leilao(chave)
+            if registro is not None:
+                itens.append((chave, registro))
+        return itens
+
+    def values(self) -> List[Dict]:
+        return [registro for _, registro in self.items()]
+
+# ==================== API DE ARQUIVOS ====================
+
+def ler_json(arquivo: str) -> Any:
+    """
+    Mesmo contrato do backend JSON: leiloes.json como Leiloes (leituras
+    por shard sob demanda) e lances.json como lista de todos os lances.
+    """
+    if arquivo == "leiloes.json":
+        _garantir_layout()
+        return Leiloes()
+    if arquivo == "lances.json":
+        _garantir_layout()
+        return [lance for leilao_id in _ids_com_lances() for lance in lances_do_leilao(leilao_id)]
+    return _ler_json_documento(arquivo)
+
+def escrever_json(arquivo: str, dados: Any):
+    """Substitui todos os leilões ou todos os lances; outros arquivos vão ao backend JSON"""
+    if arquivo == "leiloes.json":
+        _garantir_layout()
+        _substituir_leiloes(dados)
+    elif arquivo == "lances.json":
+        _garantir_layout()
+        _substituir_lances(dados)
+    else:
+        _escrever_json_documento(arquivo, dados)
+
+def _substituir_leiloes(leiloes: Dict[str, Dict]):
+    with storage._trava_arquivo(MANIFESTO):
+        for leilao_id in set(_ler_manifesto()) - set(leiloes):
+            try:
+                os.remove(_caminho(_relativo(leilao_id, "json")))
+            except FileNotFoundError:
+                pass
+        for leilao_id, leilao in leiloes.items():
+            if not _id_valido(leilao_id):
+                raise ValueError(f"Id de leilão inválido: {leilao_id!r}")
+            relativo = _relativo(leilao_id, "json")
+            _preparar(relativo)
+            with _trava_shard(relativo):
+                _gravar(relativo, leilao, "leiloes.json")
+        _gravar(MANIFESTO, {lid: _resumo(l) for lid, l in leiloes.items()}, "manifesto.json")
+    _registrar_alteracoes([{"substituido": "leiloes.json"}])
+
+def _ids_com_lances() -> List[str]:
+    ids = []
+    for raiz, _, arquivos in os.walk(_caminho(DIRETORIO)):
+        if raiz == _caminho(DIRETORIO):
+            continue
+        ids.extend(nome[:-len(".jsonl")] for nome in arquivos if nome.endswith(".jsonl"))
+    return sorted(ids)
+
+def _substituir_lances(lances: List[Dict]):
+    por_leilao: Dict[str, List[Dict]] = {}
+    for lance in lances:
+        por_leilao.setdefault(lance.get('leilao_id', ''), []).append(lance)
+
+    for leilao_id in set(_ids_com_lances()) | set(por_leilao):
+        relativo = _relativo_lances(leilao_id)
+        _preparar(relativo)
+        with _trava_shard(relativo):
+            storage._gravar_atomico(_caminho(relativo),
+                                    storage._linhas_jsonl(por_leilao.get(leilao_id, [])))
+    _registrar_alteracoes([{"total_lances": len(lances)}])
+
+# ==================== REGISTROS ====================
+
+def buscar_leilao(leilao_id: str) -> Optional[Dict]:
+    """Leitura do shard de um leilão (None se não existir)"""
+    _garantir_layout()
+    if not _id_valido(leilao_id):
+        return None
+    return _ler(_relativo(leilao_id, "json"))
+
+def leiloes_ativos() -> Dict[str, Dict]:
+    """Leilões com status ativo, escolhidos pelo manifesto (lê só os seus shards)"""
+    _garantir_layout()
+    ativos = {}
+    for leilao_id, resumo in _ler_manifesto().items():
+        if resumo['status'] != 'ativo':
+            continue
+        registro = _ler(_relativo(leilao_id, "json"))
+        if registro is not None:
+            ativos[leilao_id] = registro
+    return ativos
+
+def inserir_leilao(leilao_id: str, leilao: Dict):
+    """Grava um leilão novo (versão 1) e o inclui no manifesto"""
+    _garantir_layout()
+    if not _id_valido(leilao_id):
+        raise ValueError(f"Id de leilão inválido: {leilao_id!r}")
+    relativo = _relativo(leilao_id, "json")
+    _preparar(relativo)
+    with _trava_shard(relativo):
+        anterior = _ler(relativo)
+        _gravar(relativo, dict(leilao, versao=storage.versao_do_registro(anterior) + 1),
+                "leiloes.json")
+    _atualizar_manifesto([leilao_id])
+    _registrar_alteracoes([{"leilao_id": leilao_id}])
+
+def _atualizar(leilao_id: str, dados: Dict,
+               versao_esperada: Optional[int] = None) -> Tuple[bool, bool]:
+    """
+    Atualiza o shard do leilão (se na versão esperada, quando informada).
+    Retorna (atualizado, resumo_do_manifesto_mudou).
+    """
+    if not _id_valido(leilao_id):
+        return False, False
+    relativo = _relativo(leilao_id, "json")
+    if not os.path.exists(_caminho(relativo)):
+        return False, False
+
+    with _trava_shard(relativo):
+        registro = _ler(relativo)
+        if registro is None:
+            return False, False
+        versao_atual = storage.versao_do_registro(registro)
+        if versao_esperada is not None and versao_atual != versao_esperada:
+            return False, False
+        novo = dict(registro)
+        novo.update(dados)
+        novo['versao'] = versao_atual + 1
+        _gravar(relativo, novo, "leiloes.json")
+    return True, _resumo(novo) != _resumo(registro)
+
+def _atualizar_varios(atualizacoes: Dict[str, Tuple[Optional[int], Dict]]) -> List[str]:
+    """Atualiza cada leilão no seu shard; retorna os ids não atualizados"""
+    falhas = []
+    manifesto = []
+    alteracoes = []
+    for leilao_id, (versao_esperada, dados) in atualizacoes.items():
+        atualizado, resumo_mudou = _atualizar(leilao_id, dados, versao_esperada)
+        if not atualizado:
+            falhas.append(leilao_id)
+            continue
+        alteracoes.append({"leilao_id": leilao_id})
+        if resumo_mudou:
+            manifesto.append(leilao_id)
+    if manifesto:
+        _atualizar_manifesto(manifesto)
+    _registrar_alteracoes(alteracoes)
+    return falhas
+
+def atualizar_leilao(leilao_id: str, dados: Dict):
+    """Atualiza dados de um leilão específico (só o seu shard)"""
+    return atualizar_leiloes({leilao_id: dados}) == 1
+
+def atualizar_leiloes(atualizacoes: Dict[str, Dict]) -> int:
+    """Atualiza vários leilões, cada um no seu shard. Retorna quantos foram atualizados"""
+    _garantir_layout()
+    falhas = _atualizar_varios({
+        leilao_id: (None, dados) for leilao_id, dados in atualizacoes.items()
+    })
+    return len(atualizacoes) - len(falhas)
+
+def atualizar_se_versao(arquivo: str, atualizacoes: Dict[str, Tuple[int, Dict]]) -> List[str]:
+    """Compare-and-set por registro; retorna os ids em conflito"""
+    if arquivo != "leiloes.json":
+        return _atualizar_se_versao_documento(arquivo, atualizacoes)
+    _garantir_layout()
+    return _atualizar_varios(atualizacoes)
+
+# ==================== LANCES ====================
+
+def adicionar_lance(lance: Dict):
+    """Adiciona um lance ao log do seu leilão"""
+    adicionar_lances([lance])
+
+def adicionar_lances(lances: List[Dict]):
+    """Adiciona lances com um append por leilão envolvido"""
+    if not lances:
+        return
+    _garantir_layout()
+    por_leilao: Dict[str, List[Dict]] = {}
+    for lance in lances:
+        por_leilao.setdefault(lance.get('leilao_id', ''), []).append(lance)
+
+    for leilao_id, grupo in por_leilao.items():
+        relativo = _relativo_lances(leilao_id)
+        _preparar(relativo)
+        conteudo = storage._linhas_jsonl(grupo)
+        with _trava_shard(relativo), \
+                storage.DURACAO_ESCRITA.cronometrar(arquivo="lances.json"):
+            storage._anexar_linhas(_caminho(relativo), conteudo)
+        storage.BYTES_ESCRITOS.inc(len(conteudo), arquivo="lances.json")
+
+    _registrar_alteracoes([
+        {"leilao_id": leilao_id, "lances": len(grupo)}
+        for leilao_id, grupo in por_leilao.items()
+    ])
+
+def _lances_em_cache(leilao_id: str) -> list:
+    """
+    Entrada do cache de lances do leilão, lendo só as linhas novas do seu
+    log (chamar com _trava_lances): [inode, offset, itens, último processado].
+    """
+    vazia = [None, 0, [], None]
+    if not _id_valido(leilao_id):
+        return vazia
+    caminho = _caminho(_relativo(leilao_id, "jsonl"))
+    assinatura = storage._assinatura(caminho)
+    if assinatura is None:
+        _cache_lances.pop(leilao_id, None)
+        return vazia
+    _, tamanho, inode = assinatura
+
+    entrada = _cache_lances.get(leilao_id)
+    if entrada is None or entrada[0] != inode or entrada[1] > tamanho:
+        entrada = [inode, 0, [], None]
+    if entrada[1] < tamanho:
+        inicio = entrada[1]
+        for offset, lance in storage._iterar_jsonl(caminho, inicio):
+            data_hora = lance.get('data_hora', '')
+            bisect.insort(entrada[2], (data_hora, lance.get('id', ''), next(_seq), lance))
+            if lance.get('status') == 'processado' and (
+                    entrada[3] is None or data_hora >= entrada[3].get('data_hora', '')):
+                entrada[3] = lance
+            entrada[1] = offset
+        storage.BYTES_LIDOS.inc(entrada[1] - inicio, arquivo="lances.json")
+    _cache_lances[leilao_id] = entrada
+    return entrada
+
+def compactar_log(arquivo: str) -> int:
+    """
+    Regrava os logs de lances dos leilões que têm linhas ilegíveis ou
+    uma última linha incompleta (ver storage.compactar_log). Retorna
+    quantas linhas foram descartadas.
+    """
+    if arquivo != "lances.json":
+        return storage.compactar_log(arquivo)
+    _garantir_layout()
+    total = 0
+    alteracoes = []
+    for leilao_id in _ids_com_lances():
+        relativo = _relativo_lances(leilao_id)
+        caminho = _caminho(relativo)
+        with _trava_shard(relativo):
+            lances = []
+            ilegiveis = fim = 0
+            for fim, lance in storage._ler_linhas_jsonl(caminho):
+                if lance is None:
+                    ilegiveis += 1
+                else:
+                    lances.append(lance)
+            incompleta = int(os.path.getsize(caminho) > fim)
+            if not ilegiveis and not incompleta:
+                continue
+            storage._gravar_atomico(caminho, storage._linhas_jsonl(lances))
+        with _trava_lances:
+            _cache_lances.pop(leilao_id, None)
+        total += ilegiveis + incompleta
+        # Linhas completas já entraram no total de lances; a incompleta não
+        if ilegiveis:
+            alteracoes.append({"leilao_id": leilao_id, "lances": -ilegiveis})
+    _registrar_alteracoes(alteracoes)
+    return total
+
+def lances_do_leilao(leilao_id: str) -> List[Dict]:
+    """Lances de um leilão em ordem cronológica (lê só o log do leilão)"""
+    with _trava_lances:
+        return [item[3] for item in _lances_em_cache(leilao_id)[2]]
+
+def pagina_lances_do_leilao(leilao_id: str, limite: int,
+                            cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Página de lances do mais recente para o mais antigo (cursor data_hora|id)"""
+    with _trava_lances:
+        return storage._paginar_lances(_lances_em_cache(leilao_id)[2], limite, cursor)
+
+def ultimo_lance_processado(leilao_id: str) -> Optional[Dict]:
+    """Lance processado mais recente do leilão"""
+    with _trava_lances:
+        return _lances_em_cache(leilao_id)[3]
+
+def ultimos_lances_processados(leilao_ids: List[str]) -> Dict[str, Dict]:
+    """Lance processado mais recente de cada leilão pedido (um log por leilão)"""
+    resultado = {}
+    with _trava_lances:
+        for leilao_id in leilao_ids:
+            lance = _lances_em_cache(leilao_id)[3]
+            if lance is not None:
+                resultado[leilao_id] = lance
+    return resultado
+
+# ==================== REMOÇÃO (ARQUIVAMENTO) ====================
+
+def _remover_arquivo(relativo: str):
+    try:
+        os.remove(_caminho(relativo))
+    except FileNotFoundError:
+        pass
+    with _trava:
+        _cache.pop(relativo, None)
+
+def remover_leiloes(leilao_ids: List[str]) -> int:
+    """Apaga os shards dos leilões (registro e log de lances) e as entradas no manifesto"""
+    _garantir_layout()
+    removidos = []
+    alteracoes = []
+    for leilao_id in leilao_ids:
+        if not _id_valido(leilao_id):
+            continue
+        relativo = _relativo(leilao_id, "json")
+        relativo_lances = _relativo(leilao_id, "jsonl")
+        if not os.path.exists(_caminho(relativo)):
+            continue
+        with _trava_shard(relativo):
+            lances = sum(1 for _ in storage._iterar_jsonl(_caminho(relativo_lances)))
+            _remover_arquivo(relativo)
+            _remover_arquivo(relativo_lances)
+            # Travas por arquivo deixadas por versões anteriores
+            _remover_arquivo(relativo + ".lock")
+            _remover_arquivo(relativo_lances + ".lock")
+        with _trava_lances:
+            _cache_lances.pop(leilao_id, None)
+        removidos.append(leilao_id)
+        alteracoes.append({"leilao_id": leilao_id, "lances": -lances})
+
+    if removidos:
+        _atualizar_manifesto(removidos)
+    _registrar_alteracoes(alteracoes)
+    return len(removidos)
+
+# ==================== CONTADORES E VERSÕES ====================
+
+def _ler_total_lances() -> int:
+    """
+    Total de lances somando as linhas novas de alteracoes.jsonl; um
+    processo novo parte do ponto de controle em vez do início do arquivo.
+    """
+    caminho = _caminho(ALTERACOES)
+    assinatura = storage._assinatura(caminho)
+    if assinatura is None:
+        return 0
+    _, tamanho, inode = assinatura
+
+    with _trava_total:
+        inode_lido, offset, total = _total_lances
+        if inode_lido != inode or offset > tamanho:
+            offset, total = 0, 0
+            try:
+                with open(_caminho(PONTO_DE_CONTROLE), 'r', encoding='utf-8') as f:
+                    ponto = json.load(f)
+                if ponto["inode"] == inode and ponto["offset"] <= tamanho:
+                    offset, total = ponto["offset"], ponto["total"]
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+
+        inicio = offset
+        for offset, alteracao in storage._iterar_jsonl(caminho, offset):
+            if "total_lances" in alteracao:
+                total = alteracao["total_lances"]
+            else:
+                total += alteracao.get("lances", 0)
+        _total_lances[:] = [inode, offset, total]
+
+        if offset - inicio >= INTERVALO_PONTO_DE_CONTROLE:
+            # Temporário por processo: vários processos podem gravar o ponto de controle
+            storage._gravar_atomico(_caminho(PONTO_DE_CONTROLE), json.dumps(
+                {"inode": inode, "offset": offset, "total": total}).encode('utf-8'))
+        return total
+
+def contadores() -> Dict:
+    """Totais do /status: manifesto (leilões), alterações (lances) e usuarios.json"""
+    _garantir_layout()
+    _, por_status = _indice_manifesto()
+    return {
+        "usuarios": storage._ler_contadores("usuarios.json")["total"],
+        "leiloes": sum(por_status.values()),
+        "leiloes_por_status": dict(por_status),
+        "lances": _ler_total_lances(),
+    }
+
+def _versao_do_arquivo(relativo: str, com_mtime: bool) -> Tuple[str, float]:
+    assinatura = storage._assinatura(_caminho(relativo))
+    if assinatura is None:
+        return "0", 0.0
+    mtime_ns, tamanho, inode = assinatura
+    if com_mtime:
+        return f"{inode:x}.{mtime_ns:x}.{tamanho:x}", mtime_ns / 1e9
+    return f"{inode:x}.{tamanho:x}", mtime_ns / 1e9
+
+def versao(arquivo: str, chave: Optional[str] = None) -> Tuple[str, float]:
+    """
+    Versão sem ler dados: o shard do leilão ou o log de lances do leilão
+    (`chave`); sem chave, o arquivo de alterações de toda a coleção.
+    """
+    if arquivo not in ("leiloes.json", "lances.json"):
+        return _versao_documento(arquivo, chave)
+    _garantir_layout()
+    if chave is None:
+        return _versao_do_arquivo(ALTERACOES, com_mtime=False)
+    if not _id_valido(chave):
+        return "0", 0.0
+    if arquivo == "leiloes.json":
+        return _versao_do_arquivo(_relativo(chave, "json"), com_mtime=True)
+    return _versao_do_arquivo(_relativo(chave, "jsonl"), com_mtime=False)
+
+# ==================== PAGINAÇÃO ====================
+
+def listar_pagina(arquivo: str, limite: int, cursor: Optional[str] = None,
+                  filtro: Optional[Callable[[Dict], bool]] = None) -> Tuple[Dict, Optional[str]]:
+    """Paginação por id: leilões pelo manifesto, lendo só os shards da página"""
+    if arquivo != "leiloes.json":
+        return _listar_pagina_documento(arquivo, limite, cursor, filtro)
+    _garantir_layout()
+    chaves, _ = _indice_manifesto()
+
+    posicao = bisect.bisect_right(chaves, cursor) if cursor else 0
+    pagina = {}
+    ultimo = None
+    while posicao < len(chaves) and len(pagina) < limite:
+        chave = chaves[posicao]
+        posicao += 1
+        registro = buscar_leilao(chave)
+        if registro is None or (filtro is not None and not filtro(registro)):
+            continue
+        pagina[chave] = registro
+        ultimo = chave
+
+    proximo = ultimo if posicao < len(chaves) else None
+    return pagina, proximo
+
+# ==================== MIGRAÇÃO ====================
+
+def _migrar(diretorio: str, renomear: bool) -> Dict[str, int]:
+    def carregar(nome, padrao):
+        caminho = os.path.join(diretorio, nome)
+        if not os.path.exists(caminho):
+            return padrao
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    leiloes = carregar("leiloes.json", {})
+    lances = carregar("lances.json", [])
+    caminho_log = os.path.join(diretorio, "lances.jsonl")
+    lances.extend(registro for _, registro in storage._iterar_jsonl(caminho_log))
+
+    _substituir_leiloes(leiloes)
+    _substituir_lances(lances)
+
+    if renomear:
+        for nome in ("leiloes.json", "lances.json", "lances.jsonl"):
+            caminho = os.path.join(diretorio, nome)
+            if os.path.exists(caminho):
+                os.replace(caminho, caminho + ".migrado")
+
+    return {"leiloes": len(leiloes), "lances": len(lances)}
+
+def migrar_de_json(diretorio: Optional[str] = None) -> Dict[str, int]:
+    """
+    Copia leiloes.json e o histórico de lances (lances.jsonl ou lances.json
+    antigo) do layout de arquivo único para os shards. Os leilões e lances
+    já em shards são substituídos. Migrando o próprio DATA_DIR, os
+    arquivos antigos são renomeados para *.migrado.
+    Retorna as contagens migradas.
+    """
+    diretorio = diretorio or storage.DATA_DIR
+    _preparar(MANIFESTO)
+    with storage._trava_arquivo(MANIFESTO):
+        contagens = _migrar(diretorio, renomear=os.path.abspath(diretorio)
+                            == os.path.abspath(storage.DATA_DIR))
+    _layouts_prontos.add(os.path.abspath(storage.DATA_DIR))
+    return contagens
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--migrar':
+        contagens = migrar_de_json(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"✓ Migração concluída para {_caminho(DIRETORIO)}")
+        for nome, total in contagens.items():
+            print(f"   {nome}: {total}")
+    else:
+        print("Uso:")
+        print("  python -m utils.storage_shards --migrar [diretorio_json]")
@@ -0,0 +1,612 @@
+"""
+Backend SQLite do utils.storage.
+
+Implementa as mesmas funções do backend JSON sobre um banco SQLite em
+modo WAL (data/leilao.db), com leituras e atualizações pontuais em vez
+de carregar e regravar documentos inteiros. Ativado com
+LEILAO_STORAGE=sqlite.
+
+Os arquivos data/*.json do backend JSON são migrados no primeiro acesso
+e renomeados para *.migrado. Migração explícita, a partir de outro diretório:
+    python -m utils.storage_sqlite --migrar [diretorio_json]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+ARQUIVO_BANCO = "leilao.db"
+# Arquivos do backend JSON migrados para o banco
+ARQUIVOS_JSON = ("usuarios.json", "leiloes.json", "lances.json", "lances.jsonl")
+
+# Registros lidos por consulta ao paginar com filtro
+TAMANHO_BLOCO_PAGINACAO = 500
+# Ids por consulta com IN (...), abaixo do limite de parâmetros do SQLite
+TAMANHO_BLOCO_CONSULTA = 500
+
+_local = threading.local()
+_inicializados = set()
+_inicializacao_trava = threading.Lock()
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id TEXT PRIMARY KEY,
+        dados TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS leiloes (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        data_fim TEXT NOT NULL,
+        dados TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_leiloes_status_fim
+        ON leiloes (status, data_fim);
+    CREATE TABLE IF NOT EXISTS lances (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id TEXT NOT NULL,
+        leilao_id TEXT NOT NULL,
+        data_hora TEXT NOT NULL,
+        status TEXT NOT NULL,
+        dados TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_lances_leilao
+        ON lances (leilao_id, data_hora, id);
+    CREATE INDEX IF NOT EXISTS idx_lances_leilao_status
+        ON lances (leilao_id, status, data_hora, seq);
+"""
+
+# Contadores do /status mantidos por triggers na mesma transação das
+# escritas ('usuarios', 'leiloes', 'leiloes:<status>', 'lances').
+# INSERT OR IGNORE só preenche a contagem inicial na criação da tabela.
+ESQUEMA_CONTADORES = """
+    BEGIN IMMEDIATE;
+    CREATE TABLE IF NOT EXISTS contadores (
+        nome TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO contadores (nome, valor)
+        SELECT 'usuarios', COUNT(*) FROM usuarios;
+    INSERT OR IGNORE INTO contadores (nome, valor)
+        SELECT 'leiloes', COUNT(*) FROM leiloes;
+    INSERT OR IGNORE INTO contadores (nome, valor)
+        SELECT 'lances', COUNT(*) FROM lances;
+    INSERT OR IGNORE INTO contadores (nome, valor)
+        SELECT 'leiloes:' || status, COUNT(*) FROM leiloes GROUP BY status;
+
+    CREATE TRIGGER IF NOT EXISTS contar_usuario_inserido AFTER INSERT ON usuarios
+    BEGIN
+        UPDATE contadores SET valor = valor + 1 WHERE nome = 'usuarios';
+    END;
+    CREATE TRIGGER IF NOT EXISTS contar_usuario_removido AFTER DELETE ON usuarios
+    BEGIN
+        UPDATE contadores SET valor = valor - 1 WHERE nome = 'usuarios';
+    END;
+    CREATE TRIGGER IF NOT EXISTS contar_lance_inserido AFTER INSERT ON lances
+    BEGIN
+        UPDATE contadores SET valor = valor + 1 WHERE nome = 'lances';
+    END;
+    CREATE TRIGGER IF NOT EXISTS contar_lance_removido AFTER DELETE ON lances
+    BEGIN
+        UPDATE contadores SET valor = valor - 1 WHERE nome = 'lances';
+    END;
+    CREATE TRIGGER IF NOT EXISTS contar_leilao_inserido AFTER INSERT ON leiloes
+    BEGIN
+        UPDATE contadores SET valor = valor + 1 WHERE nome = 'leiloes';
+        INSERT INTO contadores (nome, valor) VALUES ('leiloes:' || NEW.status, 1)
+            ON CONFLICT (nome) DO UPDATE SET valor = valor + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS contar_leilao_removido AFTER DELETE ON leiloes
+    BEGIN
+        UPDATE contadores SET valor = valor - 1
+            WHERE nome IN ('leiloes', 'leiloes:' || OLD.status);
+    END;
+    CREATE TRIGGER IF NOT EXISTS contar_status_alterado AFTER UPDATE OF status ON leiloes
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE contadores SET valor = valor - 1 WHERE nome = 'leiloes:' || OLD.status;
+        INSERT INTO contadores (nome, valor) VALUES ('leiloes:' || NEW.status, 1)
+            ON CONFLICT (nome) DO UPDATE SET valor = valor + 1;
+    END;
+    COMMIT;
+"""
+
+# Versões para ETag/Last-Modified, mantidas por triggers: uma por tabela
+# ('usuarios.json') e uma por registro ('leiloes.json:<id>'); os lances
+# são versionados por leilão ('lances.json:<leilao_id>').
+_VERSIONAR = """
+        INSERT INTO versoes (chave, versao, modificado)
+            VALUES ({chave}, 1, (julianday('now') - 2440587.5) * 86400.0)
+            ON CONFLICT (chave) DO UPDATE
+            SET versao = versao + 1, modificado = excluded.modificado;"""
+
+_TRIGGER_VERSAO = """
+    CREATE TRIGGER IF NOT EXISTS versionar_{tabela}_{nome} AFTER {evento} ON {tabela}
+    BEGIN{versionar_tabela}{versionar_registro}
+    END;"""
+
+ESQUEMA_VERSOES = """
+    CREATE TABLE IF NOT EXISTS versoes (
+        chave TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL,
+        modificado REAL NOT NULL
+    );
+""" + "".join(
+    _TRIGGER_VERSAO.format(
+        tabela=tabela, evento=evento, nome=evento.lower(),
+        versionar_tabela=_VERSIONAR.format(chave=f"'{tabela}.json'"),
+        versionar_registro=_VERSIONAR.format(chave=f"'{tabela}.json:' || {linha}.{coluna}")
+    )
+    for tabela, coluna in (("usuarios", "id"), ("leiloes", "id"), ("lances", "leilao_id"))
+    for evento, linha in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+)
+
+def _caminho() -> str:
+    # Importado aqui: utils.storage importa este módulo quando BACKEND == "sqlite"
+    from utils import storage
+    return os.path.join(storage.DATA_DIR, ARQUIVO_BANCO)
+
+def _conexao() -> sqlite3.Connection:
+    """Conexão da thread atual (recriada após fork ou troca de DATA_DIR)"""
+    caminho = _caminho()
+    chave = (caminho, os.getpid())
+    if getattr(_local, "chave", None) != chave:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        conexao = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        # INSERT OR REPLACE dispara o trigger de remoção da linha substituída
+        conexao.execute("PRAGMA recursive_triggers=ON")
+        from utils import storage
+        conexao.execute(f"PRAGMA synchronous={storage.SQLITE_SYNCHRONOUS[storage.DURABILIDADE]}")
+        with _inicializacao_trava:
+            if caminho not in _inicializados:
+                conexao.executescript(ESQUEMA)
+                conexao.executescript(ESQUEMA_CONTADORES)
+                conexao.executescript(ESQUEMA_VERSOES)
+                # A migração grava por esta mesma conexão
+                _local.conexao = conexao
+                _local.chave = chave
+                try:
+                    _migrar_no_primeiro_acesso()
+                except BaseException:
+                    _local.chave = None
+                    raise
+                _inicializados.add(caminho)
+        _local.conexao = conexao
+        _local.chave = chave
+    return _local.conexao
+
+def _json(registro: Dict) -> str:
+    return json.dumps(registro, ensure_ascii=False)
+
+# ==================== TABELAS COMO MAPEAMENTO ====================
+
+class Tabela(Mapping):
+    """
+    Visão somente leitura de usuarios/leiloes como {id: registro}.
+    Acesso por chave (`in`, [], get) faz uma consulta pontual; só a
+    iteração completa percorre a tabela.
+    """
+
+    def __init__(self, tabela: str):
+        self.tabela = tabela
+
+    def __getitem__(self, chave: str) -> Dict:
+        linha = _conexao().execute(
+            f"SELECT dados FROM {self.tabela} WHERE id = ?", (chave,)
+        ).fetchone()
+        if linha is None:
+            raise KeyError(chave)
+        return json.loads(linha[0])
+
+    def __contains__(self, chave: object) -> bool:
+        return _conexao().execute(
+            f"SELECT 1 FROM {self.tabela} WHERE id = ?", (chave,)
+        ).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        linhas = _conexao().execute(f"SELECT id FROM {self.tabela} ORDER BY id")
+        return (chave for (chave,) in linhas.fetchall())
+
+    def __len__(self) -> int:
+        return _conexao().execute(f"SELECT COUNT(*) FROM {self.tabela}").fetchone()[0]
+
+    def items(self) -> List[Tuple[str, Dict]]:
+        linhas = _conexao().execute(
+            f"SELECT id, dados FROM {self.tabela} ORDER BY id"
+        ).fetchall()
+        return [(chave, json.loads(dados)) for chave, dados in linhas]
+
+    def values(self) -> List[Dict]:
+        return [registro for _, registro in self.items()]
+
+TABELAS = {"usuarios.json": "usuarios", "leiloes.json": "leiloes"}
+
+# ==================== API DE ARQUIVOS ====================
+
+def ler_json(arquivo: str) -> Any:
+    """
+    Mesmo contrato do backend JSON. usuarios/leiloes são devolvidos como
+    Tabela (leituras pontuais sob demanda); lances como lista completa.
+    """
+    if arquivo in TABELAS:
+        return Tabela(TABELAS[arquivo])
+    if arquivo == "lances.json":
+        linhas = _conexao().execute("SELECT dados FROM lances ORDER BY seq").fetchall()
+        return [json.loads(dados) for (dados,) in linhas]
+    if arquivo == "fila_sqs.json":
+        from utils import fila
+        return fila.listar()
+    raise ValueError(f"Arquivo sem tabela no backend SQLite: {arquivo}")
+
+def escrever_json(arquivo: str, dados: Any):
+    """Substitui todo o conteúdo da tabela correspondente numa transação"""
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        if arquivo == "usuarios.json":
+            conexao.execute("DELETE FROM usuarios")
+            _inserir_usuarios(conexao, dados.items())
+        elif arquivo == "leiloes.json":
+            conexao.execute("DELETE FROM leiloes")
+            _inserir_leiloes(conexao, dados.items())
+        elif arquivo == "lances.json":
+            conexao.execute("DELETE FROM lances")
+            _inserir_lances(conexao, dados)
+        else:
+            raise ValueError(f"Arquivo sem tabela no backend SQLite: {arquivo}")
+
+def _inserir_usuarios(conexao, itens):
+    conexao.executemany(
+        "INSERT OR REPLACE INTO usuarios (id, dados) VALUES (?, ?)",
+        [(uid, _json(u)) for uid, u in itens]
+    )
+
+def _inserir_leiloes(conexao, itens):
+    conexao.executemany(
+        "INSERT OR REPLACE INTO leiloes (id, status, data_fim, dados) VALUES (?, ?, ?, ?)",
+        [(lid, l['status'], l['data_fim'], _json(l)) for lid, l in itens]
+    )
+
+def _inserir_lances(conexao, lances):
+    conexao.executemany(
+        "INSERT INTO lances (id, leilao_id, data_hora, status, dados) VALUES (?, ?, ?, ?, ?)",
+        [
+            (l.get('id', ''), l.get('leilao_id', ''), l.get('data_hora', ''),
+             l.get('status', ''), _json(l))
+            for l in lances
+        ]
+    )
+
+# ==================== REGISTROS ====================
+
+def buscar_usuario(usuario_id: str) -> Optional[Dict]:
+    """Leitura pontual de um usuário (None se não existir)"""
+    return Tabela("usuarios").get(usuario_id)
+
+def buscar_leilao(leilao_id: str) -> Optional[Dict]:
+    """Leitura pontual de um leilão (None se não existir)"""
+    return Tabela("leiloes").get(leilao_id)
+
+def leiloes_ativos() -> Dict[str, Dict]:
+    """Leilões com status ativo, pelo índice idx_leiloes_status_fim (sem varrer a tabela)"""
+    linhas = _conexao().execute(
+        "SELECT id, dados FROM leiloes WHERE status = 'ativo' ORDER BY data_fim"
+    ).fetchall()
+    return {leilao_id: json.loads(dados) for leilao_id, dados in linhas}
+
+def _ler_registro(conexao, tabela: str, registro_id: str) -> Optional[Dict]:
+    linha = conexao.execute(
+        f"SELECT dados FROM {tabela} WHERE id = ?", (registro_id,)
+    ).fetchone()
+    return None if linha is None else json.loads(linha[0])
+
+def inserir_usuario(usuario_id: str, usuario: Dict):
+    """Grava um usuário novo (versão 1)"""
+    from utils.storage import versao_do_registro
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        anterior = _ler_registro(conexao, "usuarios", usuario_id)
+        usuario = dict(usuario, versao=versao_do_registro(anterior) + 1)
+        _inserir_usuarios(conexao, [(usuario_id, usuario)])
+
+def inserir_leilao(leilao_id: str, leilao: Dict):
+    """Grava um leilão novo (versão 1)"""
+    from utils.storage import versao_do_registro
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        anterior = _ler_registro(conexao, "leiloes", leilao_id)
+        leilao = dict(leilao, versao=versao_do_registro(anterior) + 1)
+        _inserir_leiloes(conexao, [(leilao_id, leilao)])
+
+def _atualizar(conexao, tabela: str, registro_id: str, dados: Dict,
+               versao_esperada: Optional[int] = None) -> bool:
+    """Atualiza o registro (se na versão esperada, quando informada) e soma 1 à versão"""
+    from utils.storage import versao_do_registro
+    registro = _ler_registro(conexao, tabela, registro_id)
+    if registro is None:
+        return False
+    versao_atual = versao_do_registro(registro)
+    if versao_esperada is not None and versao_atual != versao_esperada:
+        return False
+    registro.update(dados)
+    registro['versao'] = versao_atual + 1
+    if tabela == "leiloes":
+        _inserir_leiloes(conexao, [(registro_id, registro)])
+    else:
+        _inserir_usuarios(conexao, [(registro_id, registro)])
+    return True
+
+def atualizar_leilao(leilao_id: str, dados: Dict):
+    """Atualiza dados de um leilão específico"""
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        return _atualizar(conexao, "leiloes", leilao_id, dados)
+
+def atualizar_leiloes(atualizacoes: Dict[str, Dict]) -> int:
+    """Atualiza vários leilões numa única transação"""
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        return sum(
+            _atualizar(conexao, "leiloes", leilao_id, dados)
+            for leilao_id, dados in atualizacoes.items()
+        )
+
+def atualizar_usuario(usuario_id: str, dados: Dict):
+    """Atualiza dados de um usuário específico"""
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        return _atualizar(conexao, "usuarios", usuario_id, dados)
+
+def atualizar_se_versao(arquivo: str, atualizacoes: Dict[str, Tuple[int, Dict]]) -> List[str]:
+    """Compare-and-set numa única transação; retorna os ids em conflito"""
+    tabela = TABELAS[arquivo]
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        return [
+            registro_id
+            for registro_id, (versao_esperada, dados) in atualizacoes.items()
+            if not _atualizar(conexao, tabela, registro_id, dados, versao_esperada)
+        ]
+
+# ==================== LANCES ====================
+
+def adicionar_lance(lance: Dict):
+    """Adiciona um lance ao histórico"""
+    adicionar_lances([lance])
+
+def adicionar_lances(lances: List[Dict]):
+    """Adiciona vários lances numa única transação"""
+    if not lances:
+        return
+    conexao = _conexao()
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        _inserir_lances(conexao, lances)
+
+def lances_do_leilao(leilao_id: str) -> List[Dict]:
+    """Lances de um leilão em ordem cronológica (usa idx_lances_leilao)"""
+    linhas = _conexao().execute(
+        "SELECT dados FROM lances WHERE leilao_id = ? ORDER BY data_hora, id",
+        (leilao_id,)
+    ).fetchall()
+    return [json.loads(dados) for (dados,) in linhas]
+
+def pagina_lances_do_leilao(leilao_id: str, limite: int,
+                            cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Página de lances do mais recente para o mais antigo (cursor data_hora|id)"""
+    if cursor:
+        data_hora, _, lance_id = cursor.partition("|")
+        linhas = _conexao().execute(
+            "SELECT dados FROM lances WHERE leilao_id = ? AND (data_hora, id) < (?, ?) "
+            "ORDER BY data_hora DESC, id DESC LIMIT ?",
+            (leilao_id, data_hora, lance_id, limite + 1)
+        ).fetchall()
+    else:
+        linhas = _conexao().execute(
+            "SELECT dados FROM lances WHERE leilao_id = ? "
+            "ORDER BY data_hora DESC, id DESC LIMIT ?",
+            (leilao_id, limite + 1)
+        ).fetchall()
+
+    pagina = [json.loads(dados) for (dados,) in linhas[:limite]]
+    proximo = None
+    if len(linhas) > limite:
+        proximo = f"{pagina[-1].get('data_hora', '')}|{pagina[-1].get('id', '')}"
+    return pagina, proximo
+
+def ultimo_lance_processado(leilao_id: str) -> Optional[Dict]:
+    """Lance processado mais recente do leilão (usa idx_lances_leilao_status)"""
+    linha = _conexao().execute(
+        "SELECT dados FROM lances WHERE leilao_id = ? AND status = 'processado' "
+        "ORDER BY data_hora DESC, seq DESC LIMIT 1",
+        (leilao_id,)
+    ).fetchone()
+    return json.loads(linha[0]) if linha else None
+
+def ultimos_lances_processados(leilao_ids: List[str]) -> Dict[str, Dict]:
+    """Lance processado mais recente de cada leilão, em blocos de consultas"""
+    conexao = _conexao()
+    resultado = {}
+    for i in range(0, len(leilao_ids), TAMANHO_BLOCO_CONSULTA):
+        bloco = leilao_ids[i:i + TAMANHO_BLOCO_CONSULTA]
+        marcadores = ",".join("?" * len(bloco))
+        linhas = conexao.execute(
+            "SELECT leilao_id, dados FROM ("
+            "  SELECT leilao_id, dados, ROW_NUMBER() OVER ("
+            "    PARTITION BY leilao_id ORDER BY data_hora DESC, seq DESC"
+            "  ) AS posicao FROM lances"
+            f"  WHERE status = 'processado' AND leilao_id IN ({marcadores})"
+            ") WHERE posicao = 1",
+            bloco
+        )
+        for leilao_id, dados in linhas:
+            resultado[leilao_id] = json.loads(dados)
+    return resultado
+
+# ==================== REMOÇÃO (ARQUIVAMENTO) ====================
+
+def remover_leiloes(leilao_ids: List[str]) -> int:
+    """Remove leilões e os lances deles numa única transação"""
+    conexao = _conexao()
+    removidos = 0
+    with conexao:
+        conexao.execute("BEGIN IMMEDIATE")
+        for i in range(0, len(leilao_ids), TAMANHO_BLOCO_CONSULTA):
+            bloco = leilao_ids[i:i + TAMANHO_BLOCO_CONSULTA]
+            marcadores = ",".join("?" * len(bloco))
+            conexao.execute(f"DELETE FROM lances WHERE leilao_id IN ({marcadores})", bloco)
+            removidos += conexao.execute(
+                f"DELETE FROM leiloes WHERE id IN ({marcadores})", bloco
+            ).rowcount
+    return removidos
+
+def compactar_log(arquivo: str) -> int:
+    """Sem logs JSONL neste backend (os lances ficam numa tabela): nada a compactar"""
+    return 0
+
+# ==================== CONTADORES ====================
+
+def contadores() -> Dict:
+    """Totais mantidos por triggers (uma leitura da tabela contadores)"""
+    valores = dict(_conexao().execute("SELECT nome, valor FROM contadores").fetchall())
+    return {
+        "usuarios": valores.get("usuarios", 0),
+        "leiloes": valores.get("leiloes", 0),
+        "leiloes_por_status": {
+            nome.split(":", 1)[1]: valor
+            for nome, valor in valores.items()
+            if nome.startswith("leiloes:") and valor > 0
+        },
+        "lances": valores.get("lances", 0),
+    }
+
+# ==================== VERSÕES ====================
+
+def versao(arquivo: str, chave: Optional[str] = None) -> Tuple[str, float]:
+    """
+    Versão da tabela (ou do registro/leilão `chave`) mantida por
+    triggers: (token, modificado_em epoch), ou ("0", 0.0) se nunca mudou.
+    """
+    nome = arquivo if chave is None else f"{arquivo}:{chave}"
+    linha = _conexao().execute(
+        "SELECT versao, modificado FROM versoes WHERE chave = ?", (nome,)
+    ).fetchone()
+    if linha is None:
+        return "0", 0.0
+    versao_atual, modificado = linha
+    return f"{versao_atual:x}.{int(modificado * 1e6):x}", modificado
+
+# ==================== PAGINAÇÃO ====================
+
+def listar_pagina(arquivo: str, limite: int, cursor: Optional[str] = None,
+                  filtro: Optional[Callable[[Dict], bool]] = None) -> Tuple[Dict, Optional[str]]:
+    """Paginação por chave (id) sobre usuarios/leiloes"""
+    tabela = TABELAS[arquivo]
+    conexao = _conexao()
+    bloco = limite + 1 if filtro is None else TAMANHO_BLOCO_PAGINACAO
+    pagina = {}
+    ultimo = cursor or ""
+
+    while True:
+        linhas = conexao.execute(
+            f"SELECT id, dados FROM {tabela} WHERE id > ? ORDER BY id LIMIT ?",
+            (ultimo, bloco)
+        ).fetchall()
+
+        for chave, dados in linhas:
+            if len(pagina) == limite:
+                return pagina, ultimo
+            ultimo = chave
+            registro = json.loads(dados)
+            if filtro is None or filtro(registro):
+                pagina[chave] = registro
+
+        if len(linhas) < bloco:
+            return pagina, None
+
+# ==================== MIGRAÇÃO ====================
+
+def _arquivos_json(diretorio: str) -> List[str]:
+    return [nome for nome in ARQUIVOS_JSON if os.path.exists(os.path.join(diretorio, nome))]
+
+def _migrar(diretorio: str, renomear: bool) -> Dict[str, int]:
+    def carregar(nome, padrao):
+        caminho = os.path.join(diretorio, nome)
+        if not os.path.exists(caminho):
+            return padrao
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    nomes = _arquivos_json(diretorio)
+    if renomear and not nomes:
+        # Já migrado (os arquivos viraram *.migrado): não apaga as tabelas
+        return {"usuarios": 0, "leiloes": 0, "lances": 0}
+
+    usuarios = carregar("usuarios.json", {})
+    leiloes = carregar("leiloes.json", {})
+    lances = carregar("lances.json", [])
+    caminho_log = os.path.join(diretorio, "lances.jsonl")
+    if os.path.exists(caminho_log):
+        with open(caminho_log, 'rb') as f:
+            lances.extend(
+                json.loads(linha) for linha in f
+                if linha.endswith(b"\n") and linha.strip()
+            )
+
+    escrever_json("usuarios.json", usuarios)
+    escrever_json("leiloes.json", leiloes)
+    escrever_json("lances.json", lances)
+
+    if renomear:
+        for nome in nomes:
+            caminho = os.path.join(diretorio, nome)
+            os.replace(caminho, caminho + ".migrado")
+
+    return {"usuarios": len(usuarios), "leiloes": len(leiloes), "lances": len(lances)}
+
+def _migrar_no_primeiro_acesso():
+    """
+    Migra os arquivos do backend JSON deixados em DATA_DIR, como os
+    shards: sob a trava de leilao.db, um só processo migra e renomeia os
+    arquivos para *.migrado; os demais não os encontram mais.
+    """
+    from utils import storage
+    if not _arquivos_json(storage.DATA_DIR):
+        return
+    with storage._trava_arquivo(ARQUIVO_BANCO):
+        _migrar(storage.DATA_DIR, renomear=True)
+
+def migrar_de_json(diretorio: Optional[str] = None) -> Dict[str, int]:
+    """
+    Copia usuarios.json, leiloes.json e o histórico de lances (lances.jsonl
+    ou lances.json antigo) do backend JSON para o banco SQLite.
+    As tabelas de destino são substituídas. Migrando o próprio DATA_DIR
+    (o que o primeiro acesso ao banco já faz), os arquivos antigos são
+    renomeados para *.migrado. Retorna as contagens migradas.
+    """
+    from utils import storage
+    diretorio = diretorio or storage.DATA_DIR
+    _conexao()
+    with storage._trava_arquivo(ARQUIVO_BANCO):
+        return _migrar(diretorio, renomear=os.path.abspath(diretorio)
+                       == os.path.abspath(storage.DATA_DIR))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--migrar':
+        contagens = migrar_de_json(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"✓ Migração concluída para {_caminho()}")
+        for tabela, total in contagens.items():
+            print(f"   {tabela}: {total}")
+    else:
+        print("Uso:")
+        print("  python -m utils.storage_sqlite --migrar [diretorio_json]")
\ No newline at end of file
@@ -1,24 +1,43 @@
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Tuple
-from utils.storage import ler_json
+from typing import Dict, Mapping, Optional, Tuple
+from utils.storage import ler_json, buscar_leilao, buscar_usuario
+from utils import metricas, reservas
 
-def validar_usuario_existe(usuario_id: str) -> Tuple[bool, str]:
+# Incremento mínimo de um lance sobre o preço atual (5%)
+INCREMENTO_MINIMO = 0.05
+
+DURACAO_VALIDACAO = metricas.histograma(
+    "leilao_validacao_segundos", "Tempo de cada validador em validar_lance_completo")
+
+# Os validadores aceitam opcionalmente os documentos já carregados
+# (usuarios/leiloes), para o processamento em lote validar contra o
+# estado em memória sem reler os arquivos.
+
+def validar_usuario_existe(usuario_id: str,
+                           usuarios: Optional[Mapping] = None) -> Tuple[bool, str]:
     """Verifica se o usuário existe"""
-    usuarios = ler_json("usuarios.json")
+    if usuarios is None:
+        usuarios = ler_json("usuarios.json")
     if usuario_id not in usuarios:
         return False, "Usuário não encontrado"
     return True, ""
 
-def validar_leilao_existe(leilao_id: str) -> Tuple[bool, str]:
+def validar_leilao_existe(leilao_id: str,
+                          leiloes: Optional[Mapping] = None) -> Tuple[bool, str]:
     """Verifica se o leilão existe"""
-    leiloes = ler_json("leiloes.json")
+    if leiloes is None:
+        leiloes = ler_json("leiloes.json")
     if leilao_id not in leiloes:
         return False, "Leilão não encontrado"
     return True, ""
 
-def validar_leilao_ativo(leilao_id: str) -> Tuple[bool, str]:
+def validar_leilao_ativo(leilao_id: str,
+                         leiloes: Optional[Mapping] = None) -> Tuple[bool, str]:
     """Verifica se o leilão está ativo"""
-    leiloes = ler_json("leiloes.json")
+    if leiloes is None:
+        leiloes = ler_json("leiloes.json")
     leilao = leiloes.get(leilao_id)
     
     if not leilao:
@@ -28,22 +47,24 @@ def validar_leilao_ativo(leilao_id: str) -> Tuple[bool, str]:
         return False, f"Leilão está {leilao['status']}"
     
     # Verifica se já passou da data fim
-    data_fim = datetime.fromisoformat(leilao["data_fim"])
-    if datetime.now() > data_fim:
+    prazo, _ = instantaneo_do_leilao(leilao_id, leilao)
+    if datetime.now().timestamp() > prazo:
         return False, "Leilão já foi encerrado"
     
     return True, ""
 
-def validar_valor_lance(leilao_id: str, valor: float) -> Tuple[bool, str]:
+def validar_valor_lance(leilao_id: str, valor: float,
+                        leiloes: Optional[Mapping] = None) -> Tuple[bool, str]:
     """Valida se o valor do lance é válido"""
-    leiloes = ler_json("leiloes.json")
+    if leiloes is None:
+        leiloes = ler_json("leiloes.json")
     leilao = leiloes.get(leilao_id)
     
     if not leilao:
         return False, "Leilão não encontrado"
     
     preco_atual = leilao["preco_atual"]
-    incremento_minimo = preco_atual * 0.05  # 5% de incremento mínimo
+    incremento_minimo = preco_atual * INCREMENTO_MINIMO
     
     if valor <= preco_atual:
         return False, f"Lance deve ser maior que o valor atual (R$ {preco_atual:.2f})"
@@ -53,45 +74,141 @@ def validar_valor_lance(leilao_id: str, valor: float) -> Tuple[bool, str]:
     
     return True, ""
 
-def validar_saldo_usuario(usuario_id: str, valor: float) -> Tuple[bool, str]:
-    """Verifica se o usuário tem saldo suficiente"""
-    usuarios = ler_json("usuarios.json")
+def validar_saldo_usuario(usuario_id: str, valor: float,
+                          usuarios: Optional[Mapping] = None,
+                          leilao: Optional[Dict] = None) -> Tuple[bool, str]:
+    """
+    Verifica se o usuário tem saldo disponível (saldo menos reservas)
+    suficiente. Com o leilão, a reserva de quem já o lidera conta como
+    livre: cobrir o próprio lance a substitui.
+    """
+    if usuarios is None:
+        usuarios = ler_json("usuarios.json")
     usuario = usuarios.get(usuario_id)
     
     if not usuario:
         return False, "Usuário não encontrado"
     
-    if usuario["saldo"] < valor:
-        return False, f"Saldo insuficiente. Disponível: R$ {usuario['saldo']:.2f}"
+    disponivel = reservas.disponivel(usuario) + reservas.credito_no_leilao(usuario_id, usuario, leilao)
+    if disponivel < valor:
+        return False, f"Saldo insuficiente. Disponível: R$ {disponivel:.2f}"
     
     return True, ""
 
-def validar_lance_completo(leilao_id: str, usuario_id: str, valor: float) -> Tuple[bool, str]:
+def validar_lance_completo(leilao_id: str, usuario_id: str, valor: float,
+                           usuarios: Optional[Mapping] = None,
+                           leiloes: Optional[Mapping] = None) -> Tuple[bool, str]:
     """Executa todas as validações de um lance"""
     
+    # Carrega cada documento uma única vez para todas as validações
+    if usuarios is None:
+        usuarios = ler_json("usuarios.json")
+    if leiloes is None:
+        leiloes = ler_json("leiloes.json")
+    
     # Valida usuário
-    valido, msg = validar_usuario_existe(usuario_id)
+    with DURACAO_VALIDACAO.cronometrar(validador="usuario_existe"):
+        valido, msg = validar_usuario_existe(usuario_id, usuarios)
     if not valido:
         return False, msg
     
     # Valida leilão
-    valido, msg = validar_leilao_existe(leilao_id)
+    with DURACAO_VALIDACAO.cronometrar(validador="leilao_existe"):
+        valido, msg = validar_leilao_existe(leilao_id, leiloes)
     if not valido:
         return False, msg
     
     # Valida se leilão está ativo
-    valido, msg = validar_leilao_ativo(leilao_id)
+    with DURACAO_VALIDACAO.cronometrar(validador="leilao_ativo"):
+        valido, msg = validar_leilao_ativo(leilao_id, leiloes)
     if not valido:
         return False, msg
     
     # Valida valor do lance
-    valido, msg = validar_valor_lance(leilao_id, valor)
+    with DURACAO_VALIDACAO.cronometrar(validador="valor_lance"):
+        valido, msg = validar_valor_lance(leilao_id, valor, leiloes)
     if not valido:
         return False, msg
     
     # Valida saldo
-    valido, msg = validar_saldo_usuario(usuario_id, valor)
+    with DURACAO_VALIDACAO.cronometrar(validador="saldo_usuario"):
+        valido, msg = validar_saldo_usuario(usuario_id, valor, usuarios, leiloes[leilao_id])
     if not valido:
         return False, msg
     
-    return True, "Lance válido"
\ No newline at end of file
+    return True, "Lance válido"
+
+# ==================== PRÉ-VALIDAÇÃO (API) ====================
+
+# Instantâneo por leilão usado pela API: leilao_id -> (chave, prazo, lance_minimo),
+# onde chave = (status, data_fim, preco_atual) do registro de origem. A
+# entrada é recalculada só quando um desses campos muda, então data_fim
+# não é reinterpretada a cada requisição. Só leilões ativos e dentro do
+# prazo ficam guardados, no máximo MAX_INSTANTANEOS (os usados há mais
+# tempo saem primeiro).
+MAX_INSTANTANEOS = 10_000
+_instantaneo_leiloes: "OrderedDict[str, Tuple[Tuple, float, float]]" = OrderedDict()
+_instantaneo_trava = threading.Lock()
+
+def instantaneo_do_leilao(leilao_id: str, leilao: Dict) -> Tuple[float, float]:
+    """(prazo em epoch, lance mínimo aceito) do leilão, a partir do instantâneo"""
+    chave = (leilao["status"], leilao["data_fim"], leilao["preco_atual"])
+    agora = datetime.now().timestamp()
+    with _instantaneo_trava:
+        entrada = _instantaneo_leiloes.get(leilao_id)
+        if entrada is not None and entrada[0] == chave:
+            if agora > entrada[1]:
+                del _instantaneo_leiloes[leilao_id]
+            else:
+                _instantaneo_leiloes.move_to_end(leilao_id)
+            return entrada[1], entrada[2]
+
+    prazo = datetime.fromisoformat(leilao["data_fim"]).timestamp()
+    # Mesma conta de validar_valor_lance, para não divergir no arredondamento
+    lance_minimo = leilao["preco_atual"] + leilao["preco_atual"] * INCREMENTO_MINIMO
+    with _instantaneo_trava:
+        if leilao["status"] != "ativo" or agora > prazo:
+            # Encerrado: não recebe mais lances válidos, não vale guardar
+            _instantaneo_leiloes.pop(leilao_id, None)
+        else:
+            _instantaneo_leiloes[leilao_id] = (chave, prazo, lance_minimo)
+            _instantaneo_leiloes.move_to_end(leilao_id)
+            while len(_instantaneo_leiloes) > MAX_INSTANTANEOS:
+                _instantaneo_leiloes.popitem(last=False)
+    return prazo, lance_minimo
+
+def pre_validar_lance(leilao_id: str, usuario_id: str, valor: float) -> Tuple[bool, str, str]:
+    """
+    Validação rápida feita pela API antes de enfileirar o lance: descarta
+    lances que certamente seriam rejeitados (usuário/leilão inexistente,
+    leilão encerrado, abaixo do incremento mínimo ou acima do saldo
+    disponível).
+    Usa leituras pontuais e o instantâneo por leilão; o processador
+    continua sendo a validação definitiva.
+
+    Retorna (valido, mensagem, motivo), com motivo em "usuario", "leilao",
+    "encerrado", "valor" ou "saldo" quando inválido.
+    """
+    usuario = buscar_usuario(usuario_id)
+    if usuario is None:
+        return False, "Usuário não encontrado", "usuario"
+    
+    leilao = buscar_leilao(leilao_id)
+    if leilao is None:
+        return False, "Leilão não encontrado", "leilao"
+    
+    if leilao["status"] != "ativo":
+        return False, f"Leilão está {leilao['status']}", "encerrado"
+    
+    prazo, lance_minimo = instantaneo_do_leilao(leilao_id, leilao)
+    if datetime.now().timestamp() > prazo:
+        return False, "Leilão já foi encerrado", "encerrado"
+    
+    if valor <= leilao["preco_atual"] or valor < lance_minimo:
+        return False, f"Lance deve ser de no mínimo R$ {lance_minimo:.2f}", "valor"
+    
+    disponivel = reservas.disponivel(usuario) + reservas.credito_no_leilao(usuario_id, usuario, leilao)
+    if disponivel < valor:
+        return False, f"Saldo insuficiente. Disponível: R$ {disponivel:.2f}", "saldo"
+    
+    return True, "", ""